@@ -0,0 +1,92 @@
+"""Measure alert throughput and delivery latency against a local stub webhook receiver.
+
+Usage:
+    python benchmarks/alerts.py --alerts 100000 --rate 20000 --suppression-window 0 --receiver-delay 0.01
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from processing.alerts import AlertDispatcher
+
+def make_receiver(delay):
+    class Receiver(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            if delay:
+                time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Receiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Alert dispatcher benchmark')
+    parser.add_argument('--alerts', type=int, default=100000)
+    parser.add_argument('--cells', type=int, default=50000, help='distinct locations the alerts come from')
+    parser.add_argument('--flush-interval', type=float, default=0.2)
+    parser.add_argument('--max-batch-size', type=int, default=500)
+    parser.add_argument('--suppression-window', type=float, default=300)
+    parser.add_argument('--rate', type=float, default=0, help='alerts per second, 0 = as fast as possible')
+    parser.add_argument('--receiver-delay', type=float, default=0.01, help='seconds the stub takes per request')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    server = make_receiver(args.receiver_delay)
+    dispatcher = AlertDispatcher({'output': {
+        'alert_webhook': f"http://127.0.0.1:{server.server_address[1]}/webhook",
+        'alerts': {
+            'flush_interval': args.flush_interval,
+            'max_batch_size': args.max_batch_size,
+            'suppression_window': args.suppression_window
+        }
+    }})
+    dispatcher.start()
+    
+    rng = random.Random(args.seed)
+    locations = [(rng.uniform(40.5, 40.9), rng.uniform(-74.2, -73.7)) for _ in range(args.cells)]
+    rows = []
+    for i in range(args.alerts):
+        lat, lon = rng.choice(locations)
+        rows.append({"timestamp": str(i), "event_time": i * 0.001, "source": "city_sensors", "lat": lat, "lon": lon,
+                     "anomaly_type": "noise_level_anomaly", "anomaly_description": "High noise_level detected"})
+    
+    start = time.perf_counter()
+    enqueued = 0.0
+    for i, row in enumerate(rows):
+        if args.rate and i % 100 == 0:
+            # Pace in steps of 100 alerts
+            delay = start + i / args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        before = time.perf_counter()
+        dispatcher.add(row)
+        enqueued += time.perf_counter() - before
+    dispatcher.close()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    
+    stats = dispatcher.stats
+    print(f"enqueue:     {enqueued / args.alerts * 1e6:.2f} us/alert on the pipeline thread")
+    print(f"received:    {stats.received}, coalesced {stats.coalesced}, dropped {stats.dropped}")
+    print(f"sent:        {stats.sent} alerts in {stats.batches} batches, {stats.retries} retries, {stats.failed} failed")
+    print(f"throughput:  {stats.received / elapsed:.0f} alerts/sec received, {stats.sent / elapsed:.0f} sent")
+    print(f"latency:     p50 {stats.percentile(50) * 1000:.0f} ms, p95 {stats.percentile(95) * 1000:.0f} ms, "
+          f"p99 {stats.percentile(99) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare recall@k and query latency of the ANN indexes against the exact flat index.
+
+Vectors are drawn around `--clusters` random centres, like embeddings of many similar event
+documents, and generated in chunks so only the indexes are held in memory. Each index is
+built by incremental inserts, as the RAG document store builds it. The hnsw index is skipped
+when hnswlib is not installed.
+
+Usage:
+    python benchmarks/ann_index.py --sizes 100000 1000000 5000000 --dim 384 --k 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from processing.vector_index import create_index
+
+def chunks(size, dim, centers, seed, chunk=100000):
+    rng = np.random.default_rng(seed)
+    for start in range(0, size, chunk):
+        count = min(chunk, size - start)
+        # Points lie about half as far from their centre as the centre is from the origin
+        noise = rng.standard_normal((count, dim)) * (1.5 / np.sqrt(dim))
+        yield start, (centers[rng.integers(len(centers), size=count)] + noise).astype(np.float32)
+
+def main():
+    parser = argparse.ArgumentParser(description='ANN index benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000, 5000000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--clusters', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--nlist', type=int, default=1024)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--ef', type=int, nargs='+', default=[32, 64, 128])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dim)).astype(np.float32) / np.sqrt(args.dim) * 3
+    queries = next(chunks(args.queries, args.dim, centers, args.seed + 1))[1]
+    
+    try:
+        import hnswlib
+        hnsw = True
+    except ImportError:
+        print("hnswlib is not installed; skipping hnsw")
+        hnsw = False
+    
+    print(f"{'vectors':>9} {'index':<18} {'inserts/sec':>12} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in args.sizes:
+        configs = [("flat", {'type': 'flat'})]
+        configs += [(f"ivf nprobe={nprobe}", {'type': 'ivf', 'nlist': args.nlist, 'nprobe': nprobe}) for nprobe in args.nprobe]
+        if hnsw:
+            configs += [(f"hnsw ef={ef}", {'type': 'hnsw', 'ef': ef, 'capacity': size}) for ef in args.ef]
+        
+        truth = None
+        built = {}
+        for name, settings in configs:
+            # Indexes that differ only in a search parameter share one build
+            build_key = settings['type']
+            if build_key in built:
+                index, insert_rate = built[build_key]
+                if settings['type'] == 'ivf':
+                    index.nprobe = settings['nprobe']
+                else:
+                    index.index.set_ef(settings['ef'])
+            else:
+                index = create_index(settings)
+                start = time.perf_counter()
+                for offset, vectors in chunks(size, args.dim, centers, args.seed):
+                    for i, vector in enumerate(vectors):
+                        index.add(offset + i, vector)
+                if settings['type'] == 'ivf':
+                    # Searches are measured on the trained lists, and the rate includes training
+                    index.finish_training()
+                insert_rate = size / (time.perf_counter() - start)
+                built[build_key] = (index, insert_rate)
+            
+            latencies, results = [], []
+            for query in queries:
+                start = time.perf_counter()
+                results.append({doc_id for doc_id, _ in index.search(query, args.k)})
+                latencies.append(time.perf_counter() - start)
+            if truth is None:
+                truth = results
+            recall = sum(len(found & expected) for found, expected in zip(results, truth)) / (args.k * len(queries))
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(f"{size:>9} {name:<18} {insert_rate:>12.0f} {recall:>9.3f} {p50:>8.2f} {p99:>8.2f}")
+        
+        # Free this size's indexes before building the next
+        del built, index
+
+if __name__ == "__main__":
+    main()
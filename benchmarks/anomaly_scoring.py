@@ -0,0 +1,120 @@
+"""Compare per-row, NumPy-batched and compiled threshold scoring of IoT readings.
+
+Readings are read from a CSV file by the engine's native reader. The "columns only" run adds
+the anomaly columns with constant values; its time is the engine's floor for any scorer, and
+"scoring rows/sec" is measured on the time above that floor.
+
+Usage:
+    python benchmarks/anomaly_scoring.py --rows 1000000 --anomaly-rate 0.05
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pathway as pw
+from processing.anomaly_detection import AnomalyDetector
+
+RULES = {'noise_level': 80, 'crowd_density': 0.8, 'traffic_flow': 0.2}
+METRICS = ('noise_level', 'crowd_density', 'traffic_flow')
+
+class ReadingSchema(pw.Schema):
+    source: str
+    noise_level: Optional[float]
+    crowd_density: Optional[float]
+    traffic_flow: Optional[float]
+    anomaly: Optional[bool]
+
+def per_row_check(source, *metrics):
+    """The previous per-row rule check, as the baseline"""
+    if source == "city_sensors":
+        for metric, value in zip(METRICS, metrics):
+            if value is not None and metric in RULES and value > RULES[metric]:
+                return (f"{metric}_anomaly", f"High {metric} detected: {value}")
+    return (None, None)
+
+def write_readings(path, rows, anomaly_rate, seed):
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        f.write("source,noise_level,crowd_density,traffic_flow,anomaly\n")
+        for _ in range(rows):
+            noise = rng.uniform(81, 100) if rng.random() < anomaly_rate else rng.uniform(40, 80)
+            f.write(f"city_sensors,{noise:.2f},{rng.uniform(0, 0.8):.3f},{rng.uniform(0.2, 1):.3f},\n")
+
+def run_engine(path, scorer):
+    pw.internals.parse_graph.G.clear()
+    table = pw.io.csv.read(path, schema=ReadingSchema, mode="static")
+    pw.io.null.write(scorer(table))
+    start = time.perf_counter()
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Anomaly rule scoring benchmark')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--anomaly-rate', type=float, default=0.05)
+    parser.add_argument('--batch-size', type=int, default=1024, help='rows per call of the NumPy-batched UDF')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='anomaly_scoring_'), 'readings.csv')
+    write_readings(path, args.rows, args.anomaly_rate, args.seed)
+    detector = AnomalyDetector({'anomaly_rules': RULES})
+    rule_table = detector.rule_table
+
+    def with_result(table, result):
+        # The previous process(): a check_result column, then the anomaly columns taken from it
+        checked = table.with_columns(check_result=result)
+        return checked.with_columns(
+            anomaly=pw.coalesce(checked.anomaly, False) | checked.check_result[0].is_not_none(),
+            anomaly_type=checked.check_result[0],
+            anomaly_description=checked.check_result[1]
+        ).without(pw.this.check_result)
+    
+    def per_row_udf(table):
+        return with_result(table, pw.apply_with_type(
+            per_row_check, Tuple[Optional[str], Optional[str]], table.source, *[table[m] for m in METRICS]
+        ))
+    
+    def batched_udf(table):
+        score = pw.udf(
+            lambda *batch: rule_table.score_batch(*batch),
+            return_type=Tuple[Optional[str], Optional[str]],
+            deterministic=True,
+            max_batch_size=args.batch_size
+        )
+        return with_result(table, score(table.source, *[table[m] for m in rule_table.metrics]))
+    
+    def columns_only(table):
+        # Adding the output columns with constant values: the engine's cost floor for any scorer
+        return table.with_columns(
+            anomaly=pw.coalesce(table.anomaly, False),
+            anomaly_type=pw.declare_type(Optional[str], None),
+            anomaly_description=pw.declare_type(Optional[str], None)
+        )
+    
+    runs = [
+        ("columns only", columns_only),
+        ("per-row UDF", per_row_udf),
+        ("NumPy batched UDF", batched_udf),
+        ("compiled rules", detector.score)
+    ]
+    timings = {name: run_engine(path, scorer) for name, scorer in runs}
+
+    floor = timings["columns only"]
+    baseline = timings["per-row UDF"] - floor
+    print(f"{'':<20} {'rows/sec':>10} {'scoring rows/sec':>17} {'speedup':>8}")
+    for name, elapsed in timings.items():
+        line = f"{name:<20} {args.rows / elapsed:>10.0f}"
+        if name != "columns only":
+            scoring = max(elapsed - floor, 1e-9)
+            line += f" {args.rows / scoring:>17.0f} {baseline / scoring:>7.1f}x"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measure rows/sec through the engine for different source batch sizes.
+
+Usage:
+    python benchmarks/batching.py --events 200000 --batch-sizes 1 100 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pathway as pw
+from data_sources.base import DataSource
+
+class _CountingSource(DataSource):
+    name = "benchmark"
+    
+    def __init__(self, config, events):
+        self.events = events
+        super().__init__(config)
+    
+    def _define_schema(self):
+        return pw.schema_from_types(timestamp=str, source=str, value=float)
+    
+    def _stream(self):
+        for i in range(self.events):
+            yield {"timestamp": str(i), "source": self.name, "value": float(i)}
+
+def run_once(events, batch_size, linger_ms):
+    config = {
+        'data_sources': {
+            'benchmark': {'batching': {'max_batch_size': batch_size, 'linger_ms': linger_ms}}
+        }
+    }
+    pw.internals.parse_graph.G.clear()
+    table = _CountingSource(config, events).get_stream()
+    totals = table.reduce(rows=pw.reducers.count(), total=pw.reducers.sum(pw.this.value))
+    pw.io.null.write(totals)
+    
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+    return time.perf_counter() - start, time.process_time() - cpu_start
+
+def main():
+    parser = argparse.ArgumentParser(description='Source micro-batching benchmark')
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--linger-ms', type=float, default=50)
+    args = parser.parse_args()
+    
+    print(f"{'batch_size':>10} {'seconds':>9} {'rows/sec':>12} {'cpu_sec':>9} {'rows/cpu_sec':>13}")
+    for batch_size in args.batch_sizes:
+        elapsed, cpu = run_once(args.events, batch_size, args.linger_ms)
+        print(f"{batch_size:>10} {elapsed:>9.2f} {args.events / elapsed:>12.0f} {cpu:>9.2f} {args.events / cpu:>13.0f}")
+
+if __name__ == "__main__":
+    main()
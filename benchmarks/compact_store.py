@@ -0,0 +1,120 @@
+"""Memory, recall and restart time of the RAG document store by vector dtype.
+
+Simulated sensor documents with clustered embeddings, as in ann_index.py, are added to a
+DocumentStore with a flat index per `--dtypes`, and to a dict of documents beside a float32
+index, as the store kept them before documents were stored as columns. Memory is measured
+with tracemalloc; recall@k compares each index's nearest documents with an exact float32
+search. Each store is then saved, and a fresh store restores the snapshot and answers a
+first search, as after a restart.
+
+Usage:
+    python benchmarks/compact_store.py --documents 200000 --dim 384 --k 10
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from processing.document_store import DocumentStore
+from processing.vector_index import FlatIndex
+
+def documents(count, rng):
+    for i in range(count):
+        event_time = float(i)
+        yield {
+            'timestamp': f"{event_time:012.3f}",
+            'event_time': event_time,
+            'source': 'city_sensors',
+            'lat': float(rng.uniform(40.70, 40.80)),
+            'lon': float(rng.uniform(-74.00, -73.90)),
+            'noise_level': float(rng.uniform(45.0, 70.0)),
+            'crowd_density': float(rng.uniform(0.1, 0.6)),
+            'traffic_flow': float(rng.uniform(0.3, 0.9)),
+            'anomaly': False,
+            'anomaly_type': None,
+            'anomaly_description': None
+        }
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact document store benchmark')
+    parser.add_argument('--documents', type=int, default=200000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--clusters', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--dtypes', nargs='+', default=['float32', 'float16', 'int8'])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dim)).astype(np.float32) / np.sqrt(args.dim) * 3
+    def clustered(count):
+        noise = rng.standard_normal((count, args.dim)).astype(np.float32) * (1.5 / np.sqrt(args.dim))
+        return centers[rng.integers(len(centers), size=count)] + noise
+    vectors = clustered(args.documents)
+    queries = clustered(args.queries)
+    
+    # Exact nearest documents by cosine similarity
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    truth = [set(np.argsort(-(normed @ (query / np.linalg.norm(query))))[:args.k].tolist()) for query in queries]
+    del normed
+    docs = list(documents(args.documents, np.random.default_rng(args.seed)))
+    print(f"{args.documents} documents, {args.dim}-d vectors")
+    
+    tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    held = {}
+    index = FlatIndex()
+    for doc_id, (doc, vector) in enumerate(zip(docs, vectors)):
+        held[doc_id] = dict(doc)
+        index.add(doc_id, vector)
+    baseline = tracemalloc.get_traced_memory()[0] - start_memory
+    del held, index
+    
+    print(f"\n{'store':<16} {'bytes/doc':>10} {'recall@' + str(args.k):>9} {'search ms':>10} {'save s':>7} {'snapshot MB':>12} {'restore s':>10} {'first ms':>9}")
+    print(f"{'dict + float32':<16} {baseline / args.documents:>10.0f}")
+    for dtype in args.dtypes:
+        start_memory = tracemalloc.get_traced_memory()[0]
+        store = DocumentStore.from_config({'index': {'type': 'flat', 'dtype': dtype}})
+        for doc, vector in zip(docs, vectors):
+            doc_id = store.add(doc)
+            store.add_embeddings([vector], [doc_id])
+        memory = tracemalloc.get_traced_memory()[0] - start_memory
+        
+        found = [{doc_id for doc_id, _ in store.index.search(query, args.k)} for query in queries]
+        recall = sum(len(hits & expected) for hits, expected in zip(found, truth)) / (args.k * len(queries))
+        start = time.perf_counter()
+        for query in queries:
+            store.search(query, args.k)
+        search_ms = (time.perf_counter() - start) / len(queries) * 1000
+        
+        path = tempfile.mkdtemp(prefix='rag_store_')
+        start = time.perf_counter()
+        store.save(path)
+        save_seconds = time.perf_counter() - start
+        del store
+        
+        start = time.perf_counter()
+        restored = DocumentStore.from_config({'index': {'type': 'flat', 'dtype': dtype}, 'store': {'path': path}})
+        restore_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        restored.search(queries[0], args.k)
+        first_ms = (time.perf_counter() - start) * 1000
+        print(
+            f"{dtype:<16} {memory / args.documents:>10.0f} {recall:>9.3f} {search_ms:>10.2f} {save_seconds:>7.2f} "
+            f"{directory_size(path) / 2**20:>12.1f} {restore_seconds:>10.2f} {first_ms:>9.1f}"
+        )
+        del restored
+        shutil.rmtree(path)
+
+if __name__ == "__main__":
+    main()
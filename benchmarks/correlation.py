@@ -0,0 +1,79 @@
+"""Measure the cost of the incident correlation stage on a static event capture.
+
+Runs the anomaly pipeline with and without correlation over the same events, spread across
+`--cells` locations, and reports events/sec and the number of correlated incidents.
+
+Usage:
+    python benchmarks/correlation.py --events 200000 --cells 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pathway as pw
+from processing.anomaly_detection import AnomalyDetector
+
+class EventSchema(pw.Schema):
+    timestamp: str
+    event_time: float
+    source: str
+    lat: float
+    lon: float
+    text: Optional[str]
+    incident_type: Optional[str]
+    noise_level: Optional[float]
+    anomaly: Optional[bool]
+
+def write_events(path, events, cells, seed):
+    rng = random.Random(seed)
+    locations = [(rng.uniform(40.5, 40.9), rng.uniform(-74.2, -73.7)) for _ in range(cells)]
+    with open(path, 'w') as f:
+        f.write("timestamp,event_time,source,lat,lon,text,incident_type,noise_level,anomaly\n")
+        for i in range(events):
+            lat, lon = locations[rng.randrange(cells)]
+            event_time = i * 0.01
+            kind = rng.random()
+            if kind < 0.05:
+                f.write(f"{event_time},{event_time},police_scanner,{lat},{lon},,fire,,\n")
+            elif kind < 0.5:
+                f.write(f"{event_time},{event_time},twitter,{lat},{lon},fire on main street,,,\n")
+            else:
+                noise = rng.uniform(81, 100) if rng.random() < 0.02 else rng.uniform(40, 80)
+                f.write(f"{event_time},{event_time},city_sensors,{lat},{lon},,,{noise:.2f},\n")
+
+def run(path, config):
+    pw.internals.parse_graph.G.clear()
+    table = pw.io.csv.read(path, schema=EventSchema, mode="static")
+    correlated = AnomalyDetector(config).process(table).filter(pw.this.anomaly_type == "correlated_incident")
+    counts = correlated.reduce(count=pw.reducers.count())
+    result = {}
+    pw.io.subscribe(counts, lambda key, row, time, is_addition: result.update(row) if is_addition else None)
+    start = time.perf_counter()
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+    return time.perf_counter() - start, result.get('count', 0)
+
+def main():
+    parser = argparse.ArgumentParser(description='Incident correlation benchmark')
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--cells', type=int, default=5000, help='distinct locations the events come from')
+    parser.add_argument('--window', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    path = os.path.join(tempfile.mkdtemp(prefix='correlation_'), 'events.csv')
+    write_events(path, args.events, args.cells, args.seed)
+    
+    base = {'anomaly_rules': {'noise_level': 80, 'social_media_spike': 10}, 'spike_detection': {'allowed_lateness': 3600}}
+    print(f"{'':<20} {'seconds':>8} {'events/sec':>11} {'correlated':>11}")
+    for name, correlation in (("without correlation", {}), ("with correlation", {'enabled': True, 'window': args.window})):
+        elapsed, count = run(path, dict(base, correlation=correlation))
+        print(f"{name:<20} {elapsed:>8.2f} {args.events / elapsed:>11.0f} {count:>11}")
+
+if __name__ == "__main__":
+    main()
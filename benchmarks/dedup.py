@@ -0,0 +1,51 @@
+"""Measure memory footprint, false positive rate and cost of the dedup filter.
+
+Usage:
+    python benchmarks/dedup.py --keys 1000000 --false-positive-rate 0.001
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from processing.dedup import DecayingBloomFilter
+
+def main():
+    parser = argparse.ArgumentParser(description='Dedup filter benchmark')
+    parser.add_argument('--keys', type=int, default=1000000, help='distinct keys inserted within one TTL')
+    parser.add_argument('--false-positive-rate', type=float, default=0.001)
+    parser.add_argument('--generations', type=int, default=4)
+    args = parser.parse_args()
+    
+    bloom = DecayingBloomFilter(
+        ttl=600,
+        capacity=args.keys,
+        false_positive_rate=args.false_positive_rate,
+        generations=args.generations
+    )
+    
+    # Spread inserts over one TTL so every generation holds its share
+    start = time.perf_counter()
+    for i in range(args.keys):
+        bloom.check_and_add(f"40712,-74006|post number {i}".encode(), i * 600 / args.keys)
+    insert_seconds = time.perf_counter() - start
+    
+    # Keys never inserted, looked up without being added
+    start = time.perf_counter()
+    false_positives = sum(
+        f"40712,-74006|other post {i}".encode() in bloom
+        for i in range(args.keys)
+    )
+    lookup_seconds = time.perf_counter() - start
+    
+    print(f"keys:                  {args.keys}")
+    print(f"filter memory:         {bloom.memory_bytes / 2**20:.2f} MiB")
+    print(f"memory per 1M keys:    {bloom.memory_bytes / args.keys * 1e6 / 2**20:.2f} MiB")
+    print(f"false positive rate:   {false_positives / args.keys:.5f} (target {args.false_positive_rate})")
+    print(f"insert cost:           {insert_seconds / args.keys * 1e6:.2f} us/key")
+    print(f"lookup cost:           {lookup_seconds / args.keys * 1e6:.2f} us/key")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Measure per-event update cost and per-state memory of the streaming detectors.
+
+Usage:
+    python benchmarks/detectors.py --events 200000 --cells 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from processing.detectors import DETECTORS, StatisticalDetectors
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming detector benchmark')
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--cells', type=int, default=10000, help='distinct locations the events come from')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    values = [rng.gauss(50, 10) for _ in range(args.events)]
+    times = [i * 0.5 for i in range(args.events)]
+    
+    print(f"{'detector':<10} {'update':>10} {'state':>12}")
+    for name, detector_class in DETECTORS.items():
+        detector = detector_class({})
+        state = detector.new_state()
+        start = time.perf_counter()
+        for value, event_time in zip(values, times):
+            detector.update(state, value, event_time)
+        update_us = (time.perf_counter() - start) / args.events * 1e6
+        
+        tracemalloc.start()
+        states = [detector.new_state() for _ in range(1000)]
+        for s in states:
+            for value in values[:10]:
+                detector.update(s, value, 0.0)
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<10} {update_us:>8.2f}us {traced / len(states):>8.0f} bytes")
+    
+    # The full per-event path: cell lookup, state store and one detector per metric
+    config = {'statistical_detectors': {'metrics': {name: {'detector': name} for name in DETECTORS}}}
+    detectors = StatisticalDetectors(config)
+    locations = [(rng.uniform(40.5, 40.9), rng.uniform(-74.2, -73.7)) for _ in range(args.cells)]
+    events = [('city_sensors', *rng.choice(locations), event_time, value, value, value) for value, event_time in zip(values, times)]
+    start = time.perf_counter()
+    for event in events:
+        detectors.check(*event)
+    elapsed = time.perf_counter() - start
+    stats = detectors.stats()
+    print(f"check() with {len(DETECTORS)} metrics: {elapsed / args.events * 1e6:.2f} us/event, "
+          f"{stats['cells']} states, {stats['bytes'] / 2**20:.1f} MiB estimated")
+
+if __name__ == "__main__":
+    main()
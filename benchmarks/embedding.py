@@ -0,0 +1,64 @@
+"""Measure documents/sec of batched embedding by batch size and worker threads on CPU.
+
+Documents are formatted like the RAG system's event documents and embedded with the same
+model through EmbeddingBatcher, so the numbers include batching and thread pool overhead.
+Requires sentence-transformers.
+
+Usage:
+    python benchmarks/embedding.py --documents 5000 --batch-sizes 1 8 32 64 128 --workers 1 2 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sentence_transformers import SentenceTransformer
+from processing.embedding import EmbeddingBatcher
+
+def make_documents(count, seed):
+    rng = random.Random(seed)
+    return [
+        f"city_sensors: noise_level={rng.uniform(40, 100):.2f}, crowd_density={rng.uniform(0, 1):.3f}, "
+        f"anomaly={rng.random() < 0.05} at {40.7 + rng.uniform(-0.1, 0.1):.5f},{-74.0 + rng.uniform(-0.1, 0.1):.5f}"
+        for _ in range(count)
+    ]
+
+def run(model, texts, batch_size, workers):
+    batcher = EmbeddingBatcher(
+        lambda batch: model.encode(batch, batch_size=len(batch)),
+        lambda embeddings, items: None,
+        batch_size=batch_size,
+        max_latency=0.05,
+        workers=workers
+    )
+    start = time.perf_counter()
+    for i, text in enumerate(texts):
+        batcher.add(text, i)
+    batcher.close()
+    return time.perf_counter() - start, batcher.stats.as_dict()
+
+def main():
+    parser = argparse.ArgumentParser(description='Batched embedding benchmark')
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32, 64, 128, 256])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    model = SentenceTransformer(args.model, device='cpu')
+    texts = make_documents(args.documents, args.seed)
+    # Load the weights and warm up before timing
+    model.encode(texts[:64])
+    
+    print(f"{'batch size':>10} {'workers':>8} {'docs/sec':>10} {'mean delay ms':>14}")
+    for batch_size in args.batch_sizes:
+        for workers in args.workers:
+            elapsed, stats = run(model, texts, batch_size, workers)
+            print(f"{batch_size:>10} {workers:>8} {args.documents / elapsed:>10.0f} {stats['mean_delay'] * 1000:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare RAG search latency and relevance with and without the geo-temporal prefilter.
+
+Documents are spread over New York City and one day of event time, with clustered random
+embeddings in place of the model. Each query asks about 1 km around a random point over the
+last 15 minutes. "unscoped" searches the whole index, "postfilter" applies the scope to the
+index's nearest results, and "prefilter" scores only the documents inside the scope.
+"in scope" is the share of returned documents that are inside it, out of k.
+
+Usage:
+    python benchmarks/geo_retrieval.py --sizes 10000 100000 1000000 --index flat
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from processing.document_store import DocumentStore
+from processing.query_scope import QueryScope
+
+# South-west and north-east corners of the area documents are placed in
+BOUNDS = ((40.55, -74.05), (40.90, -73.75))
+
+def build(size, dim, index, rng, centers):
+    store = DocumentStore.from_config({'index': {'type': index}})
+    lats = rng.uniform(BOUNDS[0][0], BOUNDS[1][0], size)
+    lons = rng.uniform(BOUNDS[0][1], BOUNDS[1][1], size)
+    for start in range(0, size, 10000):
+        count = min(10000, size - start)
+        embeddings = centers[rng.integers(len(centers), size=count)] + rng.standard_normal((count, dim)) * (1.5 / np.sqrt(dim))
+        ids = [
+            store.add({'source': 'city_sensors', 'event_time': (start + i) * 86400 / size, 'lat': lats[start + i], 'lon': lons[start + i]})
+            for i in range(count)
+        ]
+        store.add_embeddings(embeddings, ids)
+    return store
+
+def main():
+    parser = argparse.ArgumentParser(description='Geo-temporal prefilter benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--index', default='flat', help='flat, ivf or hnsw')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--radius', type=float, default=1000)
+    parser.add_argument('--window', type=float, default=900)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((1000, args.dim)) * (3 / np.sqrt(args.dim))
+    
+    print(f"{'documents':>9} {'search':<11} {'p50 ms':>8} {'p99 ms':>8} {'in scope':>9}")
+    for size in args.sizes:
+        store = build(size, args.dim, args.index, rng, centers)
+        scopes = [
+            QueryScope(near=(rng.uniform(BOUNDS[0][0], BOUNDS[1][0]), rng.uniform(BOUNDS[0][1], BOUNDS[1][1])), radius=args.radius, window=args.window)
+            for _ in range(args.queries)
+        ]
+        vectors = rng.standard_normal((args.queries, args.dim))
+        since = store.retention.latest - args.window
+        
+        for name, max_candidates, scoped in (("unscoped", None, False), ("postfilter", -1, True), ("prefilter", size, True)):
+            if max_candidates is not None:
+                store.max_candidates = max_candidates
+            latencies, in_scope = [], 0
+            for scope, vector in zip(scopes, vectors):
+                start = time.perf_counter()
+                results = store.search(vector, args.k, scope if scoped else None)
+                latencies.append(time.perf_counter() - start)
+                in_scope += sum(scope.contains(doc, since) for _, doc, _ in results)
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(f"{size:>9} {name:<11} {p50:>8.2f} {p99:>8.2f} {in_scope / (args.k * args.queries):>9.3f}")
+        del store
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Measure requests/sec and fetch latency of HttpPoller against a local stub feed.
+
+Usage:
+    python benchmarks/http_polling.py --endpoints 8 --concurrency 4 --latency-ms 5 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from aiohttp import web
+from data_sources.http_polling import Endpoint, HttpPoller
+
+def start_stub_server(latency, change_every):
+    """Serves JSON feeds whose ETag changes every `change_every` requests per feed"""
+    counts = {}
+    body = json.dumps([{"delay": 5, "location": {"lat": 40.75, "lon": -73.98}}])
+    
+    async def feed(request):
+        name = request.match_info["name"]
+        counts[name] = counts.get(name, 0) + 1
+        await asyncio.sleep(latency)
+        etag = f'"{counts[name] // change_every}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+    
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_get("/{name}", feed)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return port
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP polling benchmark')
+    parser.add_argument('--endpoints', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=4, help='in-flight requests per endpoint')
+    parser.add_argument('--pool-size', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=5)
+    parser.add_argument('--change-every', type=int, default=10, help='requests between feed updates')
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    
+    port = start_stub_server(args.latency_ms / 1000.0, args.change_every)
+    poller = HttpPoller(pool_size=args.pool_size)
+    endpoints = [
+        Endpoint(f"http://127.0.0.1:{port}/feed{i}", interval=0, jitter=0, max_concurrency=args.concurrency)
+        for i in range(args.endpoints)
+    ]
+    
+    payloads = 0
+    polls = poller.poll(endpoints)
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        next(polls)
+        payloads += 1
+    elapsed = time.perf_counter() - start
+    polls.close()
+    poller.close()
+    
+    stats = poller.stats
+    print(f"requests:      {stats.requests} ({stats.requests / elapsed:.0f}/sec)")
+    print(f"changed:       {payloads}")
+    print(f"not modified:  {stats.not_modified}")
+    print(f"errors:        {stats.errors}")
+    print(f"p50 latency:   {stats.percentile(50) * 1000:.2f} ms")
+    print(f"p99 latency:   {stats.percentile(99) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Run the main.py pipeline (without the dashboard) on synthetic load and report
+sustained throughput, end-to-end latency percentiles and peak RSS.
+
+Only source events are counted towards throughput and latency. Social media spikes and
+correlated incidents are derived rows, updated while their windows and joins settle; they are
+reported separately, once each, as they stand when the run ends.
+
+Usage:
+    python benchmarks/pipeline.py --mode public_safety --events 100000 --events-per-second 0
+
+`--no-rag` leaves out the embedding model, for machines without sentence-transformers.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import pathway as pw
+from data_sources.base import DataSourceManager
+from main import build_pipeline, load_config
+from processing.rollup import DERIVED_TYPES
+
+# Subscribers receive a `time` keyword argument that shadows the module
+wall_clock = time.time
+
+def enable_load_generation(config, args):
+    sources = [
+        name for name, source_config in config['data_sources'].items()
+        if name != 'replay' and source_config.get('enabled', False)
+    ]
+    for name in sources:
+        config['data_sources'][name]['polling'] = {'enabled': False}
+        config['data_sources'][name]['load_generation'] = {
+            'enabled': True,
+            'seed': args.seed,
+            'events_per_second': args.events_per_second,
+            'max_events': args.events // len(sources),
+            'sensors': args.sensors,
+            'anomaly_bursts': {'every': args.burst_every, 'length': args.burst_length}
+        }
+    return (args.events // len(sources)) * len(sources)
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end pipeline benchmark')
+    parser.add_argument('--mode', choices=['public_safety', 'urban_planning'], default='public_safety')
+    parser.add_argument('--config', type=str, help='Path to configuration file')
+    parser.add_argument('--events', type=int, default=100000, help='total events across all sources')
+    parser.add_argument('--events-per-second', type=float, default=0, help='per source, 0 = unthrottled')
+    parser.add_argument('--sensors', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--burst-every', type=int, default=0, help='events between anomaly bursts, 0 = none')
+    parser.add_argument('--burst-length', type=int, default=50)
+    parser.add_argument('--no-rag', action='store_true', help='measure ingestion and anomaly detection only')
+    args = parser.parse_args()
+    
+    config = load_config(args.config or os.path.join(ROOT, "config", f"{args.mode}.yaml.example"))
+    expected = enable_load_generation(config, args)
+    if args.no_rag:
+        config.setdefault('rag', {})['enabled'] = False
+    
+    data_manager = DataSourceManager(config)
+    processed_table, anomalies_table, _ = build_pipeline(config, data_manager)
+    
+    latencies = []
+    counted = set()
+    # key -> [anomaly_type, additions less retractions]; an update retracts the old row and adds
+    # the new one, in either order
+    anomalies = {}
+    
+    def on_processed(key, row, time, is_addition):
+        if not is_addition or row['anomaly_type'] in DERIVED_TYPES or key in counted:
+            return
+        counted.add(key)
+        latencies.append(wall_clock() - row['event_time'])
+    
+    def on_anomaly(key, row, time, is_addition):
+        entry = anomalies.setdefault(key, [row['anomaly_type'], 0])
+        entry[1] += 1 if is_addition else -1
+        if is_addition:
+            entry[0] = row['anomaly_type']
+        if entry[1] == 0:
+            del anomalies[key]
+    
+    pw.io.subscribe(processed_table, on_processed)
+    pw.io.subscribe(anomalies_table, on_anomaly)
+    
+    start = time.perf_counter()
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+    elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"events:       {len(latencies)} / {expected}")
+    derived = {kind: sum(1 for anomaly_type, _ in anomalies.values() if anomaly_type == kind) for kind in DERIVED_TYPES}
+    print(f"anomalies:    {len(anomalies) - sum(derived.values())}")
+    for kind, count in derived.items():
+        print(f"{kind}: {count}")
+    print(f"elapsed:      {elapsed:.2f} s")
+    print(f"throughput:   {len(latencies) / elapsed:.0f} events/sec")
+    print(f"latency p50:  {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"latency p95:  {percentile(latencies, 95) * 1000:.1f} ms")
+    print(f"latency p99:  {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"peak RSS:     {peak_rss_mb:.0f} MB")
+    for name, stats in data_manager.buffer_stats().items():
+        print(f"buffer {name}: max depth {stats['max_depth']}/{stats['max_size']}, "
+              f"dropped {stats['dropped']}, coalesced {stats['coalesced']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Time to first token and total latency of RAG queries from concurrent operators.
+
+A local stub of an OpenAI-style streaming chat endpoint stands in for the LLM: it waits
+`--latency` seconds, then sends `--tokens` tokens `--interval` seconds apart. Questions are
+embedded by letter counts instead of a model, so only the query path is measured.
+
+"blocking" answers the operators one after another with the whole answer at once, like the
+synchronous query(). "streaming" sends them all to the QueryService at once, with distinct
+questions; "coalesced" asks every operator the same question.
+
+Usage:
+    python benchmarks/query_service.py --operators 8 --max-concurrency 4 --latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from aiohttp import web
+from processing.query_service import QueryService, StreamingChat
+from processing.rag_system import RAGSystem
+
+class LetterModel:
+    def encode(self, texts, batch_size=None):
+        return np.array([[text.lower().count(letter) + 0.01 for letter in "abcdefghijklmnopqrstuvwxyz"] for text in texts])
+
+class LetterEmbedder:
+    def __init__(self):
+        self.model = LetterModel()
+
+class StubLLM:
+    """Serves the streaming endpoint, and generate() for the blocking path, with the same timing"""
+    
+    def __init__(self, latency, interval, tokens):
+        self.latency = latency
+        self.interval = interval
+        self.tokens = [f"token{i} " for i in range(tokens)]
+        self.requests = 0
+    
+    def generate(self, prompt):
+        self.requests += 1
+        time.sleep(self.latency + self.interval * len(self.tokens))
+        return "".join(self.tokens)
+    
+    async def complete(self, request):
+        await request.json()
+        self.requests += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(self.latency)
+        for token in self.tokens:
+            await response.write(f"data: {json.dumps({'choices': [{'delta': {'content': token}}]})}\n\n".encode())
+            await asyncio.sleep(self.interval)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+    
+    def serve(self):
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        
+        async def start():
+            app = web.Application()
+            app.router.add_post("/v1/chat/completions", self.complete)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            return site._server.sockets[0].getsockname()[1]
+        return asyncio.run_coroutine_threadsafe(start(), loop).result()
+
+def percentiles(values):
+    p50, p99 = np.percentile(values, [50, 99])
+    return f"{p50:>8.2f} {p99:>8.2f}"
+
+def main():
+    parser = argparse.ArgumentParser(description='RAG query path benchmark')
+    parser.add_argument('--operators', type=int, default=8, help='queries submitted at the same time')
+    parser.add_argument('--max-concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.3, help='seconds before the LLM sends its first token')
+    parser.add_argument('--interval', type=float, default=0.03, help='seconds between tokens')
+    parser.add_argument('--tokens', type=int, default=50)
+    args = parser.parse_args()
+    
+    llm = StubLLM(args.latency, args.interval, args.tokens)
+    port = llm.serve()
+    config = {'llm': {}, 'rag': {'embedding': {'max_latency': 0.01}, 'answer_cache': {'enabled': False}}}
+    rag_system = RAGSystem(config, embedder=LetterEmbedder(), llm=llm)
+    for i in range(100):
+        rag_system.add_document({"event_time": float(i), "source": "city_sensors", "lat": 40.78, "lon": -73.96, "noise_level": 60 + i % 40})
+    rag_system.flush()
+    questions = [f"What is the noise level near sensor {'x' * i}?" for i in range(args.operators)]
+    
+    print(f"{'path':<10} {'first token p50/p99 s':>21} {'answer p50/p99 s':>18} {'LLM calls':>10}")
+    
+    # Operators queue behind each other, each waiting for a whole answer
+    start = time.perf_counter()
+    finished = []
+    for question in questions:
+        rag_system.query(question)
+        finished.append(time.perf_counter() - start)
+    print(f"{'blocking':<10} {percentiles(finished):>21} {percentiles(finished):>18} {llm.requests:>10}")
+    
+    service = QueryService(rag_system, StreamingChat("stub", "key", base_url=f"http://127.0.0.1:{port}/v1"), max_concurrency=args.max_concurrency)
+    service.start()
+    
+    async def ask(question, start):
+        first = None
+        async for _ in service.stream(question):
+            if first is None:
+                first = time.perf_counter() - start
+        return first, time.perf_counter() - start
+    
+    async def ask_all(questions):
+        start = time.perf_counter()
+        return await asyncio.gather(*[ask(question, start) for question in questions])
+    
+    for name, batch in (("streaming", questions), ("coalesced", [questions[0]] * args.operators)):
+        requests = llm.requests
+        timings = asyncio.run_coroutine_threadsafe(ask_all(batch), service.loop).result()
+        first, total = zip(*timings)
+        print(f"{name:<10} {percentiles(first):>21} {percentiles(total):>18} {llm.requests - requests:>10}")
+    
+    service.close()
+    rag_system.batcher.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Soak test of the RAG document store: memory and search latency over a simulated day.
+
+Events are added at `--rate` per second of event time with random embeddings in place of the
+model, so a day runs in minutes. Memory is measured with tracemalloc once per simulated hour
+and should level off once retention starts dropping documents.
+
+Usage:
+    python benchmarks/rag_retention.py --hours 24 --rate 20 --max-age 3600
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from processing.document_store import DocumentStore
+
+SOURCES = ('city_sensors', 'social_media', 'police_scanner')
+
+def main():
+    parser = argparse.ArgumentParser(description='RAG retention soak test')
+    parser.add_argument('--hours', type=int, default=24)
+    parser.add_argument('--rate', type=float, default=20, help='events per second of event time')
+    parser.add_argument('--max-age', type=float, default=3600)
+    parser.add_argument('--max-documents', type=int, default=None)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    store = DocumentStore.from_config({'retention': {'max_age': args.max_age, 'max_documents': args.max_documents}})
+    per_hour = int(args.rate * 3600)
+    
+    tracemalloc.start()
+    print(f"{'hour':>4} {'documents':>10} {'memory MB':>10} {'search ms':>10}")
+    for hour in range(args.hours):
+        embeddings = rng.standard_normal((per_hour, args.dim), dtype=np.float32)
+        for i in range(per_hour):
+            event_time = hour * 3600 + i / args.rate
+            doc_id = store.add({'source': SOURCES[i % len(SOURCES)], 'event_time': event_time, 'lat': 40.7, 'lon': -74.0, 'value': i})
+            store.add_embeddings([embeddings[i]], [doc_id])
+        
+        start = time.perf_counter()
+        for query in rng.standard_normal((20, args.dim), dtype=np.float32):
+            store.search(query, 5)
+        search_ms = (time.perf_counter() - start) / 20 * 1000
+        current, _ = tracemalloc.get_traced_memory()
+        print(f"{hour + 1:>4} {len(store):>10} {current / 2**20:>10.1f} {search_ms:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Index size, embedding load and retrieval quality with and without the RAG roll-up.
+
+Simulated city_sensors readings, with short bursts of anomalous readings injected, run
+through AnomalyDetector and then into two RAG systems: one indexing every processed row,
+as before the roll-up, and one indexing what Rollup.documents emits. Both then answer the
+same evaluation questions, and a question counts as a hit if any of its top k documents
+is relevant to it:
+
+    anomaly  "Was there unusual noise near <lat>, <lon> in the last hour?"
+             relevant: a document from the burst's cell that reports its anomaly
+    state    "What is the crowd density near <lat>, <lon> in the last 15 minutes?"
+             relevant: a document from the sensor's cell, from the last 15 minutes
+    open     "Where was crowd density abnormally high?"
+             relevant: any document reporting a burst of that metric
+
+`--embedder hashing` embeds with a bag-of-words HashingVectorizer for machines without
+sentence-transformers; its hit rates are lower than the model's, but compare the same way.
+
+Usage:
+    python benchmarks/rollup.py --sensors 200 --hours 2 --interval 5 --bursts 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pathway as pw
+from data_sources.base import StreamSchema
+from processing.anomaly_detection import AnomalyDetector
+from processing.rag_system import RAGSystem
+from processing.rollup import Rollup
+from processing.spatial import SpatialGrid
+
+BOUNDS = (40.70, -74.00, 40.80, -73.90)
+# Metric, normal range, burst value, and how questions name it
+METRICS = {
+    'noise_level': ((45.0, 70.0), 95.0, "noise"),
+    'crowd_density': ((0.1, 0.6), 0.95, "crowd density")
+}
+
+class HashingModel:
+    """Bag-of-words embeddings, for machines without the sentence-transformers model"""
+    def __init__(self, dim: int = 384):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.vectorizer = HashingVectorizer(n_features=dim, alternate_sign=False, token_pattern=r"[a-z]+")
+    
+    def encode(self, texts, batch_size=None):
+        return self.vectorizer.transform(texts).toarray().astype(np.float32)
+
+class HashingEmbedder:
+    def __init__(self):
+        self.model = HashingModel()
+
+class NoLLM:
+    def generate(self, prompt):
+        raise RuntimeError("Only retrieval is benchmarked")
+
+def simulate(args, rng):
+    """Returns StreamSchema rows, and (sensor, metric, start time) of each burst"""
+    columns = StreamSchema.column_names()
+    sensors = np.column_stack([
+        rng.uniform(BOUNDS[0], BOUNDS[2], args.sensors),
+        rng.uniform(BOUNDS[1], BOUNDS[3], args.sensors)
+    ])
+    duration = args.hours * 3600
+    bursts = [
+        (int(rng.integers(args.sensors)), list(METRICS)[i % len(METRICS)], float(rng.uniform(0, duration - args.burst_length * args.interval)))
+        for i in range(args.bursts)
+    ]
+    bursting = {}
+    for sensor, metric, start in bursts:
+        for step in range(args.burst_length):
+            bursting[(sensor, int(start // args.interval) + step)] = metric
+    
+    rows = []
+    for step in range(int(duration / args.interval)):
+        for sensor, (lat, lon) in enumerate(sensors):
+            row = dict.fromkeys(columns)
+            event_time = step * args.interval + rng.uniform(0, args.interval)
+            row.update(
+                timestamp=f"{event_time:012.3f}",
+                event_time=event_time,
+                source="city_sensors",
+                lat=float(lat),
+                lon=float(lon),
+                traffic_flow=float(rng.uniform(0.3, 0.9))
+            )
+            for metric, ((low, high), burst, _) in METRICS.items():
+                row[metric] = burst if bursting.get((sensor, step)) == metric else float(rng.uniform(low, high))
+            rows.append(tuple(row[name] for name in columns))
+    return rows, sensors, bursts
+
+def questions(args, rng, sensors, bursts, duration):
+    """Returns (kind, question, is_relevant(doc)) for the evaluation set"""
+    grid = SpatialGrid(15)
+    evaluation = []
+    for sensor, metric, start in bursts:
+        lat, lon = sensors[sensor]
+        cell = grid.cell(lat, lon)
+        evaluation.append((
+            "anomaly",
+            f"Was there unusual {METRICS[metric][2]} near {lat:.5f}, {lon:.5f} in the last {args.hours} hours?",
+            lambda doc, cell=cell, metric=metric: grid.cell(doc['lat'], doc['lon']) == cell and metric in (doc.get('anomaly_type') or doc.get('anomaly_types') or "")
+        ))
+    for sensor in rng.choice(len(sensors), size=args.questions, replace=False):
+        lat, lon = sensors[sensor]
+        cell = grid.cell(lat, lon)
+        evaluation.append((
+            "state",
+            f"What is the crowd density near {lat:.5f}, {lon:.5f} in the last 15 minutes?",
+            lambda doc, cell=cell: grid.cell(doc['lat'], doc['lon']) == cell and doc['event_time'] >= duration - 900
+                and ('crowd_density' in doc or 'crowd_density' in doc.get('summary', ""))
+        ))
+    for metric, (_, _, name) in METRICS.items():
+        evaluation.append((
+            "open",
+            f"Where was {name} abnormally high?",
+            lambda doc, metric=metric: metric in (doc.get('anomaly_type') or doc.get('anomaly_types') or "")
+        ))
+    return evaluation
+
+def main():
+    parser = argparse.ArgumentParser(description='RAG roll-up benchmark')
+    parser.add_argument('--sensors', type=int, default=200)
+    parser.add_argument('--hours', type=float, default=2)
+    parser.add_argument('--interval', type=float, default=5, help='seconds between readings of a sensor')
+    parser.add_argument('--bursts', type=int, default=20)
+    parser.add_argument('--burst-length', type=int, default=6, help='anomalous readings per burst')
+    parser.add_argument('--window', type=float, default=300, help='roll-up window in seconds')
+    parser.add_argument('--questions', type=int, default=20, help='state questions')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--embedder', choices=['model', 'hashing'], default='model')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    rows, sensors, bursts = simulate(args, rng)
+    duration = args.hours * 3600
+    print(f"{len(rows)} readings from {args.sensors} sensors over {args.hours} h, {args.bursts} anomaly bursts")
+    
+    config = {
+        'anomaly_rules': {'noise_level': 80, 'crowd_density': 0.8, 'traffic_flow': 0.2},
+        'llm': {},
+        'rag': {
+            'embedding': {'batch_size': 256, 'cache': {'enabled': False}},
+            'index': {'type': 'flat'},
+            'prefilter': {'radius': 300},
+            'rollup': {'window': args.window}
+        }
+    }
+    table = pw.debug.table_from_rows(schema=StreamSchema, rows=rows)
+    processed = AnomalyDetector(config).process(table)
+    tables = {"raw": processed, "rollup": Rollup(config).documents(processed)}
+    
+    systems = {}
+    for name, documents in tables.items():
+        start = time.perf_counter()
+        frame = pw.debug.table_to_pandas(documents).sort_values("event_time")
+        pipeline_seconds = time.perf_counter() - start
+        
+        # Added in event-time order, as a live stream delivers them
+        embedder = HashingEmbedder() if args.embedder == 'hashing' else None
+        systems[name] = RAGSystem(config, embedder=embedder, llm=NoLLM())
+        for row in frame.to_dict("records"):
+            systems[name].add_document({column: None if value != value else value for column, value in row.items()})
+        systems[name].flush()
+        print(f"{name}: pipeline {pipeline_seconds:.1f} s, {len(frame)} documents")
+    
+    evaluation = questions(args, rng, sensors, bursts, duration)
+    kinds = list(dict.fromkeys(kind for kind, _, _ in evaluation))
+    print(f"\n{'index':>7} {'documents':>10} {'embedded':>9} {'embed s':>8} " + " ".join(f"{kind + ' hit':>12}" for kind in kinds) + f" {'events/ctx':>11}")
+    for name, rag_system in systems.items():
+        hits = dict.fromkeys(kinds, 0)
+        totals = dict.fromkeys(kinds, 0)
+        covered = []
+        for kind, question, relevant in evaluation:
+            _, _, results = rag_system.retrieve(question, args.k)
+            totals[kind] += 1
+            hits[kind] += any(relevant(doc) for _, doc, _ in results)
+            # Events the LLM's context describes
+            covered.append(sum(doc.get('events', 1) for _, doc, _ in results))
+        embedding = rag_system.stats()['embedding']
+        print(
+            f"{name:>7} {len(rag_system.documents):>10} {embedding['documents']:>9} {embedding['embed_seconds']:>8.1f} "
+            + " ".join(f"{hits[kind] / totals[kind]:>12.2f}" for kind in kinds)
+            + f" {np.mean(covered):>11.0f}"
+        )
+        rag_system.batcher.close()
+
+if __name__ == "__main__":
+    main()
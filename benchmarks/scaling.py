@@ -0,0 +1,114 @@
+"""Run the anomaly pipeline with 1, 2, 4 and 8 workers and check the anomalies match.
+
+Events are partitioned by grid cell, so each worker owns the detector state of its cells.
+Each run is a separate `pathway spawn` of this script, with the workers as processes
+(the default) or as threads of one process.
+
+Usage:
+    python benchmarks/scaling.py --events 200000 --workers 1 2 4 8 --mode processes
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+CONFIG = {
+    'anomaly_rules': {'noise_level': 80, 'crowd_density': 0.8, 'traffic_flow': 0.2, 'social_media_spike': 10},
+    'spike_detection': {'window': 60, 'allowed_lateness': 3600},
+    'statistical_detectors': {'metrics': {'noise_level': {'detector': 'ewma', 'threshold': 4, 'warmup': 20}}}
+}
+
+def write_events(path, events, cells, seed):
+    rng = random.Random(seed)
+    locations = [(rng.uniform(40.5, 40.9), rng.uniform(-74.2, -73.7)) for _ in range(cells)]
+    with open(path, 'w') as f:
+        f.write("timestamp,event_time,source,lat,lon,text,noise_level,crowd_density,traffic_flow,anomaly\n")
+        for i in range(events):
+            lat, lon = locations[rng.randrange(cells)]
+            event_time = i * 0.01
+            if rng.random() < 0.3:
+                f.write(f"{event_time},{event_time},twitter,{lat},{lon},fire on main street,,,,\n")
+            else:
+                noise = rng.uniform(81, 100) if rng.random() < 0.01 else rng.gauss(60, 3)
+                f.write(f"{event_time},{event_time},city_sensors,{lat},{lon},,{noise:.2f},"
+                        f"{rng.uniform(0, 0.8):.3f},{rng.uniform(0.2, 1):.3f},\n")
+
+def run_child(input_path, output_path):
+    """Builds and runs the pipeline in this process, as one of the spawned workers"""
+    import pathway as pw
+    from processing.anomaly_detection import AnomalyDetector
+    
+    class EventSchema(pw.Schema):
+        timestamp: str
+        event_time: float
+        source: str
+        lat: float
+        lon: float
+        text: Optional[str]
+        noise_level: Optional[float]
+        crowd_density: Optional[float]
+        traffic_flow: Optional[float]
+        anomaly: Optional[bool]
+    
+    detector = AnomalyDetector(CONFIG)
+    table = detector.partition(pw.io.csv.read(input_path, schema=EventSchema, mode="static"))
+    anomalies = detector.process(table).filter(pw.this.anomaly)
+    pw.io.jsonlines.write(
+        anomalies.select(pw.this.timestamp, pw.this.source, pw.this.lat, pw.this.lon, pw.this.anomaly_type, pw.this.anomaly_description),
+        output_path
+    )
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+
+def read_anomalies(path):
+    with open(path) as f:
+        rows = [json.loads(line) for line in f]
+    # Only the final state of each row counts
+    return sorted(
+        json.dumps({k: v for k, v in row.items() if k not in ('time', 'diff')}, sort_keys=True)
+        for row in rows if row.get('diff', 1) == 1
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Anomaly pipeline worker scaling benchmark')
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--cells', type=int, default=5000, help='distinct locations the events come from')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--mode', choices=['processes', 'threads'], default='processes')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', nargs=2, metavar=('INPUT', 'OUTPUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        run_child(*args.child)
+        return
+    
+    directory = tempfile.mkdtemp(prefix='scaling_')
+    input_path = os.path.join(directory, 'events.csv')
+    write_events(input_path, args.events, args.cells, args.seed)
+    print(f"{os.cpu_count()} CPUs, {args.events} events, workers as {args.mode}")
+    print(f"{'workers':>7} {'seconds':>8} {'events/sec':>11} {'speedup':>8} {'anomalies':>10} {'same output':>12}")
+    
+    baseline, reference = None, None
+    for workers in args.workers:
+        output_path = os.path.join(directory, f'anomalies_{workers}.jsonl')
+        flag = '--processes' if args.mode == 'processes' else '--threads'
+        command = ['pathway', 'spawn', flag, str(workers), sys.executable, __file__, '--child', input_path, output_path]
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        
+        anomalies = read_anomalies(output_path)
+        if baseline is None:
+            baseline, reference = elapsed, anomalies
+        print(f"{workers:>7} {elapsed:>8.2f} {args.events / elapsed:>11.0f} {baseline / elapsed:>7.2f}x "
+              f"{len(anomalies):>10} {str(anomalies == reference):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measure cell index cost and per-cell state memory and lookup cost at 1M cells.
+
+Usage:
+    python benchmarks/spatial.py --cells 1000000 --resolution 15 --max-memory-mb 64
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from processing.spatial import CellStateStore, SpatialGrid
+
+def per_call_us(fn, args):
+    start = time.perf_counter()
+    for a in args:
+        fn(*a)
+    return (time.perf_counter() - start) / len(args) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description='Spatial grid and cell state benchmark')
+    parser.add_argument('--cells', type=int, default=1000000)
+    parser.add_argument('--resolution', type=int, default=15)
+    parser.add_argument('--max-memory-mb', type=float, default=None, help='memory cap for the capped run')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    grid = SpatialGrid(args.resolution)
+    rng = random.Random(args.seed)
+    locations = [(rng.uniform(-60, 60), rng.uniform(-180, 180)) for _ in range(200000)]
+    
+    string_key_us = per_call_us(lambda lat, lon: f"{lat:.2f},{lon:.2f}", locations)
+    cell_us = per_call_us(grid.cell, locations)
+    cells = [grid.cell(lat, lon) for lat, lon in locations]
+    neighbours_us = per_call_us(grid.neighbours, [(cell,) for cell in cells])
+    print(f"string key:        {string_key_us:.2f} us/event")
+    print(f"integer cell:      {cell_us:.2f} us/event")
+    print(f"3x3 neighbours:    {neighbours_us:.2f} us/cell")
+    
+    # Distinct cells in row-major order over the grid
+    ids = [grid.cell((i // 4096) * grid.lat_step - 80, (i % 4096) * grid.lon_step) for i in range(args.cells)]
+    
+    store = CellStateStore(ttl=3600)
+    start = time.perf_counter()
+    for i, cell in enumerate(ids):
+        store.put(cell, [0.0, 0.0], now=i * 1e-3)
+    put_us = (time.perf_counter() - start) / args.cells * 1e6
+    
+    # Memory of a second, identical store, traced separately so tracing does not skew the timings
+    tracemalloc.start()
+    traced_store = CellStateStore(ttl=3600)
+    for i, cell in enumerate(ids):
+        traced_store.put(cell, [0.0, 0.0], now=i * 1e-3)
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced_store
+    
+    sample = [(rng.choice(ids),) for _ in range(200000)]
+    get_us = per_call_us(lambda cell: store.get(cell, now=args.cells * 1e-3), sample)
+    print(f"cells stored:      {len(store)}")
+    print(f"state memory:      {traced / 2**20:.0f} MiB traced, {store.bytes / 2**20:.0f} MiB estimated "
+          f"({traced / len(store):.0f} bytes/cell)")
+    print(f"put:               {put_us:.2f} us")
+    print(f"get:               {get_us:.2f} us")
+    
+    if args.max_memory_mb:
+        capped = CellStateStore(ttl=3600, max_bytes=int(args.max_memory_mb * 2**20))
+        for i, cell in enumerate(ids):
+            capped.put(cell, [0.0, 0.0], now=i * 1e-3)
+        stats = capped.stats()
+        print(f"capped store:      {stats['cells']} cells, {stats['bytes'] / 2**20:.1f} MiB, {stats['evicted']} evicted")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import importlib
+
+# streamlit, plotly and pandas are only imported when the dashboard is used
+_EXPORTS = {
+    'Dashboard': '.dashboard'
+}
+
+__all__ = ['Dashboard']
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
@@ -1,13 +1,22 @@
+import asyncio
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from pathway import Table
 import time
-import json
 from datetime import datetime
 import pytz
 
+# Time windows offered for queries, in seconds; None reads the window from the question
+QUERY_WINDOWS = {
+    "From question": None,
+    "Last 15 minutes": 900,
+    "Last hour": 3600,
+    "Last 6 hours": 21600,
+    "Last 24 hours": 86400
+}
+
 class Dashboard:
     def __init__(self, processed_table: Table, anomalies_table: Table, rag_system, config):
         self.processed_table = processed_table
@@ -17,6 +26,13 @@ class Dashboard:
         self.mode = config['mode']
         self.map_center = config.get('output', {}).get('map_center', [40.7128, -74.0060])
         
+        # Answers queries concurrently on its own event loop, streaming tokens
+        self.query_service = None
+        if rag_system is not None:
+            from processing.query_service import QueryService
+            self.query_service = QueryService.from_config(rag_system, config)
+            self.query_service.start()
+        
         # Initialize session state
         if 'query_history' not in st.session_state:
             st.session_state.query_history = []
@@ -154,8 +170,9 @@ class Dashboard:
         # Map visualization
         self._render_map(data, anomalies)
         
-        # Query assistant
-        self._render_query_interface()
+        # Query assistant, unless the RAG system is disabled
+        if self.rag_system is not None:
+            self._render_query_interface()
     
     def _get_data(self):
         # Get latest data from Pathway tables
@@ -222,12 +239,12 @@ class Dashboard:
             display_df['timestamp'] = pd.to_datetime(display_df['timestamp'])
             display_df = display_df.sort_values('timestamp', ascending=False).head(10)
             
-            # Format data column for better readability
-            display_df['data'] = display_df['data'].apply(lambda x: json.dumps(x, indent=2))
+            # Only show the metric columns set by the displayed sources
+            display_df = display_df.drop(columns=['event_time']).dropna(axis=1, how='all')
             
             # Display data
             st.dataframe(
-                display_df[['timestamp', 'source', 'data']],
+                display_df,
                 use_container_width=True,
                 height=400
             )
@@ -245,13 +262,13 @@ class Dashboard:
             
             # Create expandable cards for each anomaly
             for _, row in display_df.iterrows():
-                with st.expander(f"{row['data']['anomaly_type']} - {row['timestamp']}"):
+                with st.expander(f"{row['anomaly_type']} - {row['timestamp']}"):
                     st.markdown(f"""
                     <div class="anomaly-alert">
-                        <strong>Anomaly Type:</strong> {row['data']['anomaly_type']}<br>
-                        <strong>Description:</strong> {row['data']['anomaly_description']}<br>
+                        <strong>Anomaly Type:</strong> {row['anomaly_type']}<br>
+                        <strong>Description:</strong> {row['anomaly_description']}<br>
                         <strong>Source:</strong> {row['source']}<br>
-                        <strong>Location:</strong> {row['location']['lat']:.4f}, {row['location']['lon']:.4f}<br>
+                        <strong>Location:</strong> {row['lat']:.4f}, {row['lon']:.4f}<br>
                         <strong>Time:</strong> {row['timestamp']}
                     </div>
                     """, unsafe_allow_html=True)
@@ -262,14 +279,9 @@ class Dashboard:
         st.markdown('<div class="section-header">Geospatial Visualization</div>', unsafe_allow_html=True)
         
         if not data_df.empty:
-            # Prepare data for mapping
-            map_df = data_df.copy()
-            map_df['lat'] = map_df['location'].apply(lambda x: x['lat'])
-            map_df['lon'] = map_df['location'].apply(lambda x: x['lon'])
-            
             # Create map
             fig = px.scatter_mapbox(
-                map_df,
+                data_df,
                 lat="lat",
                 lon="lon",
                 color="source",
@@ -283,20 +295,16 @@ class Dashboard:
             
             # Add anomaly markers
             if not anomalies_df.empty:
-                anomaly_df = anomalies_df.copy()
-                anomaly_df['lat'] = anomaly_df['location'].apply(lambda x: x['lat'])
-                anomaly_df['lon'] = anomaly_df['location'].apply(lambda x: x['lon'])
-                
                 fig.add_trace(go.Scattermapbox(
-                    lat=anomaly_df['lat'],
-                    lon=anomaly_df['lon'],
+                    lat=anomalies_df['lat'],
+                    lon=anomalies_df['lon'],
                     mode='markers',
                     marker=dict(
                         size=15,
                         color='red',
                         opacity=0.8
                     ),
-                    text=anomaly_df['data'].apply(lambda x: f"Anomaly: {x['anomaly_type']}"),
+                    text="Anomaly: " + anomalies_df['anomaly_type'].fillna("reported"),
                     hoverinfo='text',
                     name='Anomalies'
                 ))
@@ -308,31 +316,47 @@ class Dashboard:
     def _render_query_interface(self):
         st.markdown('<div class="section-header">Query Assistant</div>', unsafe_allow_html=True)
         
+        # Embedding cache effectiveness
+        cache_stats = self.rag_system.stats()["cache"]
+        if cache_stats is not None:
+            st.caption(
+                f"Embedding cache: {cache_stats['hit_rate']:.0%} hit rate, "
+                f"{cache_stats['misses']} documents embedded, {cache_stats['disk_entries']} on disk"
+            )
+        
         # Query input
         query = st.text_input("Ask a question about the current situation:", 
                              placeholder="e.g., What is the situation at Central Park?")
         
+        # Optional place and time window; left unset, they are read from the question
+        places = self.config.get('rag', {}).get('places', {})
+        col1, col2 = st.columns(2)
+        with col1:
+            place = st.selectbox("Near", ["From question"] + list(places))
+        with col2:
+            window = st.selectbox("Time window", list(QUERY_WINDOWS))
+        
         # Submit button
         if st.button("Submit Query"):
             if query:
-                with st.spinner("Processing your query..."):
-                    response = self.rag_system.query(query)
-                    
-                    # Add to query history
-                    st.session_state.query_history.append({
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "query": query,
-                        "response": response
-                    })
-                    
-                    # Display response
-                    st.markdown(f"""
-                    <div class="query-response">
-                        <strong>Query:</strong> {query}<br><br>
-                        <strong>Response:</strong><br>
-                        {response}
-                    </div>
-                    """, unsafe_allow_html=True)
+                # Tokens are shown as the LLM produces them; other operators' queries run alongside
+                st.markdown(f"**Query:** {query}")
+                try:
+                    response = st.write_stream(self.query_service.stream_sync(
+                        query,
+                        near=places.get(place),
+                        window=QUERY_WINDOWS[window]
+                    ))
+                except asyncio.TimeoutError:
+                    st.error("The assistant took too long to answer; please try again.")
+                    return
+                
+                # Add to query history
+                st.session_state.query_history.append({
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "query": query,
+                    "response": response
+                })
         
         # Query history
         if st.session_state.query_history:
@@ -1,3 +0,0 @@
-from .dashboard import Dashboard
-
-__all__ = ['Dashboard']
@@ -0,0 +1,33 @@
+import importlib
+
+# Sources are imported on first use, so a run only loads the sources it enables
+_EXPORTS = {
+    'DataSource': '.base',
+    'DataSourceManager': '.base',
+    'SocialMediaSource': '.public_safety',
+    'PublicSafetySource': '.public_safety',
+    'IoTSensorSource': '.public_safety',
+    'TransitSource': '.urban_planning',
+    'TrafficSource': '.urban_planning',
+    'EnvironmentSource': '.urban_planning',
+    'ReplaySource': '.replay',
+    'LogTailSource': '.log_tail'
+}
+
+__all__ = [
+    'DataSource', 
+    'DataSourceManager',
+    'SocialMediaSource', 
+    'PublicSafetySource', 
+    'IoTSensorSource',
+    'TransitSource',
+    'TrafficSource',
+    'EnvironmentSource',
+    'ReplaySource',
+    'LogTailSource'
+]
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
@@ -1,9 +1,208 @@
 import pathway as pw
+import datetime
+import queue
+import random
+import threading
+import time
+import typing
 from abc import ABC, abstractmethod
+from typing import Optional
+from .buffering import IngestionBuffer
+
+class EventSchema(pw.Schema):
+    """Columns shared by every source"""
+    timestamp: str
+    event_time: float
+    source: str
+    lat: float
+    lon: float
+
+class StreamSchema(EventSchema):
+    """Combined stream of all sources; columns a source does not produce are null"""
+    # Social media
+    text: Optional[str]
+    user: Optional[str]
+    hashtags: Optional[list[str]]
+    # Public safety incidents
+    incident_type: Optional[str]
+    priority: Optional[int]
+    description: Optional[str]
+    # IoT sensors
+    noise_level: Optional[float]
+    crowd_density: Optional[float]
+    traffic_flow: Optional[float]
+    anomaly: Optional[bool]
+    # Transit
+    route_id: Optional[str]
+    delay: Optional[float]
+    passenger_count: Optional[int]
+    vehicle_lat: Optional[float]
+    vehicle_lon: Optional[float]
+    # Traffic
+    congestion_level: Optional[float]
+    average_speed: Optional[float]
+    incident_count: Optional[int]
+    # Environment
+    air_quality_index: Optional[float]
+    temperature: Optional[float]
+
+# Optional entry of an event with the source's position of it, such as a file offset; it is
+# handed back to DataSource._committed rather than sent to the engine
+POSITION = '_position'
+
+def _numeric_columns(schema):
+    columns = {}
+    for name, hint in schema.typehints().items():
+        types = [t for t in typing.get_args(hint) if t is not type(None)] or [hint]
+        if types[0] in (int, float):
+            columns[name] = types[0]
+    return columns
+
+# Numeric columns and their types, used to coerce recorded or polled values
+_NUMERIC_COLUMNS = _numeric_columns(StreamSchema)
+
+# Nested event fields whose column name differs
+_FIELD_ALIASES = {'type': 'incident_type'}
+
+def parse_event_time(timestamp):
+    """Returns epoch seconds for an ISO timestamp (naive means UTC) or a number"""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    # fromisoformat only accepts a trailing Z from Python 3.11
+    if timestamp.endswith(('Z', 'z')):
+        timestamp = timestamp[:-1] + '+00:00'
+    parsed = datetime.datetime.fromisoformat(timestamp)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+def flatten_event(event):
+    """Converts a nested {timestamp, source, data, location} event to a StreamSchema row"""
+    row = dict.fromkeys(StreamSchema.column_names())
+    
+    data = dict(event.get('data') or {})
+    vehicle = data.pop('vehicle_location', None)
+    if vehicle:
+        row['vehicle_lat'], row['vehicle_lon'] = vehicle['lat'], vehicle['lon']
+    for key, value in data.items():
+        key = _FIELD_ALIASES.get(key, key)
+        if key in row:
+            row[key] = value
+    
+    row['timestamp'] = str(event['timestamp'])
+    row['event_time'] = parse_event_time(event['timestamp'])
+    row['source'] = event['source']
+    row['lat'] = event['location']['lat']
+    row['lon'] = event['location']['lon']
+    
+    for name, numeric_type in _NUMERIC_COLUMNS.items():
+        if row[name] is not None:
+            row[name] = numeric_type(row[name])
+    return row
+
+class _BatchingSubject(pw.io.python.ConnectorSubject):
+    """Collects events from a source and pushes them to the engine in batches"""
+    
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+        
+        # Bounded so a source cannot outrun the engine without limit
+        self.buffer = IngestionBuffer.from_config(
+            source.source_config.get('buffer', {}),
+            default_size=source.max_batch_size * 4,
+            on_discard=self._discarded
+        )
+    
+    def _discarded(self, event):
+        position = event.get(POSITION)
+        if position is not None:
+            self.source._discarded(position)
+    
+    def _produce(self):
+        try:
+            for event in self.source._stream():
+                self.buffer.put(event)
+        finally:
+            self.buffer.close()
+    
+    def run(self):
+        producer = threading.Thread(target=self._produce, daemon=True)
+        producer.start()
+        
+        max_batch_size = self.source.max_batch_size
+        linger = self.source.linger_ms / 1000.0
+        finished = False
+        
+        while not finished:
+            # Block until the first event of the batch arrives
+            try:
+                batch = [self.buffer.get()]
+            except EOFError:
+                break
+            
+            # Keep collecting until the batch is full or the linger time is up
+            deadline = time.monotonic() + linger
+            while len(batch) < max_batch_size:
+                try:
+                    batch.append(self.buffer.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+                except EOFError:
+                    finished = True
+                    break
+            
+            # Buffer policies may drop or replace events, so positions travel with the events
+            positions = []
+            for event in batch:
+                positions.append(event.pop(POSITION, None))
+                self.next(**event)
+            self.commit()
+            self.source._committed(positions)
+        
+        # The stream has ended and every event is committed
+        self.source._committed([])
 
 class DataSource(ABC):
+    name = None
+    
     def __init__(self, config):
         self.config = config
+        self.source_config = config.get('data_sources', {}).get(self.name, {})
+        
+        # Micro-batching: rows are handed to the engine with one commit per batch
+        batching = self.source_config.get('batching', {})
+        self.max_batch_size = batching.get('max_batch_size', 1000)
+        self.linger_ms = batching.get('linger_ms', 50)
+        
+        # Live HTTP polling replaces simulated data when enabled
+        self.polling = self.source_config.get('polling', {}).get('enabled', False)
+        
+        # Created by get_stream
+        self.subject = None
+        
+        # Load generation: seeded, rate-controlled synthetic events for load tests
+        load = self.source_config.get('load_generation', {})
+        self.load_generation = load.get('enabled', False)
+        self.random = random.Random(f"{load['seed']}:{self.name}" if 'seed' in load else None)
+        self.events_per_second = load.get('events_per_second', 0)
+        self.max_events = load.get('max_events')
+        self.emitted = 0
+        self.started = None
+        
+        # Fixed sensor positions spread over the bounding box (min_lat, min_lon, max_lat, max_lon)
+        min_lat, min_lon, max_lat, max_lon = load.get('bounds', [40.7, -74.0, 40.8, -73.9])
+        self.bounds = (min_lat, min_lon, max_lat, max_lon)
+        self.sensors = [
+            (self.random.uniform(min_lat, max_lat), self.random.uniform(min_lon, max_lon))
+            for _ in range(load.get('sensors', 100) if self.load_generation else 0)
+        ]
+        
+        # Anomaly bursts: `length` consecutive events out of every `every` come from one sensor
+        bursts = load.get('anomaly_bursts', {})
+        self.burst_every = bursts.get('every', 0)
+        self.burst_length = bursts.get('length', 0)
+        
         self.schema = self._define_schema()
     
     @abstractmethod
@@ -11,8 +210,84 @@ class DataSource(ABC):
         pass
     
     @abstractmethod
-    def get_stream(self):
+    def _stream(self):
+        pass
+    
+    def _committed(self, positions):
+        """Called with the POSITION of each event the engine committed, in order, and with none once
+        the stream has ended; sources that checkpoint positions override it"""
+        pass
+    
+    def _discarded(self, position):
+        """Called with the POSITION of an event the ingestion buffer dropped or replaced"""
         pass
+    
+    def _event(self, source, location=None, **fields):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        location = location or self._location()
+        return {
+            "timestamp": now.replace(tzinfo=None).isoformat(),
+            "event_time": now.timestamp(),
+            "source": source,
+            "lat": location["lat"],
+            "lon": location["lon"],
+            **fields
+        }
+    
+    def _more_events(self):
+        return self.max_events is None or self.emitted < self.max_events
+    
+    def _in_burst(self):
+        return self.load_generation and self.burst_every > 0 and self.emitted % self.burst_every < self.burst_length
+    
+    def _location(self):
+        if self.load_generation:
+            if self._in_burst():
+                lat, lon = self.sensors[(self.emitted // self.burst_every) % len(self.sensors)]
+            else:
+                lat, lon = self.random.choice(self.sensors)
+            return {"lat": lat, "lon": lon}
+        
+        min_lat, min_lon, max_lat, max_lon = self.bounds
+        return {
+            "lat": self.random.uniform(min_lat, max_lat),
+            "lon": self.random.uniform(min_lon, max_lon)
+        }
+    
+    def _pace(self, seconds):
+        """Waits between simulated events; in load generation mode holds events_per_second instead"""
+        if self.started is None:
+            self.started = time.monotonic()
+        self.emitted += 1
+        if not self.load_generation:
+            time.sleep(seconds)
+        elif self.events_per_second:
+            ahead = self.started + self.emitted / self.events_per_second - time.monotonic()
+            if ahead > 0:
+                time.sleep(ahead)
+    
+    def _poll(self, event_source, urls):
+        from .http_polling import Endpoint, HttpPoller, events_from_payload
+        
+        poller = HttpPoller.shared(self.config.get('http', {}))
+        endpoints = [Endpoint.from_config(url, self.source_config) for url in urls]
+        columns = self.schema.column_names()
+        for _, payload in poller.poll(endpoints):
+            for event in events_from_payload(payload, event_source):
+                row = flatten_event(event)
+                yield {name: row[name] for name in columns}
+    
+    def buffer_stats(self):
+        return self.subject.buffer.stats() if self.subject else None
+    
+    def get_stream(self):
+        # Commits are issued by the subject after each batch
+        self.subject = _BatchingSubject(self)
+        return pw.io.python.read(
+            self.subject,
+            schema=self.schema,
+            autocommit_duration_ms=None
+        )
 
 class DataSourceManager:
     def __init__(self, config):
@@ -45,7 +320,28 @@ class DataSourceManager:
                 from .urban_planning import EnvironmentSource
                 sources.append(EnvironmentSource(self.config))
         
+        # Recorded captures can be replayed in either mode
+        if self.config['data_sources'].get('replay', {}).get('enabled', False):
+            from .replay import ReplaySource
+            sources.append(ReplaySource(self.config))
+        
+        # Production feeds written to rotating log files
+        if self.config['data_sources'].get('log_tail', {}).get('enabled', False):
+            from .log_tail import LogTailSource
+            sources.append(LogTailSource(self.config))
+        
         return sources
     
+    def buffer_stats(self):
+        """Queue depth and drop/coalesce counts of each source's ingestion buffer"""
+        return {source.name: source.buffer_stats() for source in self.sources}
+    
     def get_streams(self):
-        return [source.get_stream() for source in self.sources]
+        return [self._conform(source.get_stream()) for source in self.sources]
+    
+    @staticmethod
+    def _conform(table):
+        # Add the columns a source does not produce so every stream has StreamSchema's columns
+        columns = table.schema.column_names()
+        missing = {name: None for name in StreamSchema.column_names() if name not in columns}
+        return table.with_columns(**missing).update_types(**StreamSchema.typehints())
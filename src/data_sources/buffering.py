@@ -0,0 +1,121 @@
+import collections
+import queue
+import threading
+import time
+
+# Buffer policies when the engine falls behind
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+
+class IngestionBuffer:
+    """Bounded buffer between a source thread and the engine.
+
+    block: the source waits for space
+    drop_oldest: the oldest buffered event is discarded
+    coalesce: an event replaces the buffered one with the same key; when full, the oldest is discarded
+    
+    `on_discard` is called with every event dropped or replaced, under the buffer's lock.
+    """
+    
+    def __init__(self, max_size=4000, policy=BLOCK, key_columns=None, on_discard=None):
+        if policy not in (BLOCK, DROP_OLDEST, COALESCE):
+            raise ValueError(f"Unknown buffer policy: {policy}")
+        if policy == COALESCE and not key_columns:
+            raise ValueError("The coalesce policy needs key_columns")
+        
+        self.max_size = max_size
+        self.policy = policy
+        self.key_columns = tuple(key_columns or ())
+        self.on_discard = on_discard
+        
+        # Coalescing keeps events in insertion order, keyed so they can be replaced in place
+        self.events = collections.OrderedDict() if policy == COALESCE else collections.deque()
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.closed = False
+        
+        self.received = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+    
+    @classmethod
+    def from_config(cls, buffer_config, default_size, on_discard=None):
+        return cls(
+            max_size=buffer_config.get('max_size', default_size),
+            policy=buffer_config.get('policy', BLOCK),
+            key_columns=buffer_config.get('key_columns'),
+            on_discard=on_discard
+        )
+    
+    def put(self, event):
+        with self.lock:
+            self.received += 1
+            if self.policy == COALESCE:
+                key = tuple(event[column] for column in self.key_columns)
+                if key in self.events:
+                    if self.on_discard is not None:
+                        self.on_discard(self.events[key])
+                    self.events[key] = event
+                    self.coalesced += 1
+                    return
+            elif self.policy == BLOCK:
+                while len(self.events) >= self.max_size:
+                    self.not_full.wait()
+            
+            if len(self.events) >= self.max_size:
+                self._drop_oldest()
+            
+            if self.policy == COALESCE:
+                self.events[key] = event
+            else:
+                self.events.append(event)
+            self.max_depth = max(self.max_depth, len(self.events))
+            self.not_empty.notify()
+    
+    def _drop_oldest(self):
+        if self.policy == COALESCE:
+            _, event = self.events.popitem(last=False)
+        else:
+            event = self.events.popleft()
+        self.dropped += 1
+        if self.on_discard is not None:
+            self.on_discard(event)
+    
+    def get(self, timeout=None):
+        """Returns the oldest event; raises queue.Empty on timeout and EOFError once closed and drained"""
+        with self.lock:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self.events:
+                if self.closed:
+                    raise EOFError
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self.not_empty.wait(remaining)
+            
+            if self.policy == COALESCE:
+                _, event = self.events.popitem(last=False)
+            else:
+                event = self.events.popleft()
+            self.not_full.notify()
+            return event
+    
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.not_empty.notify_all()
+    
+    def stats(self):
+        with self.lock:
+            return {
+                "policy": self.policy,
+                "depth": len(self.events),
+                "max_depth": self.max_depth,
+                "max_size": self.max_size,
+                "received": self.received,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced
+            }
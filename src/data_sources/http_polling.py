@@ -0,0 +1,188 @@
+import asyncio
+import collections
+import datetime
+import logging
+import queue
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class Endpoint:
+    def __init__(self, url, headers=None, params=None, interval=10.0, jitter=0.2, max_concurrency=1):
+        self.url = url
+        self.headers = headers or {}
+        self.params = params or {}
+        self.interval = interval
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+    
+    @classmethod
+    def from_config(cls, url, source_config):
+        polling = source_config.get('polling', {})
+        headers = dict(polling.get('headers', {}))
+        params = dict(polling.get('params', {}))
+        
+        # API keys go either in a query parameter or in a header
+        api_key = source_config.get('api_key')
+        if api_key:
+            if polling.get('api_key_param'):
+                params[polling['api_key_param']] = api_key
+            else:
+                headers[polling.get('api_key_header', 'Authorization')] = polling.get('api_key_prefix', 'Bearer ') + api_key
+        
+        return cls(
+            url,
+            headers=headers,
+            params=params,
+            interval=polling.get('interval', 10.0),
+            jitter=polling.get('jitter', 0.2),
+            max_concurrency=polling.get('max_concurrency', 1)
+        )
+    
+    def next_delay(self):
+        # Spread polls so feeds with equal intervals do not fire in lockstep
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+class PollStats:
+    def __init__(self, max_samples=10000):
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.latencies = collections.deque(maxlen=max_samples)
+    
+    def record(self, latency):
+        self.requests += 1
+        self.latencies.append(latency)
+    
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+class HttpPoller:
+    """Polls HTTP endpoints from one asyncio loop over a shared keep-alive connection pool"""
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, pool_size=20, keepalive_timeout=30, request_timeout=10):
+        import aiohttp
+        
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self.stats = PollStats()
+        
+        # (ETag, Last-Modified) of the last successful response per URL
+        self.validators = {}
+        
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.session = asyncio.run_coroutine_threadsafe(self._create_session(aiohttp), self.loop).result()
+    
+    @classmethod
+    def shared(cls, settings=None):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(**(settings or {}))
+            return cls._shared
+    
+    async def _create_session(self, aiohttp):
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=self.keepalive_timeout)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+        )
+    
+    def poll(self, endpoints):
+        """Yields (endpoint, payload) for every changed response until the generator is closed"""
+        results = queue.Queue()
+        futures = [
+            asyncio.run_coroutine_threadsafe(self._poll_endpoint(endpoint, results), self.loop)
+            for endpoint in endpoints
+        ]
+        try:
+            while True:
+                yield results.get()
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    async def _poll_endpoint(self, endpoint, results):
+        # Each endpoint has its own loop and limit so a slow upstream only delays itself
+        semaphore = asyncio.Semaphore(endpoint.max_concurrency)
+        tasks = set()
+        try:
+            while True:
+                await semaphore.acquire()
+                task = asyncio.ensure_future(self._fetch(endpoint, results))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: semaphore.release())
+                await asyncio.sleep(endpoint.next_delay())
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _fetch(self, endpoint, results):
+        import aiohttp
+        
+        headers = dict(endpoint.headers)
+        etag, last_modified = self.validators.get(endpoint.url, (None, None))
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        
+        start = time.perf_counter()
+        try:
+            async with self.session.get(endpoint.url, headers=headers, params=endpoint.params) as response:
+                if response.status == 304:
+                    self.stats.not_modified += 1
+                    return
+                response.raise_for_status()
+                payload = await response.json(content_type=None)
+                self.validators[endpoint.url] = (
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified')
+                )
+            results.put((endpoint, payload))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.stats.errors += 1
+            logger.warning("Polling %s failed: %s", endpoint.url, e)
+        finally:
+            self.stats.record(time.perf_counter() - start)
+    
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+def events_from_payload(payload, source):
+    """Converts a feed response (a record or a list of records) to stream events"""
+    if isinstance(payload, dict):
+        records = payload.get('records', [payload])
+    else:
+        records = payload
+    
+    for record in records:
+        location = record.get('location') or {'lat': record.get('lat'), 'lon': record.get('lon')}
+        if location.get('lat') is None or location.get('lon') is None:
+            continue
+        
+        data = record.get('data')
+        if data is None:
+            data = {k: v for k, v in record.items() if k not in ('timestamp', 'source', 'location', 'lat', 'lon')}
+        
+        yield {
+            "timestamp": record.get('timestamp') or datetime.datetime.utcnow().isoformat(),
+            "source": source,
+            "data": data,
+            "location": {
+                "lat": float(location['lat']),
+                "lon": float(location['lon'])
+            }
+        }
@@ -1,14 +0,0 @@
-from .base import DataSource, DataSourceManager
-from .public_safety import SocialMediaSource, PublicSafetySource, IoTSensorSource
-from .urban_planning import TransitSource, TrafficSource, EnvironmentSource
-
-__all__ = [
-    'DataSource', 
-    'DataSourceManager',
-    'SocialMediaSource', 
-    'PublicSafetySource', 
-    'IoTSensorSource',
-    'TransitSource',
-    'TrafficSource',
-    'EnvironmentSource'
-]
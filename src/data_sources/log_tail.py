@@ -0,0 +1,217 @@
+import collections
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from .base import POSITION, DataSource, StreamSchema, flatten_event
+
+logger = logging.getLogger(__name__)
+
+class LogTailSource(DataSource):
+    """Tails rotating append-only JSONL logs and checkpoints the committed offset of each file.
+
+    Files are tracked by device and inode rather than by name, so a rotated file is
+    read to its end under its new name while the new file starts from offset 0.
+    """
+    
+    name = "log_tail"
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.created = time.monotonic()
+        self.pattern = self.source_config['path']
+        self.checkpoint_path = self.source_config.get('checkpoint_path')
+        self.checkpoint_interval = self.source_config.get('checkpoint_interval', 5.0)
+        self.read_size = self.source_config.get('read_size', 1024 * 1024)
+        self.poll_interval = self.source_config.get('poll_interval', 0.5)
+        self.follow = self.source_config.get('follow', True)
+        
+        # Offsets read from each file, and offsets whose events the engine has committed
+        self.read_offsets = {}
+        self.offsets = self._load_checkpoint()
+        self.read_offsets.update(self.offsets)
+        
+        # Per file, the end of the furthest event committed or discarded by the buffer, and the
+        # start offsets of events handed out and still queued, in file order
+        self.done = {}
+        self.queued = {}
+        self.paths = {}
+        self.lock = threading.Lock()
+        self.last_checkpoint = time.monotonic()
+        
+        self.events = 0
+        self.bytes_read = 0
+        self.errors = 0
+        self.first_event_seconds = None
+        self.catch_up_seconds = None
+        self.catch_up_events = None
+    
+    def _define_schema(self):
+        # Log lines may hold events from any source
+        return StreamSchema
+    
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path) as f:
+            return {key: entry['offset'] for key, entry in json.load(f)['files'].items()}
+    
+    def _write_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        with self.lock:
+            files = {key: {"path": self.paths.get(key), "offset": offset} for key, offset in self.offsets.items()}
+        
+        # Write to a temporary file and rename so a crash never leaves a partial checkpoint
+        temporary = f"{self.checkpoint_path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump({"files": files}, f)
+        os.replace(temporary, self.checkpoint_path)
+        self.last_checkpoint = time.monotonic()
+    
+    def _advance(self, key):
+        # The checkpoint only moves forward, and never past an event still queued, so neither a
+        # coalesce buffer's reordering nor a crash can skip a line
+        queued = self.queued.get(key)
+        offset = self.done.get(key, 0)
+        if queued:
+            offset = min(offset, next(iter(queued)))
+        if offset > self.offsets.get(key, 0):
+            self.offsets[key] = offset
+    
+    def _settle(self, key, start, end):
+        # Unless the file has been deleted or truncated since
+        queued = self.queued.get(key)
+        if queued is None or start not in queued:
+            return
+        del queued[start]
+        self.done[key] = max(self.done.get(key, 0), end)
+        self._advance(key)
+    
+    def _committed(self, positions):
+        with self.lock:
+            for key, start, end in positions:
+                self._settle(key, start, end)
+        
+        if not positions or time.monotonic() - self.last_checkpoint >= self.checkpoint_interval:
+            self._write_checkpoint()
+    
+    def _discarded(self, position):
+        # A line the buffer dropped or replaced is not read again either
+        with self.lock:
+            self._settle(*position)
+    
+    def _scan(self):
+        """Returns (key, path) of the matching files, oldest first so rotated files drain before the live one"""
+        files = []
+        for path in glob.glob(self.pattern):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, f"{stat.st_dev}:{stat.st_ino}", path))
+        files.sort()
+        return [(key, path) for _, key, path in files]
+    
+    def _read(self, key, path):
+        """Yields (event, start offset, end offset) for every complete line appended since the last read"""
+        offset = self.read_offsets.get(key, 0)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        
+        with f:
+            # A file shorter than its offset was truncated in place and is read again from the start
+            if os.fstat(f.fileno()).st_size < offset:
+                offset = 0
+                with self.lock:
+                    self.offsets[key] = 0
+                    self.done.pop(key, None)
+                    self.queued.pop(key, None)
+            f.seek(offset)
+            
+            while True:
+                chunk = f.read(self.read_size)
+                if not chunk:
+                    return
+                
+                # Leave a partially written last line for the next read
+                end = chunk.rfind(b'\n') + 1
+                if end == 0:
+                    if len(chunk) < self.read_size:
+                        return
+                    # A line longer than read_size: keep reading until it ends
+                    rest = f.readline()
+                    if not rest.endswith(b'\n'):
+                        return
+                    chunk, end = chunk + rest, len(chunk) + len(rest)
+                else:
+                    f.seek(offset + end)
+                
+                self.bytes_read += end
+                for line in chunk[:end].splitlines(keepends=True):
+                    start = offset
+                    offset += len(line)
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        event = flatten_event(json.loads(line))
+                    except (ValueError, KeyError, TypeError) as e:
+                        self.errors += 1
+                        logger.warning("Skipping malformed line in %s at offset %d: %s", path, offset, e)
+                        continue
+                    yield event, start, offset
+                self.read_offsets[key] = offset
+    
+    def _stream(self):
+        started = time.monotonic()
+        
+        while True:
+            found = False
+            files = self._scan()
+            for key, path in files:
+                with self.lock:
+                    self.paths[key] = path
+                for event, start, end in self._read(key, path):
+                    found = True
+                    with self.lock:
+                        self.queued.setdefault(key, collections.OrderedDict())[start] = None
+                    event[POSITION] = (key, start, end)
+                    self.events += 1
+                    if self.first_event_seconds is None:
+                        self.first_event_seconds = time.monotonic() - self.created
+                    yield event
+            
+            # Forget files that were deleted so the checkpoint does not grow with every rotation
+            current = {key for key, _ in files}
+            with self.lock:
+                for key in set(self.read_offsets) | set(self.offsets):
+                    if key not in current:
+                        self.read_offsets.pop(key, None)
+                        self.offsets.pop(key, None)
+                        self.done.pop(key, None)
+                        self.queued.pop(key, None)
+                        self.paths.pop(key, None)
+            
+            if not found:
+                if self.catch_up_seconds is None:
+                    self.catch_up_seconds = time.monotonic() - started
+                    self.catch_up_events = self.events
+                if not self.follow:
+                    return
+                time.sleep(self.poll_interval)
+    
+    def stats(self):
+        return {
+            "events": self.events,
+            "bytes_read": self.bytes_read,
+            "errors": self.errors,
+            "files": len(self.read_offsets),
+            "first_event_seconds": self.first_event_seconds,
+            "catch_up_seconds": self.catch_up_seconds,
+            "catch_up_events": self.catch_up_events
+        }
@@ -0,0 +1,110 @@
+import json
+import mmap
+import os
+import time
+from .base import DataSource, StreamSchema, flatten_event
+
+# Consumed parts of the mapping are released from memory in chunks of this size
+_RELEASE_CHUNK = 16 * 1024 * 1024
+
+class _MappedFile:
+    """Read-only memory map of a capture that releases pages once they are consumed"""
+    
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.size = size
+        self.released = 0
+        if size and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+    
+    def release_until(self, position):
+        if not hasattr(mmap, 'MADV_DONTNEED') or position - self.released < _RELEASE_CHUNK:
+            return
+        end = position - position % mmap.PAGESIZE
+        self.map.madvise(mmap.MADV_DONTNEED, self.released, end - self.released)
+        self.released = end
+    
+    def close(self):
+        if self.size:
+            self.map.close()
+        self.file.close()
+
+def iter_records(path):
+    """Incrementally parses a JSONL capture, or a JSON array of records, without loading it whole"""
+    mapped = _MappedFile(path)
+    try:
+        data = mapped.map
+        position = 0
+        while position < mapped.size and data[position:position + 1].isspace():
+            position += 1
+        
+        if data[position:position + 1] == b'[':
+            yield from _iter_array(mapped, position + 1)
+            return
+        
+        while position < mapped.size:
+            end = data.find(b'\n', position)
+            if end == -1:
+                end = mapped.size
+            line = data[position:end].strip()
+            if line:
+                yield json.loads(line)
+            position = end + 1
+            mapped.release_until(position)
+    finally:
+        mapped.close()
+
+def _iter_array(mapped, position, window=64 * 1024):
+    data = mapped.map
+    decoder = json.JSONDecoder()
+    while True:
+        # Skip separators between records
+        while position < mapped.size and data[position:position + 1] in (b' ', b'\t', b'\r', b'\n', b','):
+            position += 1
+        if position >= mapped.size or data[position:position + 1] == b']':
+            return
+        
+        # Decode one record, growing the window until it holds the whole record
+        size = window
+        while True:
+            chunk = data[position:position + size].decode('utf-8', errors='ignore')
+            try:
+                record, end = decoder.raw_decode(chunk)
+                break
+            except json.JSONDecodeError:
+                if position + size >= mapped.size:
+                    raise
+                size *= 2
+        
+        yield record
+        position += len(chunk[:end].encode('utf-8'))
+        mapped.release_until(position)
+
+class ReplaySource(DataSource):
+    name = "replay"
+    
+    def _define_schema(self):
+        # Captures may mix events from every source
+        return StreamSchema
+    
+    def _stream(self):
+        # speed is a multiple of real time; 0 replays as fast as possible
+        speed = self.source_config.get('speed', 1.0)
+        
+        while True:
+            first_event_time = None
+            started = time.monotonic()
+            for record in iter_records(self.source_config['path']):
+                row = flatten_event(record)
+                if speed:
+                    if first_event_time is None:
+                        first_event_time = row['event_time']
+                    delay = started + (row['event_time'] - first_event_time) / speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                yield row
+            
+            if not self.source_config.get('loop', False):
+                return
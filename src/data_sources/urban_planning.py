@@ -0,0 +1,91 @@
+from typing import Optional
+from .base import DataSource, EventSchema
+
+# Metric columns are optional because polled feeds may omit fields
+
+class TransitSchema(EventSchema):
+    route_id: Optional[str]
+    delay: Optional[float]
+    passenger_count: Optional[int]
+    vehicle_lat: Optional[float]
+    vehicle_lon: Optional[float]
+
+class TrafficSchema(EventSchema):
+    congestion_level: Optional[float]
+    average_speed: Optional[float]
+    incident_count: Optional[int]
+
+class EnvironmentSchema(EventSchema):
+    air_quality_index: Optional[float]
+    noise_level: Optional[float]
+    temperature: Optional[float]
+
+class TransitSource(DataSource):
+    name = "transit"
+    
+    def _define_schema(self):
+        return TransitSchema
+    
+    def _stream(self):
+        if self.polling:
+            yield from self._poll("transit_api", [self.source_config['api_url']])
+            return
+        
+        while self._more_events():
+            # Simulated feed used when polling is disabled
+            vehicle_location = self._location()
+            transit_data = self._event(
+                "transit_api",
+                route_id=f"M{self.random.randint(1, 9)}",
+                delay=self.random.uniform(0, 15) if not self._in_burst() and self.random.random() > 0.2 else self.random.uniform(15, 45),
+                passenger_count=self.random.randint(10, 200),
+                vehicle_lat=vehicle_location["lat"],
+                vehicle_lon=vehicle_location["lon"]
+            )
+            yield transit_data
+            self._pace(3)
+
+class TrafficSource(DataSource):
+    name = "traffic"
+    
+    def _define_schema(self):
+        return TrafficSchema
+    
+    def _stream(self):
+        if self.polling:
+            yield from self._poll("traffic_api", [self.source_config['api_url']])
+            return
+        
+        while self._more_events():
+            # Simulated feed used when polling is disabled
+            traffic_data = self._event(
+                "traffic_api",
+                congestion_level=self.random.uniform(0.1, 0.9) if not self._in_burst() else self.random.uniform(0.9, 1.0),
+                average_speed=self.random.uniform(10, 40),
+                incident_count=self.random.randint(0, 5)
+            )
+            yield traffic_data
+            self._pace(2)
+
+class EnvironmentSource(DataSource):
+    name = "environment"
+    
+    def _define_schema(self):
+        return EnvironmentSchema
+    
+    def _stream(self):
+        if self.polling:
+            urls = [self.source_config['air_quality_url'], self.source_config['noise_url']]
+            yield from self._poll("environment_api", urls)
+            return
+        
+        while self._more_events():
+            # Simulated feed used when polling is disabled
+            env_data = self._event(
+                "environment_api",
+                air_quality_index=self.random.uniform(20, 150) if not self._in_burst() else self.random.uniform(200, 300),
+                noise_level=self.random.uniform(40, 80),
+                temperature=self.random.uniform(15, 30)
+            )
+            yield env_data
+            self._pace(5)
@@ -7,22 +7,84 @@ from pathlib import Path
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from data_sources import DataSourceManager
-from processing import AnomalyDetector, RAGSystem
-from app import Dashboard
+from startup import StartupReport
 
 def load_config(config_path):
     with open(config_path, 'r') as f:
         return yaml.safe_load(f)
 
+def rag_enabled(config):
+    return config.get('rag', {}).get('enabled', True)
+
+def build_pipeline(config, data_manager=None):
+    # Components are imported here so only the enabled ones are loaded
+    import pathway as pw
+    from data_sources import DataSourceManager
+    from processing import AnomalyDetector
+    
+    # Initialize data sources
+    if data_manager is None:
+        data_manager = DataSourceManager(config)
+    data_streams = data_manager.get_streams()
+    
+    # Initialize processing components
+    anomaly_detector = AnomalyDetector(config)
+    
+    # Build Pathway pipeline, with each grid cell's events owned by a single worker
+    combined_table = anomaly_detector.partition(pw.Table.concat_reindex(*data_streams))
+    
+    # Drop repeated posts from the processed stream, and so from embedding and alerts
+    events_table = combined_table
+    if config.get('deduplication', {}).get('enabled', False):
+        from processing import Deduplicator
+        events_table = Deduplicator(config).process(combined_table)
+    
+    # Process data; spikes count every post, repeats included
+    processed_table = anomaly_detector.process(events_table, posts=combined_table)
+    
+    # Update RAG system; loading the embedding model is skipped entirely when disabled
+    rag_system = None
+    if rag_enabled(config):
+        from processing import RAGSystem, Rollup
+        rag_system = RAGSystem(config)
+        # Sensor readings are indexed as per-cell window summaries; anomalies stay individual
+        documents_table = Rollup(config).documents(processed_table)
+        pw.io.subscribe(documents_table, rag_system.on_change, on_end=rag_system.checkpoint)
+    
+    # Filter anomalies
+    anomalies_table = processed_table.filter(pw.this.anomaly)
+    
+    # Post anomalies to output.alert_webhook from a background loop, so the pipeline never waits on it
+    if config.get('output', {}).get('alerts', {}).get('enabled', False):
+        from processing import AlertDispatcher
+        alert_dispatcher = AlertDispatcher(config)
+        alert_dispatcher.start()
+        pw.io.subscribe(anomalies_table, alert_dispatcher.on_change, on_end=alert_dispatcher.close)
+    
+    return processed_table, anomalies_table, rag_system
+
 def main():
+    report = StartupReport()
+    
     parser = argparse.ArgumentParser(description='Public Safety & Urban Planning System')
     parser.add_argument('--mode', choices=['public_safety', 'urban_planning'], required=True,
                         help='System mode to run')
-    parser.add_argument('--config', type=str, 
+    parser.add_argument('--config', type=str,
                         help='Path to configuration file')
+    parser.add_argument('--no-rag', action='store_true',
+                        help='Run without the RAG system and its embedding model')
+    parser.add_argument('--headless', action='store_true',
+                        help='Run the pipeline without the dashboard')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='Print time spent in each startup phase and import')
+    parser.add_argument('--workers', type=int,
+                        help='Pathway worker threads; use `pathway spawn -n N` for processes')
     
     args = parser.parse_args()
+    if args.workers:
+        os.environ['PATHWAY_THREADS'] = str(args.workers)
+    if args.startup_report:
+        report.install()
     
     # Determine config file path
     if args.config:
@@ -31,50 +93,34 @@ def main():
         config_path = f"config/{args.mode}.yaml"
     
     # Load configuration
-    config = load_config(config_path)
-    
-    # Initialize data sources
-    data_manager = DataSourceManager(config)
-    data_streams = data_manager.get_streams()
+    with report.phase("load config"):
+        config = load_config(config_path)
+    if args.no_rag:
+        config.setdefault('rag', {})['enabled'] = False
     
-    # Initialize processing components
-    anomaly_detector = AnomalyDetector(config)
-    rag_system = RAGSystem(config)
+    with report.phase("build pipeline"):
+        processed_table, anomalies_table, rag_system = build_pipeline(config)
     
-    # Build Pathway pipeline
+    # Output results
     import pathway as pw
     
-    combined_table = pw.Table.concat(data_streams)
-    
-    # Process data
-    processed_table = combined_table.select(
-        combined_table.timestamp,
-        combined_table.source,
-        data=anomaly_detector.process(combined_table.data),
-        combined_table.location
-    )
-    
-    # Update RAG system
-    processed_table = processed_table.select(
-        processed_table.timestamp,
-        processed_table.source,
-        processed_table.data,
-        processed_table.location,
-        _=rag_system.add_document(processed_table.data, processed_table.source, processed_table.location)
-    )
-    
-    # Filter anomalies
-    anomalies_table = processed_table.filter(
-        pw.this.data.get("anomaly", False)
-    )
-    
-    # Output results
     pw.io.csv.write(anomalies_table, "anomalies.csv")
-    pw.io.json.write(processed_table, "processed_data.json")
+    pw.io.jsonlines.write(processed_table, "processed_data.jsonl")
     
     # Start dashboard
-    dashboard = Dashboard(processed_table, anomalies_table, rag_system, config)
-    dashboard.run()
+    if not args.headless:
+        with report.phase("load dashboard"):
+            from app import Dashboard
+            dashboard = Dashboard(processed_table, anomalies_table, rag_system, config)
+    
+    if args.startup_report:
+        report.uninstall()
+        print(report.report(), file=sys.stderr)
+    
+    if args.headless:
+        pw.run()
+    else:
+        dashboard.run()
 
 if __name__ == "__main__":
     main()
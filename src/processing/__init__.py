@@ -0,0 +1,25 @@
+import importlib
+
+# Components are imported on first use, so a run only loads the dependencies it enables
+_EXPORTS = {
+    'AnomalyDetector': '.anomaly_detection',
+    'RAGSystem': '.rag_system',
+    'Deduplicator': '.dedup',
+    'SpatialGrid': '.spatial',
+    'CellStateStore': '.spatial',
+    'StatisticalDetectors': '.detectors',
+    'AlertDispatcher': '.alerts',
+    'IncidentCorrelator': '.correlation',
+    'EmbeddingBatcher': '.embedding',
+    'DocumentStore': '.document_store',
+    'QueryService': '.query_service',
+    'ChatCompletion': '.llm',
+    'Rollup': '.rollup'
+}
+
+__all__ = ['AnomalyDetector', 'RAGSystem', 'Deduplicator', 'SpatialGrid', 'CellStateStore', 'StatisticalDetectors', 'AlertDispatcher', 'IncidentCorrelator', 'EmbeddingBatcher', 'DocumentStore', 'QueryService', 'ChatCompletion', 'Rollup']
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
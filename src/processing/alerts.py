@@ -0,0 +1,232 @@
+import asyncio
+import collections
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .spatial import CellStateStore, SpatialGrid
+
+logger = logging.getLogger(__name__)
+
+class AlertStats:
+    def __init__(self, max_samples=10000):
+        self.received = 0
+        self.coalesced = 0
+        self.retracted = 0
+        self.dropped = 0
+        self.sent = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+        # Seconds from an alert entering the dispatcher to the receiver acknowledging it
+        self.latencies = collections.deque(maxlen=max_samples)
+    
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "retracted": self.retracted,
+            "dropped": self.dropped,
+            "sent": self.sent,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed": self.failed,
+            "latency_p50": self.percentile(50),
+            "latency_p99": self.percentile(99)
+        }
+
+class AlertDispatcher:
+    """Posts anomalies to output.alert_webhook in batches, from a background asyncio loop.
+
+    Alerts for the same grid cell and anomaly type within `suppression_window` seconds of event
+    time are coalesced: repeats raise the `count` of the alert still waiting to be sent, or of the
+    next one sent for that cell and type. Failed batches are retried with exponential backoff
+    while later batches keep flowing, so neither a slow nor a failing receiver blocks the pipeline.
+    At most `max_in_flight` batches are sent or retried at once; further alerts wait in `pending`,
+    which sheds its oldest alerts beyond `max_pending`, so an outage holds bounded memory.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        output = config.get('output', {})
+        settings = output.get('alerts', {})
+        self.url = settings.get('url', output.get('alert_webhook'))
+        self.flush_interval = settings.get('flush_interval', 1.0)
+        self.max_batch_size = settings.get('max_batch_size', 500)
+        self.max_pending = settings.get('max_pending', 10000)
+        self.suppression_window = settings.get('suppression_window', 300)
+        self.max_retries = settings.get('max_retries', 5)
+        self.backoff = settings.get('backoff', 0.5)
+        self.max_backoff = settings.get('max_backoff', 30.0)
+        self.max_in_flight = settings.get('max_in_flight', 4)
+        self.pool_size = settings.get('pool_size', 4)
+        self.request_timeout = settings.get('request_timeout', 10)
+        
+        self.grid = SpatialGrid.from_config(config)
+        self.stats = AlertStats()
+        
+        # Alerts waiting for the next flush, by (cell, anomaly_type)
+        self.pending = collections.OrderedDict()
+        # (cell, anomaly_type) -> [window start, repeats not sent yet]; expires with the window
+        self.windows = CellStateStore(ttl=self.suppression_window, max_cells=settings.get('max_keys', 100000))
+        self.lock = threading.Lock()
+        
+        self.loop = None
+        self.thread = None
+    
+    def start(self):
+        import aiohttp
+        
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(aiohttp), self.loop).result()
+    
+    async def _start(self, aiohttp):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size),
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+        )
+        # Batches being sent or retried; no more than max_in_flight
+        self.tasks = set()
+        self.flusher = asyncio.ensure_future(self._flush_periodically())
+    
+    def on_change(self, key, row, time, is_addition):
+        """pw.io.subscribe callback for the anomalies table"""
+        if is_addition:
+            self.add(row)
+        else:
+            self.retract(row)
+    
+    def add(self, row: Dict[str, Any], received: Optional[float] = None):
+        """Queues one anomaly; never blocks on the network"""
+        received = received if received is not None else time.perf_counter()
+        event_time = row.get('event_time') or 0.0
+        key = (self.grid.cell(row['lat'], row['lon']), row.get('anomaly_type'))
+        
+        with self.lock:
+            self.stats.received += 1
+            if key in self.pending:
+                self.pending[key]['count'] += 1
+                self.stats.coalesced += 1
+                return
+            
+            window = self.windows.get(key, event_time)
+            if window is not None and event_time - window[0] <= self.suppression_window:
+                window[1] += 1
+                self.stats.coalesced += 1
+                return
+            
+            repeats = window[1] if window is not None else 0
+            self.windows.put(key, [event_time, 0], event_time)
+            self.pending[key] = {
+                "timestamp": row.get('timestamp'),
+                "event_time": event_time,
+                "source": row.get('source'),
+                "lat": row['lat'],
+                "lon": row['lon'],
+                "cell": key[0],
+                "anomaly_type": row.get('anomaly_type'),
+                "anomaly_description": row.get('anomaly_description'),
+                "count": 1 + repeats,
+                "_received": received
+            }
+            # Shed the oldest alerts rather than grow without bound
+            while len(self.pending) > self.max_pending:
+                self.pending.popitem(last=False)
+                self.stats.dropped += 1
+    
+    def retract(self, row: Dict[str, Any]):
+        """Undoes add() for a row the pipeline retracted, such as the old version of an updated row.
+        
+        An alert still waiting to be sent loses one from its count, and is not sent once nothing
+        is left; a repeat of an alert already sent is no longer counted.
+        """
+        event_time = row.get('event_time') or 0.0
+        key = (self.grid.cell(row['lat'], row['lon']), row.get('anomaly_type'))
+        
+        with self.lock:
+            self.stats.retracted += 1
+            alert = self.pending.get(key)
+            if alert is not None:
+                alert['count'] -= 1
+                if alert['count'] <= 0:
+                    # Its replacement, if any, is then sent as a new alert rather than a repeat
+                    del self.pending[key]
+                    self.windows.pop(key)
+                return
+            
+            window = self.windows.get(key, event_time)
+            if window is not None and window[1] > 0:
+                window[1] -= 1
+    
+    def _take_batches(self, count: int) -> List[List[Dict[str, Any]]]:
+        """Takes up to `count` batches of the oldest pending alerts"""
+        batches = []
+        with self.lock:
+            while self.pending and len(batches) < count:
+                batch = []
+                while self.pending and len(batch) < self.max_batch_size:
+                    batch.append(self.pending.popitem(last=False)[1])
+                batches.append(batch)
+        return batches
+    
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._flush()
+    
+    def _flush(self):
+        # While the receiver is slow or down, alerts stay pending instead of piling up in tasks
+        for batch in self._take_batches(self.max_in_flight - len(self.tasks)):
+            task = asyncio.ensure_future(self._send(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+    
+    async def _send(self, batch: List[Dict[str, Any]]):
+        import aiohttp
+        
+        body = {"alerts": [{k: v for k, v in alert.items() if k != '_received'} for alert in batch]}
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.session.post(self.url, json=body) as response:
+                    response.raise_for_status()
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    self.stats.failed += len(batch)
+                    logger.warning("Dropping %d alerts after %d attempts: %s", len(batch), attempt + 1, e)
+                    return
+                self.stats.retries += 1
+                # Exponential backoff with full jitter
+                await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+        
+        acknowledged = time.perf_counter()
+        self.stats.sent += len(batch)
+        self.stats.batches += 1
+        self.stats.latencies.extend(acknowledged - alert['_received'] for alert in batch)
+    
+    async def _drain(self):
+        self.flusher.cancel()
+        while True:
+            self._flush()
+            if not self.tasks:
+                break
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.session.close()
+    
+    def close(self, timeout: Optional[float] = None):
+        """Sends what is pending, waits for retries to finish, and stops the loop"""
+        if self.loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._drain(), self.loop).result(timeout)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop = None
@@ -1,48 +1,195 @@
 import pathway as pw
-import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+from .correlation import IncidentCorrelator
+from .detectors import StatisticalDetectors
+from .rules import RuleTable
+from .spatial import SpatialGrid
 
 class AnomalyDetector:
+    # Sensor metrics, in the order check() takes them
+    SENSOR_METRICS = ('noise_level', 'crowd_density', 'traffic_flow')
+    
     def __init__(self, config: Dict[str, Any]):
         self.rules = config.get('anomaly_rules', {})
-        self.location_counts = {}
-    
-    @pw.udf
-    def process(self, data: pw.Json) -> pw.Json:
-        source = data.get("source", "")
-        location_key = f"{data['location']['lat']:.2f},{data['location']['lon']:.2f}"
-        
-        # Initialize location tracking
-        if location_key not in self.location_counts:
-            self.location_counts[location_key] = {
-                "social_media": 0,
-                "last_reset": datetime.datetime.utcnow()
-            }
-        
-        # Check for social media spikes
-        if source == "twitter":
-            self.location_counts[location_key]["social_media"] += 1
-            
-            # Reset counts every minute
-            if (datetime.datetime.utcnow() - self.location_counts[location_key]["last_reset"]).total_seconds() > 60:
-                if self.location_counts[location_key]["social_media"] > self.rules.get("social_media_spike", 10):
-                    data["anomaly"] = True
-                    data["anomaly_type"] = "social_media_spike"
-                    data["anomaly_description"] = f"Spike in social media mentions at {location_key}"
-                
-                self.location_counts[location_key] = {
-                    "social_media": 0,
-                    "last_reset": datetime.datetime.utcnow()
-                }
-        
-        # Check IoT sensor anomalies
-        if source == "city_sensors":
-            sensor_data = data.get("data", {})
-            for metric, value in sensor_data.items():
-                if metric in self.rules and value > self.rules[metric]:
-                    data["anomaly"] = True
-                    data["anomaly_type"] = f"{metric}_anomaly"
-                    data["anomaly_description"] = f"High {metric} detected: {value}"
-                    break
-        
-        return data
+        self.grid = SpatialGrid.from_config(config)
+        
+        # Threshold rules are compiled once into per-source bound tables
+        self.rule_table = RuleTable(self.rules)
+        
+        # Streaming detectors learn each cell's baseline for the metrics selected in statistical_detectors
+        self.statistical = StatisticalDetectors(config)
+        
+        # Social media spikes are counted per grid cell in event-time windows
+        spikes = config.get('spike_detection', {})
+        self.spike_sources = spikes.get('sources', ['twitter'])
+        self.spike_window = spikes.get('window', 60)
+        self.spike_hop = spikes.get('hop', self.spike_window)
+        self.spike_allowed_lateness = spikes.get('allowed_lateness', 60)
+        self.spike_neighbours = spikes.get('neighbours', True)
+        
+        # Incidents corroborated by nearby spikes and sensor anomalies become composite rows
+        self.correlator = IncidentCorrelator(config)
+    
+    def check(self, source: str, lat: float, lon: float, *metrics: Optional[float]) -> Tuple[Optional[str], Optional[str]]:
+        """Returns (anomaly_type, anomaly_description) for one sensor event, or (None, None)"""
+        values = dict(zip(self.SENSOR_METRICS, metrics))
+        columns = [[values.get(metric)] for metric in self.rule_table.metrics]
+        return self.rule_table.score_batch([source], *columns)[0]
+    
+    def partition(self, table: pw.Table) -> pw.Table:
+        """Re-keys events so that every event of a grid cell is owned by the same worker.
+        
+        Per-cell state kept in Python (statistical detectors, deduplication) then lives in one
+        worker and one process, however many workers run the pipeline.
+        """
+        # Column and row of the grid cell, computed in the engine; any id unique per cell will do
+        column = pw.cast(int, (table.lon + 180.0) * self.grid.lon_scale // 1)
+        row = pw.cast(int, (table.lat + 90.0) * self.grid.lat_scale // 1)
+        keyed = table.with_columns(shard=column * self.grid.size + row)
+        return keyed.with_id_from(keyed.shard, keyed.id, instance=keyed.shard).without(pw.this.shard)
+    
+    def _window(self):
+        if self.spike_hop == self.spike_window:
+            return pw.temporal.tumbling(duration=self.spike_window)
+        return pw.temporal.sliding(hop=self.spike_hop, duration=self.spike_window)
+    
+    def detect_spikes(self, table: pw.Table) -> pw.Table:
+        """Returns one row per (cell, window) in which posts exceed anomaly_rules.social_media_spike.
+        
+        Windows follow event time, so results are the same however fast events are replayed, and
+        the groupby is partitioned by cell so it spreads across workers. Each window is emitted
+        once, allowed_lateness seconds of event time after it ends, so subscribers never see a
+        spike updated or retracted; events arriving after that are ignored.
+        """
+        threshold = self.rules.get('social_media_spike', 10)
+        posts = table.filter(pw.apply_with_type(lambda source: source in self.spike_sources, bool, table.source))
+        posts = posts.with_columns(
+            cell=pw.apply_with_type(self.grid.cell, int, posts.lat, posts.lon)
+        )
+        
+        counts = posts.windowby(
+            posts.event_time,
+            window=self._window(),
+            instance=posts.cell,
+            behavior=pw.temporal.exactly_once_behavior(shift=self.spike_allowed_lateness)
+        ).reduce(
+            cell=pw.this._pw_instance,
+            window_end=pw.this._pw_window_end,
+            timestamp=pw.reducers.max(pw.this.timestamp),
+            event_time=pw.reducers.max(pw.this.event_time),
+            source=pw.reducers.any(pw.this.source),
+            lat=pw.reducers.avg(pw.this.lat),
+            lon=pw.reducers.avg(pw.this.lon),
+            mentions=pw.reducers.count()
+        )
+        
+        if self.spike_neighbours:
+            counts = self._with_neighbourhood(counts)
+        
+        spikes = counts.filter(pw.this.mentions > threshold)
+        return spikes.select(
+            pw.this.timestamp,
+            pw.this.event_time,
+            pw.this.source,
+            pw.this.lat,
+            pw.this.lon,
+            anomaly=True,
+            anomaly_type="social_media_spike",
+            anomaly_description=pw.apply_with_type(
+                lambda cell, mentions: f"Spike in social media mentions at cell {cell}: {mentions} posts in {self.spike_window}s",
+                str,
+                pw.this.cell,
+                pw.this.mentions
+            )
+        )
+    
+    def _with_neighbourhood(self, counts: pw.Table) -> pw.Table:
+        """Replaces each cell's count with the count of its 3x3 neighbourhood, kept only at the busiest cell.
+        
+        A burst straddling a cell boundary is then still counted as one, and is reported once.
+        """
+        spread = counts.select(
+            pw.this.window_end,
+            pw.this.mentions,
+            busiest=pw.make_tuple(pw.this.mentions, pw.this.cell),
+            target=pw.apply_with_type(self.grid.neighbours, list[int], pw.this.cell)
+        ).flatten(pw.this.target)
+        
+        neighbourhoods = spread.groupby(pw.this.target, pw.this.window_end).reduce(
+            cell=pw.this.target,
+            window_end=pw.this.window_end,
+            total=pw.reducers.sum(pw.this.mentions),
+            busiest=pw.reducers.max(pw.this.busiest)
+        )
+        
+        joined = counts.join(
+            neighbourhoods,
+            counts.cell == neighbourhoods.cell,
+            counts.window_end == neighbourhoods.window_end
+        ).select(
+            *pw.left.without(pw.this.mentions),
+            mentions=pw.right.total,
+            busiest=pw.right.busiest
+        )
+        return joined.filter(pw.this.busiest[1] == pw.this.cell).without(pw.this.busiest)
+    
+    def score(self, table: pw.Table) -> pw.Table:
+        """Adds anomaly, anomaly_type and anomaly_description columns from the threshold rules
+        and the statistical detectors"""
+        # Compiled rules run as column expressions in a single step, without calling into Python
+        violated, types, descriptions = self.rule_table.expressions(table)
+        if not self.statistical.metrics:
+            return table.with_columns(
+                anomaly=pw.coalesce(table.anomaly, False) | violated,
+                anomaly_type=pw.if_else(violated, types, None),
+                anomaly_description=pw.if_else(violated, descriptions, None)
+            )
+        
+        # Detector state changes with every event, so this step is one stateful call per row
+        checked = table.with_columns(
+            statistical=pw.apply_with_type(
+                self.statistical.check,
+                Tuple[Optional[str], Optional[str]],
+                table.source,
+                table.lat,
+                table.lon,
+                table.event_time,
+                *[table[metric] for metric in self.statistical.metrics]
+            )
+        )
+        unusual = checked.statistical[0].is_not_none()
+        return checked.with_columns(
+            anomaly=pw.coalesce(checked.anomaly, False) | violated | unusual,
+            anomaly_type=pw.if_else(
+                violated,
+                pw.if_else(unusual, types + "," + pw.unwrap(checked.statistical[0]), types),
+                checked.statistical[0]
+            ),
+            anomaly_description=pw.if_else(
+                violated,
+                pw.if_else(unusual, descriptions + "; " + pw.unwrap(checked.statistical[1]), descriptions),
+                checked.statistical[1]
+            )
+        ).without(pw.this.statistical)
+    
+    def process(self, table: pw.Table, posts: Optional[pw.Table] = None) -> pw.Table:
+        """Adds anomaly, anomaly_type and anomaly_description columns to the event stream.
+        
+        Social media spikes are appended as extra rows, one per cell and window, and so are
+        correlated incidents when correlation is enabled. Spikes are counted on `posts` if
+        given, so a deduplicated `table` can still count the repeats that make up a spike.
+        """
+        events = self.score(table)
+        spikes = self.detect_spikes(table if posts is None else posts)
+        derived = [spikes]
+        if self.correlator.enabled:
+            derived.append(self.correlator.correlate(events, spikes))
+        
+        # Derived rows carry no event columns other than the shared ones
+        widened = []
+        for rows in derived:
+            columns = rows.schema.column_names()
+            widened.append(rows.with_columns(
+                **{name: None for name in events.schema.column_names() if name not in columns}
+            ).update_types(**events.schema.typehints()))
+        return pw.Table.concat_reindex(events, *widened)
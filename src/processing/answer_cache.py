@@ -0,0 +1,94 @@
+import threading
+import time
+import numpy as np
+from typing import Any, Dict, Hashable, List, Optional
+from .vector_index import normalize
+
+class AnswerCache:
+    """Recent LLM answers, reused for questions that mean the same thing.
+
+    A cached answer is reused when a new question's embedding has cosine similarity of at
+    least `similarity` with the cached question, it has the same scope, the answer is under
+    `ttl` seconds old, and retrieval for the new question returns exactly the documents the
+    answer was generated from. Any document added, dropped or reranked since makes it stale.
+    """
+    
+    def __init__(self, similarity: float = 0.95, ttl: float = 60, max_entries: int = 256):
+        self.similarity = similarity
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        
+        # Question embeddings one per row, and (scope, doc_ids, answer, created, generate seconds)
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.entries = []
+        
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+    
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any]) -> Optional['AnswerCache']:
+        if not settings.get('enabled', True):
+            return None
+        return cls(
+            similarity=settings.get('similarity', 0.95),
+            ttl=settings.get('ttl', 60),
+            max_entries=settings.get('max_entries', 256)
+        )
+    
+    def _expire(self, now: float):
+        # Entries are in creation order
+        expired = 0
+        while expired < len(self.entries) and now - self.entries[expired][3] > self.ttl:
+            expired += 1
+        if expired:
+            self.entries = self.entries[expired:]
+            self.vectors = self.vectors[expired:]
+    
+    def get(self, vector: Any, scope: Hashable, doc_ids: List[Hashable]) -> Optional[str]:
+        """Returns a cached answer to a question like this one about the same documents, or None"""
+        vector = normalize(vector)
+        now = time.monotonic()
+        with self.lock:
+            self._expire(now)
+            if self.entries and self.vectors.shape[1] == len(vector):
+                similarities = self.vectors @ vector
+                # Most similar first, so the best fresh answer is the one reused
+                for row in np.argsort(-similarities):
+                    if similarities[row] < self.similarity:
+                        break
+                    cached_scope, cached_ids, answer, _, generate_seconds = self.entries[row]
+                    if cached_scope != scope:
+                        continue
+                    if cached_ids != list(doc_ids):
+                        self.stale += 1
+                        continue
+                    self.hits += 1
+                    self.saved_seconds += generate_seconds
+                    return answer
+            self.misses += 1
+            return None
+    
+    def put(self, vector: Any, scope: Hashable, doc_ids: List[Hashable], answer: str, generate_seconds: float):
+        vector = normalize(vector)
+        with self.lock:
+            if self.entries and self.vectors.shape[1] != len(vector):
+                self.entries, self.vectors = [], np.empty((0, 0), dtype=np.float32)
+            self.entries.append((scope, list(doc_ids), answer, time.monotonic(), generate_seconds))
+            self.vectors = np.vstack([self.vectors.reshape(-1, len(vector)), vector[np.newaxis]])
+            if len(self.entries) > self.max_entries:
+                self.entries = self.entries[-self.max_entries:]
+                self.vectors = self.vectors[-self.max_entries:]
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "stale": self.stale,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds
+        }
@@ -0,0 +1,105 @@
+import pathway as pw
+from typing import Any, Dict, List
+from .spatial import SpatialGrid
+
+def _source_in(table: pw.Table, sources: List[str]) -> pw.ColumnExpression:
+    condition = pw.declare_type(bool, False)
+    for source in sources:
+        condition = condition | (table.source == source)
+    return condition
+
+class IncidentCorrelator:
+    """Links incidents to social media spikes and sensor anomalies close in space and time.
+
+    Signals are joined to incidents on grid cell (each signal is also offered to the 8 cells
+    around it) with an interval join on event time, so work grows with the number of signals
+    per cell rather than with all pairs of events.
+    """
+    
+    # Kinds of signal that can corroborate an incident
+    SIGNALS = ('social_media_spike', 'sensor_anomaly')
+    
+    def __init__(self, config: Dict[str, Any]):
+        settings = config.get('correlation', {})
+        self.enabled = settings.get('enabled', False)
+        self.window = settings.get('window', 300)
+        self.neighbours = settings.get('neighbours', True)
+        self.allowed_lateness = settings.get('allowed_lateness', 600)
+        self.incident_sources = settings.get('incident_sources', ['police_scanner'])
+        self.sensor_sources = settings.get('sensor_sources', ['city_sensors'])
+        self.weights = {'incident': 0.5, 'social_media_spike': 0.5, 'sensor_anomaly': 0.5}
+        self.weights.update(settings.get('weights', {}))
+        self.min_confidence = settings.get('min_confidence', 0.75)
+        self.grid = SpatialGrid.from_config(config)
+    
+    def _signals(self, events: pw.Table, spikes: pw.Table) -> pw.Table:
+        sensors = events.filter(events.anomaly & _source_in(events, self.sensor_sources)).select(
+            pw.this.event_time, pw.this.lat, pw.this.lon, kind="sensor_anomaly"
+        )
+        spikes = spikes.select(pw.this.event_time, pw.this.lat, pw.this.lon, kind="social_media_spike")
+        signals = pw.Table.concat_reindex(sensors, spikes)
+        
+        if not self.neighbours:
+            return signals.with_columns(target=pw.apply_with_type(self.grid.cell, int, pw.this.lat, pw.this.lon))
+        return signals.with_columns(
+            target=pw.apply_with_type(lambda lat, lon: self.grid.neighbours(self.grid.cell(lat, lon)), list[int], pw.this.lat, pw.this.lon)
+        ).flatten(pw.this.target)
+    
+    def correlate(self, events: pw.Table, spikes: pw.Table) -> pw.Table:
+        """Returns one row per incident with corroborating signals and confidence >= min_confidence"""
+        incidents = events.filter(_source_in(events, self.incident_sources)).select(
+            pw.this.timestamp,
+            pw.this.event_time,
+            pw.this.source,
+            pw.this.lat,
+            pw.this.lon,
+            pw.this.incident_type,
+            cell=pw.apply_with_type(self.grid.cell, int, pw.this.lat, pw.this.lon)
+        )
+        signals = self._signals(events, spikes)
+        
+        # The cell is the join key, so only signals in the incident's neighbourhood are compared
+        matches = pw.temporal.interval_join(
+            incidents,
+            signals,
+            incidents.event_time,
+            signals.event_time,
+            pw.temporal.interval(-self.window, self.window),
+            incidents.cell == signals.target,
+            behavior=pw.temporal.common_behavior(cutoff=self.allowed_lateness)
+        ).select(
+            incident=pw.left.id,
+            kind=pw.right.kind
+        )
+        counts = matches.groupby(pw.this.incident).reduce(
+            pw.this.incident,
+            **{kind: pw.reducers.sum(pw.if_else(pw.this.kind == kind, 1, 0)) for kind in self.SIGNALS}
+        )
+        
+        # Confidence is the chance that at least one signal is real, treating them as independent
+        doubt = 1.0 - self.weights['incident']
+        for kind in self.SIGNALS:
+            doubt = doubt * pw.if_else(counts[kind] > 0, 1.0 - self.weights[kind], 1.0)
+        scored = counts.select(pw.this.incident, *[counts[kind] for kind in self.SIGNALS], confidence=(1.0 - doubt).num.round(3))
+        
+        composite = incidents.join(scored, incidents.id == scored.incident).select(
+            *pw.left.without(pw.this.cell),
+            *[pw.right[kind] for kind in self.SIGNALS],
+            confidence=pw.right.confidence
+        ).filter(pw.this.confidence >= self.min_confidence)
+        
+        return composite.select(
+            pw.this.timestamp,
+            pw.this.event_time,
+            pw.this.source,
+            pw.this.lat,
+            pw.this.lon,
+            anomaly=True,
+            anomaly_type="correlated_incident",
+            anomaly_description=(
+                "Correlated " + pw.coalesce(pw.this.incident_type, "unknown") + " incident: "
+                + pw.this.social_media_spike.to_string() + " social media spike(s) and "
+                + pw.this.sensor_anomaly.to_string() + f" sensor anomalies within {self.window}s nearby, confidence "
+                + pw.this.confidence.to_string()
+            )
+        )
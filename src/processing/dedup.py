@@ -0,0 +1,147 @@
+import pathway as pw
+import hashlib
+import math
+import re
+import threading
+from typing import Dict, Any, Optional
+
+_URL = re.compile(r"https?://\S+")
+_RETWEET = re.compile(r"^\s*rt\b:?")
+_MENTION = re.compile(r"@\w+")
+_PUNCTUATION = re.compile(r"[^\w#\s]")
+
+def normalize_text(text: str) -> str:
+    """Reduces a post to its sorted set of words so retweets and trivial edits compare equal"""
+    text = _URL.sub(" ", text.lower())
+    text = _RETWEET.sub(" ", text)
+    text = _MENTION.sub(" ", text)
+    text = _PUNCTUATION.sub(" ", text)
+    return " ".join(sorted(set(text.split())))
+
+class BloomFilter:
+    def __init__(self, capacity: int, false_positive_rate: float):
+        # Optimal bit count and hash count for the target false positive rate
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, key: bytes):
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+    
+    def add(self, key: bytes):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, key: bytes) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+    
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+
+class DecayingBloomFilter:
+    """Bloom filter whose keys expire after roughly `ttl` seconds of event time.
+
+    Keys go into the newest of `generations` filters, each covering ttl / generations
+    seconds; when a new window starts, the oldest filter is cleared and reused.
+    """
+    
+    def __init__(self, ttl: float, capacity: int, false_positive_rate: float, generations: int = 4):
+        self.window = ttl / generations
+        # Each lookup checks every generation, so split the error budget between them
+        self.filters = [BloomFilter(max(1, capacity // generations), false_positive_rate / generations) for _ in range(generations)]
+        self.current_window = None
+    
+    def _rotate(self, event_time: float):
+        window = int(event_time // self.window)
+        if self.current_window is None:
+            self.current_window = window
+        
+        # Only move forward; late events are checked against the current generations
+        for _ in range(min(window - self.current_window, len(self.filters))):
+            oldest = self.filters.pop(0)
+            oldest.clear()
+            self.filters.append(oldest)
+        self.current_window = max(self.current_window, window)
+    
+    def __contains__(self, key: bytes) -> bool:
+        return any(key in bloom for bloom in self.filters)
+    
+    def check_and_add(self, key: bytes, event_time: float) -> bool:
+        """Returns True if the key was seen within the TTL, and records it"""
+        self._rotate(event_time)
+        seen = key in self
+        if not seen:
+            self.filters[-1].add(key)
+        return seen
+    
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+class Deduplicator:
+    """Drops posts whose normalised text was seen in the same location cell within the TTL.
+
+    Cells are spread over `shards` filters, each with its own lock and an equal share of
+    `expected_keys`, so worker threads handling different cells rarely wait for one another.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        settings = config.get('deduplication', {})
+        self.sources = set(settings.get('sources', ['twitter']))
+        self.cell_size = settings.get('cell_size', 0.01)
+        shards = settings.get('shards', 16)
+        self.filters = [
+            DecayingBloomFilter(
+                ttl=settings.get('ttl', 600),
+                capacity=max(1, settings.get('expected_keys', 1000000) // shards),
+                false_positive_rate=settings.get('false_positive_rate', 0.001),
+                generations=settings.get('generations', 4)
+            )
+            for _ in range(shards)
+        ]
+        self.locks = [threading.Lock() for _ in range(shards)]
+        # Checked and duplicate posts, per shard
+        self.checked = [0] * shards
+        self.duplicates = [0] * shards
+    
+    def is_duplicate(self, source: str, text: Optional[str], lat: float, lon: float, event_time: float) -> bool:
+        if source not in self.sources or text is None:
+            return False
+        
+        # Same normalised text in the same location cell
+        cell = (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+        key = f"{cell[0]},{cell[1]}|{normalize_text(text)}".encode()
+        
+        # Every post of a cell goes to the same shard
+        shard = hash(cell) % len(self.filters)
+        with self.locks[shard]:
+            self.checked[shard] += 1
+            duplicate = self.filters[shard].check_and_add(key, event_time)
+            if duplicate:
+                self.duplicates[shard] += 1
+        return duplicate
+    
+    def process(self, table: pw.Table) -> pw.Table:
+        """Drops repeated posts from the event stream"""
+        checked = table.with_columns(
+            duplicate=pw.apply_with_type(
+                self.is_duplicate,
+                bool,
+                table.source,
+                table.text,
+                table.lat,
+                table.lon,
+                table.event_time
+            )
+        )
+        return checked.filter(~checked.duplicate).without(pw.this.duplicate)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "checked": sum(self.checked),
+            "duplicates": sum(self.duplicates),
+            "memory_bytes": sum(bloom.memory_bytes for bloom in self.filters)
+        }
@@ -0,0 +1,231 @@
+import math
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+from .spatial import CellStateStore, SpatialGrid
+
+def _z_score(value: float, mean: float, variance: float, direction: str) -> Optional[float]:
+    """Returns the z-score of value if it lies beyond the mean in `direction`, else None"""
+    if variance <= 0.0:
+        return None
+    z = (value - mean) / math.sqrt(variance)
+    if direction == 'high' and z <= 0 or direction == 'low' and z >= 0:
+        return None
+    return z
+
+def _ewma_update(mean: float, variance: float, count: int, value: float, alpha: float) -> Tuple[float, float]:
+    """Returns the mean and variance after adding value.
+    
+    Until 1 / alpha values are seen each one is weighted 1 / n, which gives the exact mean and
+    variance so far instead of a variance biased towards zero.
+    """
+    alpha = max(alpha, 1.0 / (count + 1))
+    diff = value - mean
+    increment = alpha * diff
+    return mean + increment, (1.0 - alpha) * (variance + diff * increment)
+
+class EwmaDetector:
+    """Exponentially weighted mean and variance; flags values more than `threshold` deviations away.
+
+    State is [mean, variance, count].
+    """
+    name = "ewma"
+    
+    def __init__(self, settings: Dict[str, Any]):
+        self.alpha = settings.get('alpha', 0.05)
+        self.threshold = settings.get('threshold', 4.0)
+        self.warmup = settings.get('warmup', 30)
+        self.direction = settings.get('direction', 'both')
+    
+    def new_state(self) -> List[float]:
+        return [0.0, 0.0, 0]
+    
+    def update(self, state: List[float], value: float, event_time: float) -> Optional[str]:
+        """Scores value against the state, then adds it; returns a description if anomalous"""
+        mean, variance, count = state
+        reason = None
+        if count >= self.warmup:
+            z = _z_score(value, mean, variance, self.direction)
+            if z is not None and abs(z) > self.threshold:
+                reason = f"{value} is {abs(z):.1f} deviations {'above' if z > 0 else 'below'} its average of {mean:.4g}"
+        
+        state[0], state[1] = _ewma_update(mean, variance, count, value, self.alpha)
+        state[2] = count + 1
+        return reason
+
+class QuantileDetector:
+    """P-square estimate of one quantile (Jain and Chlamtac, 1985) in five markers.
+
+    Flags values above the estimated quantile, or below it when `quantile` is under 0.5.
+    State is [count, marker heights, marker positions].
+    """
+    name = "quantile"
+    
+    def __init__(self, settings: Dict[str, Any]):
+        self.quantile = settings.get('quantile', 0.99)
+        if not 0.0 < self.quantile < 1.0:
+            raise ValueError(f"quantile must be between 0 and 1, got {self.quantile}")
+        self.warmup = max(settings.get('warmup', 100), 5)
+        p = self.quantile
+        # Increments of each marker's desired position per observation
+        self.increments = (0.0, p / 2, p, (1 + p) / 2, 1.0)
+    
+    def new_state(self) -> list:
+        return [0, [], [0, 1, 2, 3, 4]]
+    
+    def estimate(self, state: list) -> Optional[float]:
+        count, heights, _ = state
+        if count < 5:
+            return None
+        return heights[2]
+    
+    def update(self, state: list, value: float, event_time: float) -> Optional[str]:
+        count, heights, positions = state
+        reason = None
+        if count >= self.warmup:
+            estimate = heights[2]
+            if (value > estimate) if self.quantile >= 0.5 else (value < estimate):
+                reason = f"{value} is {'above' if value > estimate else 'below'} its p{self.quantile * 100:g} of {estimate:.4g}"
+        
+        state[0] = count + 1
+        if count < 5:
+            # The first five observations are the initial marker heights
+            heights.append(value)
+            heights.sort()
+            return reason
+        
+        if value < heights[0]:
+            heights[0] = value
+            k = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= heights[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        
+        # Move the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self.increments[i] * count - positions[i]
+            if d >= 1 and positions[i + 1] - positions[i] > 1 or d <= -1 and positions[i - 1] - positions[i] < -1:
+                step = 1 if d > 0 else -1
+                n_prev, n, n_next = positions[i - 1], positions[i], positions[i + 1]
+                q_prev, q, q_next = heights[i - 1], heights[i], heights[i + 1]
+                parabolic = q + step / (n_next - n_prev) * (
+                    (n - n_prev + step) * (q_next - q) / (n_next - n)
+                    + (n_next - n - step) * (q - q_prev) / (n - n_prev)
+                )
+                if q_prev < parabolic < q_next:
+                    heights[i] = parabolic
+                else:
+                    heights[i] = q + step * (heights[i + step] - q) / (positions[i + step] - n)
+                positions[i] = n + step
+        return reason
+
+class SeasonalDetector:
+    """EWMA mean and variance per hour of the week (or other `period` split into `buckets`).
+
+    A value is compared with earlier values from the same slot, so the morning rush is not
+    flagged against a quiet night. State is one array of mean, variance and count per bucket.
+    """
+    name = "seasonal"
+    
+    def __init__(self, settings: Dict[str, Any]):
+        self.alpha = settings.get('alpha', 0.2)
+        self.threshold = settings.get('threshold', 3.0)
+        self.warmup = settings.get('warmup', 3)
+        self.direction = settings.get('direction', 'both')
+        self.period = settings.get('period', 7 * 24 * 3600)
+        self.buckets = settings.get('buckets', 168)
+        self.bucket_seconds = self.period / self.buckets
+    
+    def new_state(self) -> array:
+        return array('d', bytes(8 * 3 * self.buckets))
+    
+    def update(self, state: array, value: float, event_time: float) -> Optional[str]:
+        bucket = int(event_time % self.period // self.bucket_seconds)
+        i = 3 * bucket
+        mean, variance, count = state[i], state[i + 1], state[i + 2]
+        reason = None
+        if count >= self.warmup:
+            z = _z_score(value, mean, variance, self.direction)
+            if z is not None and abs(z) > self.threshold:
+                reason = (f"{value} is {abs(z):.1f} deviations {'above' if z > 0 else 'below'} "
+                          f"its usual {mean:.4g} for this time (slot {bucket})")
+        
+        state[i], state[i + 1] = _ewma_update(mean, variance, count, value, self.alpha)
+        state[i + 2] = count + 1
+        return reason
+
+DETECTORS = {detector.name: detector for detector in (EwmaDetector, QuantileDetector, SeasonalDetector)}
+
+class StatisticalDetectors:
+    """Per-metric streaming detectors with their state kept per (grid cell, source, metric).
+
+    Each state has a fixed size, and states live in CellStateStores, so memory stays bounded
+    however many cells report. Cells are spread over `state.shards` stores, each with its own
+    lock and an equal share of the limits, so workers handling different cells rarely contend.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        settings = config.get('statistical_detectors', {})
+        self.grid = SpatialGrid.from_config(config)
+        self.detectors = {}
+        for metric, metric_settings in settings.get('metrics', {}).items():
+            kind = metric_settings.get('detector', 'ewma')
+            if kind not in DETECTORS:
+                raise ValueError(f"Unknown detector {kind!r} for {metric}; expected one of {sorted(DETECTORS)}")
+            self.detectors[metric] = DETECTORS[kind](metric_settings)
+        self.metrics = list(self.detectors)
+        
+        # Each cell is owned by one worker; worker threads share a store only when their cells
+        # fall in the same shard
+        state = dict(settings.get('state', {}))
+        shards = state.pop('shards', 16)
+        if state.get('max_cells'):
+            state['max_cells'] = max(1, state['max_cells'] // shards)
+        if state.get('max_memory_mb'):
+            state['max_memory_mb'] = state['max_memory_mb'] / shards
+        self.stores = [CellStateStore.from_config(state) for _ in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+    
+    def check(self, source: str, lat: float, lon: float, event_time: float, *values: Optional[float]) -> Tuple[Optional[str], Optional[str]]:
+        """Returns (anomaly_type, anomaly_description) for one event's values of self.metrics"""
+        if all(value is None for value in values):
+            return (None, None)
+        cell = self.grid.cell(lat, lon)
+        shard = cell % len(self.stores)
+        store = self.stores[shard]
+        
+        types, descriptions = [], []
+        with self.locks[shard]:
+            for index, (metric, value) in enumerate(zip(self.metrics, values)):
+                if value is None:
+                    continue
+                detector = self.detectors[metric]
+                
+                # Sources that share a metric name and a cell still learn separate baselines
+                key = (cell, source, index)
+                state = store.get(key, event_time)
+                if state is None:
+                    state = detector.new_state()
+                    store.put(key, state, event_time)
+                
+                reason = detector.update(state, value, event_time)
+                if reason is not None:
+                    types.append(f"{metric}_{detector.name}_anomaly")
+                    descriptions.append(f"Unusual {metric}: {reason}")
+        
+        if not types:
+            return (None, None)
+        return (",".join(types), "; ".join(descriptions))
+    
+    def stats(self) -> Dict[str, Any]:
+        totals = {}
+        for store in self.stores:
+            for name, value in store.stats().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
@@ -0,0 +1,213 @@
+import json
+import os
+import numpy as np
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Array columns; the rest of a document is kept as JSON in the byte heap
+_COLUMNS = {
+    'event_time': np.float64,
+    'lat': np.float64,
+    'lon': np.float64,
+    'source': np.uint16,
+    'cell': np.int64,
+    'offset': np.int64,
+    'length': np.int32,
+    'live': np.bool_
+}
+
+# Document fields held in columns rather than in the heap
+_FIELDS = ('event_time', 'source', 'lat', 'lon')
+
+class DocumentColumns:
+    """RAG documents stored column by column, one row per document in id order.
+
+    Event time, location, source and grid cell are arrays; the remaining fields are compact
+    JSON in one byte heap, decoded only when a document is read. Ids are consecutive integers
+    added in increasing order, so a document's row is its id minus the id of the first row.
+    The rows of removed documents are reclaimed once every older row has been removed too.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in _COLUMNS.items()}
+        # Id of row 0, rows in use, and the first row still live
+        self.first = 0
+        self.count = 0
+        self.head = 0
+        self.live_count = 0
+        self.sources = []
+        self.source_codes = {}
+        # Payloads of rows read from a snapshot, mapped from its file, then of rows added since
+        self.base_heap = np.empty(0, dtype=np.uint8)
+        self.heap = bytearray()
+    
+    def __len__(self) -> int:
+        return self.live_count
+    
+    def __contains__(self, doc_id: int) -> bool:
+        row = doc_id - self.first
+        return self.head <= row < self.count and bool(self.columns['live'][row])
+    
+    def _row(self, doc_id: int) -> int:
+        if doc_id not in self:
+            raise KeyError(doc_id)
+        return doc_id - self.first
+    
+    def __iter__(self) -> Iterator[int]:
+        live = self.columns['live']
+        for row in range(self.head, self.count):
+            if live[row]:
+                yield self.first + row
+    
+    def __reversed__(self) -> Iterator[int]:
+        live = self.columns['live']
+        for row in range(self.count - 1, self.head - 1, -1):
+            if live[row]:
+                yield self.first + row
+    
+    def _reserve(self, count: int):
+        if count <= len(self.columns['live']):
+            return
+        size = max(count, 2 * len(self.columns['live']), self.capacity)
+        for name, column in self.columns.items():
+            grown = np.empty(size, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+    
+    def add(self, doc_id: int, doc: Dict[str, Any], cell: int):
+        if self.count == self.head:
+            # Nothing live, so start again from this id
+            self.first, self.count, self.head = doc_id, 0, 0
+            self.base_heap, self.heap = np.empty(0, dtype=np.uint8), bytearray()
+        elif doc_id != self.first + self.count:
+            raise ValueError(f"Expected document id {self.first + self.count}, got {doc_id}")
+        
+        source = doc['source']
+        code = self.source_codes.get(source)
+        if code is None:
+            code = self.source_codes[source] = len(self.sources)
+            self.sources.append(source)
+        payload = json.dumps({name: value for name, value in doc.items() if name not in _FIELDS}, separators=(',', ':'), default=str).encode()
+        
+        self._reserve(self.count + 1)
+        row = self.count
+        columns = self.columns
+        columns['event_time'][row] = doc['event_time']
+        columns['lat'][row] = doc['lat']
+        columns['lon'][row] = doc['lon']
+        columns['source'][row] = code
+        columns['cell'][row] = cell
+        columns['offset'][row] = len(self.base_heap) + len(self.heap)
+        columns['length'][row] = len(payload)
+        columns['live'][row] = True
+        self.heap += payload
+        self.count += 1
+        self.live_count += 1
+    
+    def _payload(self, row: int) -> bytes:
+        offset = int(self.columns['offset'][row])
+        length = int(self.columns['length'][row])
+        if offset < len(self.base_heap):
+            return self.base_heap[offset:offset + length].tobytes()
+        offset -= len(self.base_heap)
+        return bytes(self.heap[offset:offset + length])
+    
+    def __getitem__(self, doc_id: int) -> Dict[str, Any]:
+        row = self._row(doc_id)
+        columns = self.columns
+        return {
+            'event_time': float(columns['event_time'][row]),
+            'source': self.sources[columns['source'][row]],
+            'lat': float(columns['lat'][row]),
+            'lon': float(columns['lon'][row]),
+            **json.loads(self._payload(row))
+        }
+    
+    def event_time(self, doc_id: int) -> float:
+        return float(self.columns['event_time'][doc_id - self.first])
+    
+    def event_times(self, doc_ids: List[int]) -> np.ndarray:
+        return self.columns['event_time'][np.asarray(doc_ids, dtype=np.int64) - self.first]
+    
+    def location(self, doc_id: int) -> Dict[str, float]:
+        """Returns the event time and location of a document, as QueryScope.contains reads them"""
+        row = doc_id - self.first
+        columns = self.columns
+        return {'event_time': float(columns['event_time'][row]), 'lat': float(columns['lat'][row]), 'lon': float(columns['lon'][row])}
+    
+    def remove(self, doc_id: int) -> int:
+        """Removes a document and returns its cell"""
+        row = self._row(doc_id)
+        cell = int(self.columns['cell'][row])
+        live = self.columns['live']
+        live[row] = False
+        self.live_count -= 1
+        while self.head < self.count and not live[self.head]:
+            self.head += 1
+        if self.head >= max(self.capacity, self.count // 2):
+            self._compact()
+        return cell
+    
+    def _compact(self):
+        # Drops the rows before head, which have all been removed
+        start = int(self.columns['offset'][self.head]) if self.head < self.count else len(self.base_heap) + len(self.heap)
+        if start >= len(self.base_heap):
+            del self.heap[:start - len(self.base_heap)]
+        else:
+            self.heap = bytearray(self.base_heap[start:].tobytes()) + self.heap
+        self.base_heap = np.empty(0, dtype=np.uint8)
+        
+        kept = self.count - self.head
+        size = max(self.capacity, 2 * kept)
+        for name, column in self.columns.items():
+            compacted = np.empty(size, dtype=column.dtype)
+            compacted[:kept] = column[self.head:self.count]
+            self.columns[name] = compacted
+        self.columns['offset'][:kept] -= start
+        self.first += self.head
+        self.count = kept
+        self.head = 0
+    
+    def live_rows(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Returns the ids of the live documents, in id order, and their column values"""
+        rows = self.head + np.flatnonzero(self.columns['live'][self.head:self.count])
+        return self.first + rows, {name: column[rows] for name, column in self.columns.items()}
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": self.count - self.head,
+            "bytes": sum(column.nbytes for column in self.columns.values()) + len(self.base_heap) + len(self.heap)
+        }
+    
+    def save(self, path: str):
+        """Writes the rows from the first live one onwards to `path`"""
+        os.makedirs(path, exist_ok=True)
+        start = int(self.columns['offset'][self.head]) if self.head < self.count else len(self.base_heap) + len(self.heap)
+        for name, column in self.columns.items():
+            rows = column[self.head:self.count]
+            np.save(os.path.join(path, name + '.npy'), rows - start if name == 'offset' else rows)
+        with open(os.path.join(path, 'heap.bin'), 'wb') as f:
+            if start < len(self.base_heap):
+                f.write(self.base_heap[start:].tobytes())
+            f.write(memoryview(self.heap)[max(0, start - len(self.base_heap)):])
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'first': self.first + self.head, 'count': self.count - self.head, 'live': self.live_count, 'sources': self.sources}, f)
+    
+    @classmethod
+    def load(cls, path: str, capacity: int = 1024) -> 'DocumentColumns':
+        """Maps a saved store copy-on-write; pages are read as they are used"""
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        columns = cls(capacity)
+        columns.sources = meta['sources']
+        columns.source_codes = {source: code for code, source in enumerate(columns.sources)}
+        if not meta['count']:
+            return columns
+        columns.columns = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='c') for name in _COLUMNS}
+        columns.first = meta['first']
+        columns.count = meta['count']
+        columns.live_count = meta['live']
+        heap_path = os.path.join(path, 'heap.bin')
+        if os.path.getsize(heap_path):
+            columns.base_heap = np.memmap(heap_path, dtype=np.uint8, mode='r')
+        return columns
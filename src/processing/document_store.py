@@ -0,0 +1,362 @@
+import collections
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import numpy as np
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from .document_columns import DocumentColumns
+from .query_scope import QueryScope
+from .spatial import SpatialGrid
+from .vector_index import FlatIndex, create_index, load_index
+
+logger = logging.getLogger(__name__)
+
+# Metres per degree of latitude
+_METRES_PER_DEGREE = 111320.0
+
+class RetentionPolicy:
+    """Decides which documents to drop, by age and count, overall or per source.
+
+    Ages are measured in event time against the newest event seen. Each source keeps its
+    documents in arrival order and drops from the front, so a document that arrives late
+    is kept until the ones that arrived before it have gone.
+    """
+    
+    def __init__(self, max_age: Optional[float] = None, max_documents: Optional[int] = None, sources: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.max_age = max_age
+        self.max_documents = max_documents
+        self.sources = sources or {}
+        
+        # source -> deque of (event_time, doc_id), in arrival order
+        self.queues = {}
+        self.count = 0
+        self.latest = None
+        self.expired = 0
+        self.evicted = 0
+    
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any]) -> 'RetentionPolicy':
+        return cls(
+            max_age=settings.get('max_age'),
+            max_documents=settings.get('max_documents'),
+            sources=settings.get('sources', {})
+        )
+    
+    def _limit(self, source: str, name: str) -> Optional[float]:
+        return self.sources.get(source, {}).get(name, getattr(self, name))
+    
+    def add(self, doc_id: Hashable, source: str, event_time: float) -> List[Hashable]:
+        """Records a document and returns the ids of documents to drop, possibly including it"""
+        self.queues.setdefault(source, collections.deque()).append((event_time, doc_id))
+        self.count += 1
+        self.latest = event_time if self.latest is None else max(self.latest, event_time)
+        
+        dropped = []
+        for name, queue in self.queues.items():
+            max_age = self._limit(name, 'max_age')
+            if max_age is not None:
+                while queue and queue[0][0] < self.latest - max_age:
+                    dropped.append(queue.popleft()[1])
+                    self.expired += 1
+            max_documents = self._limit(name, 'max_documents')
+            if max_documents is not None:
+                while len(queue) > max_documents:
+                    dropped.append(queue.popleft()[1])
+                    self.evicted += 1
+        self.count -= len(dropped)
+        
+        # Over the overall cap, drop the oldest document of any source
+        if self.max_documents is not None:
+            while self.count > self.max_documents:
+                oldest = min((queue for queue in self.queues.values() if queue), key=lambda queue: queue[0][0])
+                dropped.append(oldest.popleft()[1])
+                self.evicted += 1
+                self.count -= 1
+        return dropped
+    
+    def remove(self, doc_id: Hashable, source: str) -> bool:
+        """Forgets a document dropped for another reason than retention"""
+        queue = self.queues.get(source, ())
+        # Documents removed this way are usually recent, so look from the newest end
+        for i in range(len(queue) - 1, -1, -1):
+            if queue[i][1] == doc_id:
+                del queue[i]
+                self.count -= 1
+                return True
+        return False
+    
+    def restore(self, doc_ids: np.ndarray, source_codes: np.ndarray, sources: List[str], event_times: np.ndarray, state: Dict[str, Any]):
+        """Rebuilds the queues from the documents held, in arrival order, and a saved state()"""
+        self.queues = {}
+        for code, source in enumerate(sources):
+            held = source_codes == code
+            if held.any():
+                self.queues[source] = collections.deque(zip(event_times[held].tolist(), doc_ids[held].tolist()))
+        self.count = len(doc_ids)
+        self.latest = state['latest']
+        self.expired = state['expired']
+        self.evicted = state['evicted']
+    
+    def state(self) -> Dict[str, Any]:
+        return {"latest": self.latest, "expired": self.expired, "evicted": self.evicted}
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": self.count,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
+
+class DocumentStore:
+    """RAG documents and their embeddings, kept within a RetentionPolicy.
+
+    Documents are added before they are embedded; an embedding that arrives for a document
+    already dropped is discarded. Searches rank by similarity weighted towards recent events:
+    a document `recency_half_life` seconds older than the newest loses half of `recency_weight`.
+
+    Documents are also filed by grid cell, so a search scoped to a place and time window
+    scores only the documents inside it. When more than `max_candidates` match, the scope is
+    applied to the index's nearest results instead.
+
+    Documents are held in DocumentColumns. save() writes them and the index to a snapshot
+    directory, and restore() maps the latest snapshot back without reading it all.
+    """
+    
+    def __init__(
+        self,
+        retention: RetentionPolicy,
+        index=None,
+        recency_weight: float = 0.25,
+        recency_half_life: float = 3600,
+        oversample: int = 4,
+        grid: Optional[SpatialGrid] = None,
+        max_candidates: int = 20000,
+        lateness: float = 300
+    ):
+        self.retention = retention
+        self.recency_weight = recency_weight
+        self.recency_half_life = recency_half_life
+        self.oversample = oversample
+        self.documents = DocumentColumns()
+        self.index = index if index is not None else FlatIndex()
+        self.next_id = 0
+        self.lock = threading.Lock()
+        
+        self.grid = grid or SpatialGrid()
+        self.max_candidates = max_candidates
+        # How far out of order events arrive, in seconds of event time
+        self.lateness = lateness
+        # cell -> documents in arrival order (dict keys)
+        self.cells = {}
+        self.prefiltered = 0
+        self.postfiltered = 0
+    
+    @classmethod
+    def from_config(cls, rag_config: Dict[str, Any]) -> 'DocumentStore':
+        retention = rag_config.get('retention', {})
+        prefilter = rag_config.get('prefilter', {})
+        store = cls(
+            RetentionPolicy.from_config(retention),
+            index=create_index(rag_config.get('index', {})),
+            recency_weight=retention.get('recency_weight', 0.25),
+            recency_half_life=retention.get('recency_half_life', 3600),
+            oversample=retention.get('oversample', 4),
+            grid=SpatialGrid(prefilter.get('resolution', 15)),
+            max_candidates=prefilter.get('max_candidates', 20000),
+            lateness=prefilter.get('lateness', 300)
+        )
+        path = rag_config.get('store', {}).get('path')
+        if path:
+            store.restore(path)
+        return store
+    
+    def __len__(self) -> int:
+        return len(self.documents)
+    
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self.documents
+    
+    def __getitem__(self, doc_id: int) -> dict:
+        return self.documents[doc_id]
+    
+    def add(self, doc: dict) -> int:
+        """Stores a document and drops the ones retention no longer allows; returns its id"""
+        with self.lock:
+            doc_id = self.next_id
+            self.next_id += 1
+            cell = self.grid.cell(doc['lat'], doc['lon'])
+            self.documents.add(doc_id, doc, cell)
+            self.cells.setdefault(cell, {})[doc_id] = None
+            for dropped in self.retention.add(doc_id, doc['source'], doc['event_time']):
+                self._drop(dropped)
+        return doc_id
+    
+    def _drop(self, doc_id: int):
+        cell = self.documents.remove(doc_id)
+        self.index.remove(doc_id)
+        del self.cells[cell][doc_id]
+        if not self.cells[cell]:
+            del self.cells[cell]
+    
+    def remove(self, doc_id: int) -> bool:
+        """Drops a document before retention would, e.g. when the pipeline retracts it"""
+        with self.lock:
+            if doc_id not in self.documents:
+                return False
+            self.retention.remove(doc_id, self.documents[doc_id]['source'])
+            self._drop(doc_id)
+        return True
+    
+    def add_embeddings(self, embeddings: List[Any], doc_ids: List[int]):
+        with self.lock:
+            for embedding, doc_id in zip(embeddings, doc_ids):
+                if doc_id in self.documents:
+                    self.index.add(doc_id, embedding)
+    
+    def unembedded(self) -> List[int]:
+        """Returns the documents held that are not in the index yet"""
+        with self.lock:
+            return [doc_id for doc_id in self.documents if doc_id not in self.index]
+    
+    def _cells_near(self, lat: float, lon: float, radius: float) -> List[int]:
+        # Enough cells in each direction to cover the radius
+        lat_metres = self.grid.lat_step * _METRES_PER_DEGREE
+        lon_metres = self.grid.lon_step * _METRES_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        steps = math.ceil(radius / min(lat_metres, lon_metres))
+        if (2 * steps + 1) ** 2 > len(self.cells):
+            return list(self.cells)
+        return self.grid.neighbours(self.grid.cell(lat, lon), steps)
+    
+    def _recent(self, doc_ids, since: Optional[float]):
+        # Documents are held in arrival order; stop once past the window plus lateness
+        for doc_id in reversed(doc_ids):
+            if since is not None and self.documents.event_time(doc_id) < since - self.lateness:
+                return
+            yield doc_id
+    
+    def _candidates(self, scope: QueryScope, since: Optional[float]) -> Optional[List[int]]:
+        """Returns the embedded documents inside the scope, or None if there are more than max_candidates"""
+        if scope.near is not None:
+            doc_ids = (
+                doc_id for cell in self._cells_near(*scope.near, scope.radius)
+                for doc_id in self._recent(self.cells.get(cell, {}), since)
+            )
+        else:
+            doc_ids = self._recent(self.documents, since)
+        
+        candidates = []
+        for doc_id in doc_ids:
+            if doc_id in self.index and scope.contains(self.documents.location(doc_id), since):
+                candidates.append(doc_id)
+                if len(candidates) > self.max_candidates:
+                    return None
+        return candidates
+    
+    def search(self, vector: Any, k: int, scope: Optional[QueryScope] = None) -> List[Tuple[int, dict, float]]:
+        """Returns up to k (doc_id, document, score), best first, from inside the scope if given"""
+        with self.lock:
+            latest = self.retention.latest
+            if latest is None:
+                return []
+            since = latest - scope.window if scope and scope.window is not None else None
+            candidates = self._candidates(scope, since) if scope else None
+            
+            if candidates is not None:
+                self.prefiltered += 1
+                doc_ids, similarities = candidates, self.index.similarities(vector, candidates)
+            else:
+                # Recency can only lower a score, so rank a few times k by similarity first
+                pairs = self.index.search(vector, k * self.oversample * (4 if scope else 1))
+                if scope:
+                    self.postfiltered += 1
+                    pairs = [(doc_id, similarity) for doc_id, similarity in pairs if scope.contains(self.documents.location(doc_id), since)]
+                doc_ids = [doc_id for doc_id, _ in pairs]
+                similarities = np.array([similarity for _, similarity in pairs], dtype=np.float32)
+            if not doc_ids:
+                return []
+            
+            ages = np.maximum(latest - self.documents.event_times(doc_ids), 0.0)
+            recency = 0.5 ** (ages / self.recency_half_life)
+            scores = similarities * (1.0 - self.recency_weight + self.recency_weight * recency)
+            # Only the documents returned are decoded
+            best = np.argsort(-scores, kind='stable')[:k]
+            return [(doc_ids[i], self.documents[doc_ids[i]], float(scores[i])) for i in best]
+    
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                **self.retention.stats(),
+                "index": self.index.stats(),
+                "columns": self.documents.stats(),
+                "prefiltered_searches": self.prefiltered,
+                "postfiltered_searches": self.postfiltered
+            }
+    
+    def save(self, path: str):
+        """Writes a snapshot of the documents and index under `path`, then removes older snapshots.
+
+        `path`/CURRENT names the latest complete snapshot, so a crash while saving leaves the
+        previous one in use. Adds and searches wait while the snapshot is written.
+        """
+        os.makedirs(path, exist_ok=True)
+        previous = _current_snapshot(path)
+        name = f"snapshot-{int(previous.rsplit('-', 1)[1]) + 1 if previous else 1}"
+        directory = os.path.join(path, name)
+        shutil.rmtree(directory, ignore_errors=True)
+        with self.lock:
+            self.documents.save(os.path.join(directory, 'documents'))
+            self.index.save(os.path.join(directory, 'index'))
+            with open(os.path.join(directory, 'meta.json'), 'w') as f:
+                json.dump({'next_id': self.next_id, 'resolution': self.grid.resolution, 'retention': self.retention.state()}, f)
+        
+        with open(os.path.join(path, 'CURRENT.tmp'), 'w') as f:
+            f.write(name)
+        os.replace(os.path.join(path, 'CURRENT.tmp'), os.path.join(path, 'CURRENT'))
+        # Mapped files stay readable after removal, until the arrays using them are dropped
+        for entry in os.listdir(path):
+            if entry.startswith('snapshot-') and entry != name:
+                shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+    
+    def restore(self, path: str) -> bool:
+        """Loads the latest snapshot under `path`, if there is one.
+
+        Documents, vectors and the index are mapped copy-on-write, so pages are read from disk
+        as they are used. The grid cells and retention queues are rebuilt from the columns.
+        """
+        name = _current_snapshot(path)
+        if name is None:
+            return False
+        directory = os.path.join(path, name)
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        
+        with self.lock:
+            self.documents = DocumentColumns.load(os.path.join(directory, 'documents'))
+            self.index = load_index(os.path.join(directory, 'index'))
+            self.next_id = meta['next_id']
+            doc_ids, columns = self.documents.live_rows()
+            cells = columns['cell']
+            if meta['resolution'] != self.grid.resolution:
+                cells = np.array([self.grid.cell(lat, lon) for lat, lon in zip(columns['lat'].tolist(), columns['lon'].tolist())], dtype=np.int64)
+                self.documents.columns['cell'][doc_ids - self.documents.first] = cells
+            
+            # Documents of each cell, in arrival order
+            order = np.argsort(cells, kind='stable')
+            boundaries = np.flatnonzero(np.diff(cells[order])) + 1
+            self.cells = {
+                int(cells[group[0]]): dict.fromkeys(doc_ids[group].tolist())
+                for group in np.split(order, boundaries) if len(group)
+            }
+            self.retention.restore(doc_ids, columns['source'], self.documents.sources, columns['event_time'], meta['retention'])
+        logger.info("Restored %d RAG documents from %s", len(doc_ids), directory)
+        return True
+
+def _current_snapshot(path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(path, 'CURRENT')) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,338 @@
+import collections
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingStats:
+    def __init__(self):
+        self.documents = 0
+        self.batches = 0
+        self.failed = 0
+        self.embed_seconds = 0.0
+        # Seconds from a document being added to it being in the index, summed
+        self.delay_seconds = 0.0
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "documents": self.documents,
+            "batches": self.batches,
+            "failed": self.failed,
+            "mean_batch_size": self.documents / self.batches if self.batches else 0.0,
+            "embed_seconds": self.embed_seconds,
+            "mean_delay": self.delay_seconds / self.documents if self.documents else 0.0
+        }
+
+class EmbeddingBatcher:
+    """Buffers documents and embeds them in batches on a thread pool.
+
+    A batch is embedded once `batch_size` documents are buffered, or once the oldest one has
+    waited `max_latency` seconds. Batches run on `workers` threads; the model releases the GIL
+    while it computes, so they overlap on a multi-core CPU. `add` blocks once `max_in_flight`
+    batches are waiting, which bounds memory when the model cannot keep up.
+    """
+    
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Sequence[Any]],
+        on_embedded: Callable[[Sequence[Any], List[Any]], None],
+        batch_size: int = 64,
+        max_latency: float = 0.5,
+        workers: int = 2,
+        max_in_flight: int = None
+    ):
+        self.embed_batch = embed_batch
+        self.on_embedded = on_embedded
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding")
+        self.slots = threading.BoundedSemaphore(max_in_flight or 2 * workers)
+        self.stats = EmbeddingStats()
+        
+        self.texts = []
+        self.items = []
+        self.added = []
+        self.in_flight = set()
+        # Batches taken from the buffer but not yet in in_flight
+        self.taking = 0
+        self.condition = threading.Condition()
+        self.closed = False
+        self.flusher = threading.Thread(target=self._flush_when_due, daemon=True)
+        self.flusher.start()
+    
+    @classmethod
+    def from_config(cls, embed_batch, on_embedded, settings: Dict[str, Any]) -> 'EmbeddingBatcher':
+        return cls(
+            embed_batch,
+            on_embedded,
+            batch_size=settings.get('batch_size', 64),
+            max_latency=settings.get('max_latency', 0.5),
+            workers=settings.get('workers', 2),
+            max_in_flight=settings.get('max_in_flight')
+        )
+    
+    def add(self, text: str, item: Any):
+        with self.condition:
+            self.texts.append(text)
+            self.items.append(item)
+            self.added.append(time.perf_counter())
+            if len(self.texts) == 1:
+                # Start the max_latency timer
+                self.condition.notify_all()
+            if len(self.texts) < self.batch_size:
+                return
+            batch = self._take()
+        self._submit(*batch)
+    
+    def _take(self):
+        self.taking += 1
+        batch = (self.texts, self.items, self.added)
+        self.texts, self.items, self.added = [], [], []
+        return batch
+    
+    def _flush_when_due(self):
+        while True:
+            with self.condition:
+                while not self.texts and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                due = self.added[0] + self.max_latency - time.perf_counter()
+                if due > 0:
+                    self.condition.wait(due)
+                    continue
+                batch = self._take()
+            self._submit(*batch)
+    
+    def _submit(self, texts, items, added):
+        self.slots.acquire()
+        future = self.executor.submit(self._embed, texts, items, added)
+        with self.condition:
+            self.in_flight.add(future)
+            self.taking -= 1
+            self.condition.notify_all()
+        future.add_done_callback(self._done)
+    
+    def _done(self, future):
+        with self.condition:
+            self.in_flight.discard(future)
+            self.condition.notify_all()
+        self.slots.release()
+        if future.exception() is not None:
+            logger.error("Embedding a batch failed: %s", future.exception())
+    
+    def _embed(self, texts, items, added):
+        start = time.perf_counter()
+        try:
+            embeddings = self.embed_batch(texts)
+            self.on_embedded(embeddings, items)
+        except Exception:
+            # The batch is dropped; the pipeline keeps running
+            with self.condition:
+                self.stats.failed += len(texts)
+            raise
+        finished = time.perf_counter()
+        
+        with self.condition:
+            self.stats.documents += len(texts)
+            self.stats.batches += 1
+            self.stats.embed_seconds += finished - start
+            self.stats.delay_seconds += sum(finished - t for t in added)
+    
+    def flush(self):
+        """Embeds everything added so far and waits until it is indexed or has failed"""
+        with self.condition:
+            batch = self._take() if self.texts else None
+        if batch:
+            self._submit(*batch)
+        with self.condition:
+            # Batches another thread is submitting count as added before this flush
+            while self.taking:
+                self.condition.wait()
+            pending = list(self.in_flight)
+        for future in pending:
+            future.exception()
+    
+    def wait(self, timeout: float) -> bool:
+        """Waits up to `timeout` seconds for every added document to be indexed, without submitting
+        batches early; returns whether nothing is left to embed"""
+        deadline = time.perf_counter() + timeout
+        with self.condition:
+            while self.texts or self.taking or self.in_flight:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+    
+    def close(self):
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.executor.shutdown(wait=True)
+
+def normalize_document(text: str) -> str:
+    """Collapses runs of whitespace, which do not change what a document says"""
+    return " ".join(text.split())
+
+class DiskEmbeddings:
+    """Append-only embedding store in `path`, read through a memory map.
+
+    `keys.bin` holds the 16-byte key of each row and `vectors.f32` the rows themselves, so a
+    restart only reads the keys and pages vectors in as they are looked up.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.keys_path = os.path.join(path, 'keys.bin')
+        self.vectors_path = os.path.join(path, 'vectors.f32')
+        self.meta_path = os.path.join(path, 'meta.json')
+        
+        self.dim = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)['dim']
+        
+        self.rows = {}
+        keys = b""
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, 'rb') as f:
+                keys = f.read()
+        # Rows whose vector was not fully written before a crash are ignored
+        count = len(keys) // 16
+        if self.dim is not None and os.path.exists(self.vectors_path):
+            count = min(count, os.path.getsize(self.vectors_path) // (4 * self.dim))
+        else:
+            count = 0
+        for row in range(count):
+            self.rows[keys[16 * row:16 * (row + 1)]] = row
+        
+        self.count = count
+        self.mapped = None
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        if self.mapped is None or row >= len(self.mapped):
+            # Map again to see rows appended since the last mapping
+            self.mapped = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self.count, self.dim))
+        return np.array(self.mapped[row])
+    
+    def put_many(self, keys: List[bytes], vectors: np.ndarray):
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            with open(self.meta_path, 'w') as f:
+                json.dump({'dim': self.dim}, f)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embeddings have {vectors.shape[1]} dimensions but {self.path} holds {self.dim}")
+        
+        # The same row range in both files, vectors first so a key never points past the end
+        with open(self.vectors_path, 'r+b' if os.path.exists(self.vectors_path) else 'wb') as f:
+            f.seek(4 * self.dim * self.count)
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self.keys_path, 'r+b' if os.path.exists(self.keys_path) else 'wb') as f:
+            f.seek(16 * self.count)
+            f.write(b"".join(keys))
+        for key in keys:
+            self.rows[key] = self.count
+            self.count += 1
+
+class EmbeddingCache:
+    """Embeddings keyed by a hash of the model name and normalised document text.
+
+    Recently used embeddings are kept in memory, up to `max_entries`; with `path` set, every
+    embedding is also written to a DiskEmbeddings store there, which survives restarts.
+    """
+    
+    def __init__(self, model: str, max_entries: int = 100000, path: Optional[str] = None):
+        self.model = model
+        self.max_entries = max_entries
+        self.memory = collections.OrderedDict()
+        self.disk = DiskEmbeddings(path) if path else None
+        self.lock = threading.Lock()
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    
+    @classmethod
+    def from_config(cls, model: str, settings: Dict[str, Any]) -> Optional['EmbeddingCache']:
+        if not settings.get('enabled', True):
+            return None
+        return cls(model, max_entries=settings.get('max_entries', 100000), path=settings.get('path'))
+    
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.model}\0{normalize_document(text)}".encode(), digest_size=16).digest()
+    
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+    
+    def _lookup(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return vector
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector
+        self.misses += 1
+        return None
+    
+    def embed(self, texts: List[str], embed_batch: Callable[[List[str]], Sequence[Any]]) -> List[np.ndarray]:
+        """Returns an embedding per text, calling embed_batch once for the texts not cached"""
+        keys = [self.key(text) for text in texts]
+        with self.lock:
+            vectors = [self._lookup(key) for key in keys]
+        
+        # Texts repeated within the batch are embedded once
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[i], i)
+        if not missing:
+            return vectors
+        
+        computed = np.asarray(embed_batch([texts[i] for i in missing.values()]), dtype=np.float32)
+        with self.lock:
+            for key, vector in zip(missing, computed):
+                self._remember(key, vector)
+            if self.disk is not None:
+                # Another batch may have embedded the same text meanwhile
+                new = [j for j, key in enumerate(missing) if key not in self.disk.rows]
+                if new:
+                    missing_keys = list(missing)
+                    self.disk.put_many([missing_keys[j] for j in new], computed[new])
+        
+        fresh = dict(zip(missing, computed))
+        return [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self.memory),
+            "disk_entries": len(self.disk) if self.disk is not None else 0
+        }
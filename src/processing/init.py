@@ -1,4 +0,0 @@
-from .anomaly_detection import AnomalyDetector
-from .rag_system import RAGSystem
-
-__all__ = ['AnomalyDetector', 'RAGSystem']
@@ -0,0 +1,41 @@
+from typing import Any, Dict
+
+class ChatCompletion:
+    """Answers a prompt with one request to an OpenAI-compatible /chat/completions endpoint.
+
+    pathway's OpenAIChat is a UDF over a column of messages, so it cannot answer a single
+    question outside the dataflow; this is what RAGSystem.query() calls instead.
+    """
+    
+    def __init__(self, model: str, api_key: str, base_url: str = "https://api.openai.com/v1", temperature: float = 0.3, timeout: float = 60):
+        import requests
+        
+        self.model = model
+        self.api_key = api_key
+        self.url = base_url.rstrip('/') + "/chat/completions"
+        self.temperature = temperature
+        self.timeout = timeout
+        # Connections are reused across questions
+        self.session = requests.Session()
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'ChatCompletion':
+        llm = config['llm']
+        return cls(
+            model=llm['model'],
+            api_key=llm['api_key'],
+            base_url=llm.get('base_url', "https://api.openai.com/v1"),
+            temperature=llm.get('temperature', 0.3),
+            timeout=llm.get('timeout', 60)
+        )
+    
+    def generate(self, prompt: str) -> str:
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature
+        }
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        response = self.session.post(self.url, json=body, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
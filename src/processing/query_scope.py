@@ -0,0 +1,82 @@
+import math
+import re
+from typing import Any, Dict, Optional, Tuple
+
+EARTH_RADIUS = 6371000.0
+
+_DURATION = re.compile(r"\b(?:last|past)\s+(\d+(?:\.\d+)?\s*)?(seconds?|secs?|minutes?|mins?|hours?|hrs?|days?)\b", re.IGNORECASE)
+_DISTANCE = re.compile(r"\bwithin\s+(\d+(?:\.\d+)?)\s*(km|kilomet(?:er|re)s?|m|met(?:er|re)s?)\b", re.IGNORECASE)
+_COORDINATES = re.compile(r"(-?\d{1,2}\.\d+)\s*,\s*(-?\d{1,3}\.\d+)")
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Returns the great-circle distance in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+class QueryScope:
+    """Where and when a question is about: within `radius` metres of `near`, and events
+    no older than `window` seconds before the newest one. Either part may be None.
+    """
+    
+    def __init__(self, near: Optional[Tuple[float, float]] = None, radius: float = 1000.0, window: Optional[float] = None):
+        self.near = tuple(near) if near is not None else None
+        self.radius = radius
+        self.window = window
+    
+    def __bool__(self) -> bool:
+        return self.near is not None or self.window is not None
+    
+    def __repr__(self) -> str:
+        return f"QueryScope(near={self.near}, radius={self.radius}, window={self.window})"
+    
+    @property
+    def key(self) -> Tuple:
+        """Equal for scopes that select the same documents"""
+        return (self.near, self.radius if self.near is not None else None, self.window)
+    
+    def contains(self, doc: dict, since: Optional[float]) -> bool:
+        if since is not None and doc['event_time'] < since:
+            return False
+        if self.near is not None and distance(self.near[0], self.near[1], doc['lat'], doc['lon']) > self.radius:
+            return False
+        return True
+
+class ScopeParser:
+    """Reads a QueryScope from a question's wording.
+
+    Understands "last 15 minutes" or "past hour", "within 2 km", coordinates such as
+    "40.78, -73.97", and place names from `places` (name -> [lat, lon]).
+    """
+    
+    def __init__(self, places: Optional[Dict[str, Any]] = None, radius: float = 1000.0):
+        # Longest names first, so "Central Park West" wins over "Central Park"
+        self.places = sorted(((name.lower(), tuple(location)) for name, location in (places or {}).items()), key=lambda place: -len(place[0]))
+        self.radius = radius
+    
+    def parse(self, question: str) -> QueryScope:
+        window = None
+        match = _DURATION.search(question)
+        if match:
+            amount = float(match.group(1)) if match.group(1) else 1.0
+            window = amount * _UNIT_SECONDS[match.group(2)[0].lower()]
+        
+        radius = self.radius
+        match = _DISTANCE.search(question)
+        if match:
+            radius = float(match.group(1)) * (1000.0 if match.group(2).lower().startswith('k') else 1.0)
+        
+        near = None
+        match = _COORDINATES.search(question)
+        if match:
+            near = (float(match.group(1)), float(match.group(2)))
+        else:
+            lowered = question.lower()
+            for name, location in self.places:
+                if name in lowered:
+                    near = location
+                    break
+        return QueryScope(near=near, radius=radius, window=window)
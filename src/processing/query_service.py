@@ -0,0 +1,268 @@
+import asyncio
+import collections
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from .embedding import normalize_document
+
+logger = logging.getLogger(__name__)
+
+class StreamingChat:
+    """Streams completions from an OpenAI-compatible /chat/completions endpoint"""
+    
+    def __init__(self, model: str, api_key: str, base_url: str = "https://api.openai.com/v1", temperature: float = 0.3):
+        self.model = model
+        self.api_key = api_key
+        self.url = base_url.rstrip('/') + "/chat/completions"
+        self.temperature = temperature
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'StreamingChat':
+        llm = config['llm']
+        return cls(
+            model=llm['model'],
+            api_key=llm['api_key'],
+            base_url=llm.get('base_url', "https://api.openai.com/v1"),
+            temperature=llm.get('temperature', 0.3)
+        )
+    
+    async def stream(self, session, prompt: str) -> AsyncIterator[str]:
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "stream": True
+        }
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        async with session.post(self.url, json=body, headers=headers) as response:
+            response.raise_for_status()
+            # Server-sent events, one "data: {...}" line per chunk
+            async for line in response.content:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    return
+                delta = json.loads(data)["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    yield delta["content"]
+
+class QueryStats:
+    def __init__(self, max_samples=10000):
+        self.queries = 0
+        self.cached = 0
+        self.coalesced = 0
+        self.generated = 0
+        self.timeouts = 0
+        self.failed = 0
+        # Seconds from a query arriving to its first token, for the latest queries
+        self.first_token = collections.deque(maxlen=max_samples)
+    
+    def as_dict(self) -> Dict[str, Any]:
+        first_token = sorted(self.first_token)
+        return {
+            "queries": self.queries,
+            "cached": self.cached,
+            "coalesced": self.coalesced,
+            "generated": self.generated,
+            "timeouts": self.timeouts,
+            "failed": self.failed,
+            "first_token_p50": first_token[len(first_token) // 2] if first_token else None
+        }
+
+class _Generation:
+    """Tokens of one answer as they arrive, readable by every query waiting for it"""
+    
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Event()
+    
+    def _notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+    
+    def append(self, token: str):
+        self.tokens.append(token)
+        self._notify()
+    
+    def finish(self, error: Optional[BaseException] = None):
+        self.done = True
+        self.error = error
+        self._notify()
+    
+    async def follow(self) -> AsyncIterator[str]:
+        """Yields every token from the first, then new ones until the answer is complete"""
+        position = 0
+        while True:
+            while position < len(self.tokens):
+                yield self.tokens[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self.changed.wait()
+
+class QueryService:
+    """Answers RAG queries on its own asyncio loop, streaming tokens as the LLM produces them.
+
+    At most `max_concurrency` answers are generated at once; further queries wait their turn.
+    A query identical to one being answered, with the same scope and retrieved documents,
+    follows that answer instead of starting another. A query with no complete answer after
+    `timeout` seconds, including retrieval and time spent waiting, fails with asyncio.TimeoutError.
+    """
+    
+    def __init__(self, rag_system, chat: Optional[StreamingChat] = None, max_concurrency: int = 4, timeout: float = 60, pool_size: int = 8, max_samples: int = 10000):
+        self.rag_system = rag_system
+        self.chat = chat
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.stats = QueryStats(max_samples)
+        
+        # (question, scope, doc_ids) -> _Generation of answers being generated
+        self.in_flight = {}
+        self.loop = None
+        self.thread = None
+    
+    @classmethod
+    def from_config(cls, rag_system, config: Dict[str, Any]) -> 'QueryService':
+        settings = config.get('rag', {}).get('queries', {})
+        return cls(
+            rag_system,
+            # Without streaming, answers come whole from the RAG system's LLM
+            chat=StreamingChat.from_config(config) if settings.get('streaming', True) else None,
+            max_concurrency=settings.get('max_concurrency', 4),
+            timeout=settings.get('timeout', 60),
+            pool_size=settings.get('pool_size', 8),
+            max_samples=settings.get('max_samples', 10000)
+        )
+    
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+    
+    async def _start(self):
+        self.slots = asyncio.Semaphore(self.max_concurrency)
+        self.session = None
+        if self.chat is not None:
+            import aiohttp
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+    
+    async def stream(self, question: str, k: int = 5, near: Optional[Tuple[float, float]] = None, radius: Optional[float] = None, window: Optional[float] = None) -> AsyncIterator[str]:
+        """Yields the answer to a question token by token"""
+        received = time.perf_counter()
+        first = True
+        self.stats.queries += 1
+        async for token in self._tokens(question, k, near, radius, window, received):
+            if first:
+                self.stats.first_token.append(time.perf_counter() - received)
+                first = False
+            yield token
+    
+    async def _tokens(self, question, k, near, radius, window, received) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        # Embedding the question and searching run on a worker thread
+        question_embedding, scope, results = await loop.run_in_executor(
+            None, self.rag_system.retrieve, question, k, near, radius, window
+        )
+        doc_ids = [doc_id for doc_id, _, _ in results]
+        
+        answers = self.rag_system.answers
+        if answers is not None:
+            answer = answers.get(question_embedding, scope.key, doc_ids)
+            if answer is not None:
+                self.stats.cached += 1
+                yield answer
+                return
+        
+        key = (normalize_document(question).lower(), scope.key, tuple(doc_ids))
+        generation = self.in_flight.get(key)
+        if generation is not None:
+            self.stats.coalesced += 1
+        else:
+            generation = _Generation()
+            self.in_flight[key] = generation
+            prompt = self.rag_system.prompt(question, results)
+            # Time spent retrieving counts against the query's timeout
+            timeout = self.timeout - (time.perf_counter() - received)
+            asyncio.ensure_future(self._generate(key, generation, prompt, question_embedding, scope, doc_ids, timeout))
+        
+        async for token in generation.follow():
+            yield token
+    
+    async def _generate(self, key, generation: _Generation, prompt: str, question_embedding, scope, doc_ids: List[int], timeout: float):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._produce(generation, prompt), max(0.0, timeout))
+        except asyncio.TimeoutError as e:
+            self.stats.timeouts += 1
+            generation.finish(e)
+        except Exception as e:
+            self.stats.failed += 1
+            logger.warning("Generating an answer failed: %s", e)
+            generation.finish(e)
+        else:
+            self.stats.generated += 1
+            generation.finish()
+            if self.rag_system.answers is not None:
+                self.rag_system.answers.put(question_embedding, scope.key, doc_ids, "".join(generation.tokens), time.perf_counter() - start)
+        finally:
+            del self.in_flight[key]
+    
+    async def _produce(self, generation: _Generation, prompt: str):
+        async with self.slots:
+            if self.chat is None:
+                # One blocking chat completion, on a worker thread
+                loop = asyncio.get_running_loop()
+                generation.append(await loop.run_in_executor(None, self.rag_system.llm.generate, prompt))
+                return
+            async for token in self.chat.stream(self.session, prompt):
+                generation.append(token)
+    
+    async def query(self, question: str, **kwargs) -> str:
+        return "".join([token async for token in self.stream(question, **kwargs)])
+    
+    def stream_sync(self, question: str, **kwargs) -> Iterator[str]:
+        """stream() for synchronous callers such as the dashboard; tokens arrive as they are produced"""
+        tokens = queue.Queue()
+        done = object()
+        
+        async def forward():
+            try:
+                async for token in self.stream(question, **kwargs):
+                    tokens.put(token)
+            except BaseException as e:
+                tokens.put(e)
+            finally:
+                tokens.put(done)
+        
+        asyncio.run_coroutine_threadsafe(forward(), self.loop)
+        while True:
+            token = tokens.get()
+            if token is done:
+                return
+            if isinstance(token, BaseException):
+                raise token
+            yield token
+    
+    async def _close(self):
+        if self.session is not None:
+            await self.session.close()
+    
+    def close(self):
+        if self.loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), self.loop).result()
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop = None
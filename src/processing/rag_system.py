@@ -1,56 +1,186 @@
-import pathway as pw
-from pathway.xpacks.llm import embedders, llms
-from pathway.stdlib.ml.index import KNNIndex
-import json
+from pathway.xpacks.llm import embedders
+import logging
+import threading
+import time
+from typing import Optional, Tuple
+from .answer_cache import AnswerCache
+from .document_store import DocumentStore
+from .embedding import EmbeddingBatcher, EmbeddingCache
+from .llm import ChatCompletion
+from .query_scope import QueryScope, ScopeParser
+from .rollup import DERIVED_TYPES
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Columns described by the location/source part of a document rather than its fields
+_DOCUMENT_KEYS = ('timestamp', 'event_time', 'source', 'lat', 'lon')
+
+def document_fields(doc: dict) -> str:
+    """Formats the non-null event columns of a document as `name=value` pairs"""
+    return ", ".join(
+        f"{name}={value}" for name, value in doc.items()
+        if name not in _DOCUMENT_KEYS and value is not None
+    )
+
+def document_text(doc: dict) -> str:
+    """Text representation of a document, as it is embedded"""
+    return f"{doc['source']}: {document_fields(doc)} at {doc['lat']},{doc['lon']}"
 
 class RAGSystem:
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, embedder=None, llm=None):
         self.config = config
-        self.embedder = embedders.SentenceTransformerEmbedder(
-            model="all-MiniLM-L6-v2"
-        )
-        self.llm = llms.OpenAIChat(
-            model=config['llm']['model'],
-            api_key=config['llm']['api_key'],
-            temperature=config['llm'].get('temperature', 0.3)
+        self.embedder = embedder or embedders.SentenceTransformerEmbedder(
+            model=EMBEDDING_MODEL
         )
-        self.index = KNNIndex()
-        self.documents = []
-    
-    @pw.udf
-    def add_document(self, data: pw.Json, source: str, location: pw.Json) -> bool:
-        doc = {
-            "timestamp": pw.now().strftime('%Y-%m-%dT%H:%M:%S.%f'),
-            "source": source,
-            "data": data,
-            "location": location
-        }
+        self.llm = llm or ChatCompletion.from_config(config)
+        # Documents and their embeddings, dropped once retention no longer allows them
+        rag_config = config.get('rag', {})
+        self.documents = DocumentStore.from_config(rag_config)
+        # Reads the place and time window a question is about
+        self.scope_parser = ScopeParser(rag_config.get('places', {}), rag_config.get('prefilter', {}).get('radius', 1000))
+        
+        # Documents are embedded in batches off the pipeline thread
+        embedding_config = rag_config.get('embedding', {})
+        self.cache = EmbeddingCache.from_config(EMBEDDING_MODEL, embedding_config.get('cache', {}))
+        self.batcher = EmbeddingBatcher.from_config(self._embed_batch, self.documents.add_embeddings, embedding_config)
         
-        # Create text representation for embedding
-        text = f"{source}: {json.dumps(data)} at {location['lat']},{location['lon']}"
+        # Derived rows are updated while the operators producing them settle, so their documents
+        # are kept by Pathway key, as (text, doc_id) per version, until retracted; rows read from
+        # sources are only ever added
+        self.retractable = {}
+        self.prune_retractable_at = 1024
         
-        # Embed and add to index
-        embedding = self.embedder.embed_query(text)
-        self.index.add_document(embedding, doc)
-        self.documents.append(doc)
+        # Queries search what is already indexed, waiting at most this long for documents still
+        # being embedded; a backlog during an ingest burst then cannot hold up an answer
+        self.index_wait = rag_config.get('queries', {}).get('index_wait', 0.1)
         
+        # Answers reused for the same question about the same documents
+        self.answers = AnswerCache.from_config(rag_config.get('answer_cache', {}))
+        
+        # Documents restored from a snapshot taken before they were embedded are embedded now
+        for doc_id in self.documents.unembedded():
+            self.batcher.add(document_text(self.documents[doc_id]), doc_id)
+        
+        # Snapshots of the documents and index, so a restart does not embed everything again
+        store_config = rag_config.get('store', {})
+        self.store_path = store_config.get('path')
+        self.checkpoint_interval = store_config.get('checkpoint_interval', 300)
+        if self.store_path and self.checkpoint_interval:
+            threading.Thread(target=self._checkpoint_periodically, daemon=True).start()
+    
+    def _encode(self, texts: list) -> list:
+        return self.embedder.model.encode(texts, batch_size=len(texts))
+    
+    def _embed_batch(self, texts: list) -> list:
+        # Repeated documents are looked up instead of embedded again
+        if self.cache is None:
+            return self._encode(texts)
+        return self.cache.embed(texts, self._encode)
+    
+    def _add(self, doc: dict, text: str) -> int:
+        # Queue for embedding; the batch is added to the index once embedded
+        doc_id = self.documents.add(doc)
+        if doc_id in self.documents:
+            self.batcher.add(text, doc_id)
+        return doc_id
+    
+    def add_document(self, row: dict) -> bool:
+        # Only keep the columns this event's source actually set
+        doc = {name: value for name, value in row.items() if value is not None}
+        self._add(doc, document_text(doc))
         return True
     
-    def query(self, question: str, k: int = 5) -> str:
-        # Embed the question
-        question_embedding = self.embedder.embed_query(question)
+    def on_change(self, key, row: dict, time: int, is_addition: bool):
+        # Subscriber callback for the processed event stream
+        doc = {name: value for name, value in row.items() if value is not None}
+        text = document_text(doc)
+        if not is_addition:
+            # The old version of an updated row, which may arrive after the new one, or a row withdrawn
+            versions = self.retractable.get(key, [])
+            for i, (version, doc_id) in enumerate(versions):
+                if version == text:
+                    del versions[i]
+                    self.documents.remove(doc_id)
+                    break
+            if not versions:
+                self.retractable.pop(key, None)
+            return
         
-        # Retrieve relevant documents
-        results = self.index.query(question_embedding, k=k)
+        doc_id = self._add(doc, text)
+        if row.get('anomaly_type') in DERIVED_TYPES:
+            self.retractable.setdefault(key, []).append((text, doc_id))
+            # Forget the documents retention has dropped since
+            if len(self.retractable) > self.prune_retractable_at:
+                self._prune_retractable()
+    
+    def _prune_retractable(self):
+        retractable = {}
+        for key, versions in self.retractable.items():
+            held = [(text, doc_id) for text, doc_id in versions if doc_id in self.documents]
+            if held:
+                retractable[key] = held
+        self.retractable = retractable
+        self.prune_retractable_at = max(1024, 2 * len(retractable))
+    
+    def flush(self):
+        """Waits until every added document is in the index"""
+        self.batcher.flush()
+    
+    def checkpoint(self):
+        """Waits until every added document is in the index, then snapshots the store to rag.store.path"""
+        self.flush()
+        if self.store_path:
+            self.documents.save(self.store_path)
+    
+    def _checkpoint_periodically(self):
+        while True:
+            time.sleep(self.checkpoint_interval)
+            try:
+                self.checkpoint()
+            except Exception as e:
+                logger.error("Saving the RAG store failed: %s", e)
+    
+    def stats(self) -> dict:
+        return {
+            "documents": self.documents.stats(),
+            "embedding": self.batcher.stats.as_dict(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "answers": self.answers.stats() if self.answers is not None else None
+        }
+    
+    def scope(self, question: str, near: Optional[Tuple[float, float]] = None, radius: Optional[float] = None, window: Optional[float] = None) -> QueryScope:
+        """Returns the place and time window to search, from the arguments or else the question"""
+        scope = self.scope_parser.parse(question)
+        if near is not None:
+            scope.near = tuple(near)
+        if radius is not None:
+            scope.radius = radius
+        if window is not None:
+            scope.window = window
+        return scope
+    
+    def retrieve(self, question: str, k: int = 5, near: Optional[Tuple[float, float]] = None, radius: Optional[float] = None, window: Optional[float] = None) -> tuple:
+        """Returns (question embedding, scope, search results) from the documents indexed so far"""
+        if self.index_wait:
+            self.batcher.wait(self.index_wait)
         
+        # Embed the question
+        question_embedding = self._encode([question])[0]
+        
+        # Retrieve relevant documents from the place and time asked about, preferring recent ones
+        scope = self.scope(question, near, radius, window)
+        return question_embedding, scope, self.documents.search(question_embedding, k, scope)
+    
+    def prompt(self, question: str, results: list) -> str:
         # Prepare context for LLM
         context = "\n\n".join([
-            f"Source: {doc['source']}\nData: {json.dumps(doc['data'])}\nLocation: {doc['location']}"
-            for doc in results
+            f"Source: {doc['source']}\nData: {document_fields(doc)}\nLocation: {doc['lat']}, {doc['lon']}"
+            for _, doc, _ in results
         ])
         
-        # Generate answer with LLM
-        prompt = f"""Based on the following real-time data, answer the question.
+        return f"""Based on the following real-time data, answer the question.
         
 Context:
 {context}
@@ -58,5 +188,20 @@ Context:
 Question: {question}
 
 Answer:"""
+
+    def query(self, question: str, k: int = 5, near: Optional[Tuple[float, float]] = None, radius: Optional[float] = None, window: Optional[float] = None) -> str:
+        question_embedding, scope, results = self.retrieve(question, k, near, radius, window)
+        doc_ids = [doc_id for doc_id, _, _ in results]
+        
+        # Reuse a recent answer if one was generated from the same documents
+        if self.answers is not None:
+            answer = self.answers.get(question_embedding, scope.key, doc_ids)
+            if answer is not None:
+                return answer
         
-        return self.llm.generate(prompt)
+        # Generate answer with LLM
+        start = time.perf_counter()
+        answer = self.llm.generate(self.prompt(question, results))
+        if self.answers is not None:
+            self.answers.put(question_embedding, scope.key, doc_ids, answer, time.perf_counter() - start)
+        return answer
@@ -0,0 +1,177 @@
+import collections
+import datetime
+import pathway as pw
+from typing import Any, Dict, Optional, Sequence, Tuple
+from .spatial import SpatialGrid
+
+# Anomaly rows appended by AnomalyDetector.process rather than read from a source
+DERIVED_TYPES = ('social_media_spike', 'correlated_incident')
+
+# Columns summarised by mean, min and max, and by their most common values
+METRICS = (
+    'noise_level', 'crowd_density', 'traffic_flow', 'priority', 'delay', 'passenger_count',
+    'congestion_level', 'average_speed', 'incident_count', 'air_quality_index', 'temperature'
+)
+LABELS = ('incident_type', 'route_id', 'hashtags')
+
+# Columns of a summary row besides the shared event columns
+SUMMARY_COLUMNS = {
+    'period': Optional[str],
+    'events': Optional[int],
+    'summary': Optional[str],
+    'anomalies': Optional[int],
+    'anomaly_types': Optional[str],
+    'notable': Optional[str]
+}
+
+# Columns every row has
+_SHARED_COLUMNS = ('timestamp', 'event_time', 'source', 'lat', 'lon')
+
+def _value(value: float) -> str:
+    return f"{value:.4g}"
+
+def summarize(metrics: Dict[str, Sequence[float]], labels: Dict[str, Sequence[Any]], top: int = 3) -> str:
+    """Describes a window's readings: mean, min and max of each metric, and its most common labels"""
+    parts = []
+    for name, values in metrics.items():
+        if values:
+            parts.append(f"{name} mean {_value(sum(values) / len(values))}, min {_value(min(values))}, max {_value(max(values))}")
+    for name, values in labels.items():
+        # List columns such as hashtags count each element
+        flat = [item for value in values for item in (value if isinstance(value, (list, tuple)) else [value])]
+        if flat:
+            common = collections.Counter(flat).most_common(top)
+            parts.append(f"{name} " + ", ".join(f"{label} ({count})" for label, count in common))
+    return "; ".join(parts)
+
+def notable_anomalies(flagged: Sequence[Tuple[Optional[str], Optional[str]]], max_notable: int = 3) -> Tuple[Optional[str], Optional[str]]:
+    """Returns (anomaly types with counts, descriptions of the most frequent types) from
+    (anomaly_type, anomaly_description) pairs, or (None, None) if none were flagged"""
+    types = collections.Counter()
+    described = {}
+    for anomaly_types, description in flagged:
+        if anomaly_types is None:
+            continue
+        for anomaly_type in anomaly_types.split(','):
+            types[anomaly_type] += 1
+            # One description per type, the same one however the rows arrived
+            if description is not None and (anomaly_type not in described or description < described[anomaly_type]):
+                described[anomaly_type] = description
+    if not types:
+        return None, None
+    
+    ranked = [anomaly_type for anomaly_type, _ in types.most_common()]
+    descriptions = list(dict.fromkeys(described[anomaly_type] for anomaly_type in ranked if anomaly_type in described))
+    notable = "; ".join(descriptions[:max_notable])
+    if len(descriptions) > max_notable:
+        notable += f"; and {len(descriptions) - max_notable} more"
+    return ", ".join(f"{anomaly_type} ({types[anomaly_type]})" for anomaly_type in ranked), notable or None
+
+def format_period(start: float, end: float) -> str:
+    start_time = datetime.datetime.fromtimestamp(start, datetime.timezone.utc)
+    end_time = datetime.datetime.fromtimestamp(end, datetime.timezone.utc)
+    end_format = "%H:%M:%S" if end_time.date() == start_time.date() else "%Y-%m-%d %H:%M:%S"
+    return f"{start_time:%Y-%m-%d %H:%M:%S} to {end_time.strftime(end_format)} UTC"
+
+class Rollup:
+    """Turns the processed event stream into RAG documents.
+
+    Events from `sources` are grouped per grid cell, source and tumbling event-time window
+    into one summary row: the event count, statistics of each metric, the most common labels,
+    and the anomalies flagged, with a description of the most frequent kinds. A window is
+    emitted once, `allowed_lateness` seconds of event time after it ends. Anomalous events
+    and events from other sources pass through unchanged, as soon as they arrive.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        settings = config.get('rag', {}).get('rollup', {})
+        self.enabled = settings.get('enabled', True)
+        self.sources = set(settings.get('sources', ['city_sensors']))
+        self.window = settings.get('window', 300)
+        self.allowed_lateness = settings.get('allowed_lateness', 60)
+        self.grid = SpatialGrid(settings.get('resolution', 15))
+        self.top_labels = settings.get('top_labels', 3)
+        self.max_notable = settings.get('max_notable', 3)
+    
+    def _describe(self, *values) -> Tuple[str, Optional[str], Optional[str]]:
+        metrics = dict(zip(METRICS, values[:len(METRICS)]))
+        labels = dict(zip(LABELS, values[len(METRICS):-1]))
+        anomaly_types, notable = notable_anomalies(values[-1], self.max_notable)
+        return summarize(metrics, labels, self.top_labels), anomaly_types, notable
+    
+    def summarize(self, table: pw.Table) -> pw.Table:
+        """Returns one summary row per (cell, source, window) of the events from `sources`"""
+        events = table.filter(pw.apply_with_type(
+            lambda source, anomaly_type: source in self.sources and anomaly_type not in DERIVED_TYPES,
+            bool,
+            table.source,
+            table.anomaly_type
+        ))
+        events = events.with_columns(
+            group=pw.make_tuple(pw.apply_with_type(self.grid.cell, int, events.lat, events.lon), events.source)
+        )
+        
+        windows = events.windowby(
+            events.event_time,
+            window=pw.temporal.tumbling(duration=self.window),
+            instance=events.group,
+            behavior=pw.temporal.exactly_once_behavior(shift=self.allowed_lateness)
+        ).reduce(
+            window_start=pw.this._pw_window_start,
+            window_end=pw.this._pw_window_end,
+            timestamp=pw.reducers.max(pw.this.timestamp),
+            event_time=pw.reducers.max(pw.this.event_time),
+            source=pw.reducers.any(pw.this.source),
+            lat=pw.reducers.avg(pw.this.lat),
+            lon=pw.reducers.avg(pw.this.lon),
+            events=pw.reducers.count(),
+            anomalies=pw.reducers.sum(pw.if_else(pw.coalesce(pw.this.anomaly, False), 1, 0)),
+            flagged=pw.reducers.tuple(pw.make_tuple(pw.this.anomaly_type, pw.this.anomaly_description)),
+            **{name: pw.reducers.tuple(pw.this[name], skip_nones=True) for name in METRICS + LABELS}
+        )
+        
+        described = windows.with_columns(
+            described=pw.apply_with_type(
+                self._describe,
+                Tuple[str, Optional[str], Optional[str]],
+                *[windows[name] for name in METRICS + LABELS],
+                windows.flagged
+            )
+        )
+        return described.select(
+            pw.this.timestamp,
+            pw.this.event_time,
+            pw.this.source,
+            pw.this.lat,
+            pw.this.lon,
+            period=pw.apply_with_type(format_period, str, pw.this.window_start, pw.this.window_end),
+            events=pw.this.events,
+            summary=pw.this.described[0],
+            anomalies=pw.this.anomalies,
+            anomaly_types=pw.this.described[1],
+            notable=pw.this.described[2]
+        )
+    
+    def documents(self, table: pw.Table) -> pw.Table:
+        """Returns the rows to index: window summaries, anomalies, and events of sources not rolled up"""
+        if not self.enabled:
+            return table
+        raw = table.filter(pw.apply_with_type(
+            lambda source, anomaly: source not in self.sources or bool(anomaly),
+            bool,
+            table.source,
+            table.anomaly
+        ))
+        summaries = self.summarize(table)
+        
+        # Both sides get every column, null where it does not apply
+        typehints = {
+            name: hint if name in _SHARED_COLUMNS else Optional[hint]
+            for name, hint in {**table.schema.typehints(), **SUMMARY_COLUMNS}.items()
+        }
+        raw = raw.with_columns(**{name: None for name in SUMMARY_COLUMNS}).update_types(**typehints)
+        summary_columns = summaries.schema.column_names()
+        summaries = summaries.with_columns(
+            **{name: None for name in table.schema.column_names() if name not in summary_columns}
+        ).select(*[pw.this[name] for name in typehints]).update_types(**typehints)
+        return pw.Table.concat_reindex(raw, summaries)
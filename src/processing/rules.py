@@ -0,0 +1,138 @@
+import math
+import numpy as np
+import pathway as pw
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Sources checked by the top-level anomaly_rules thresholds
+DEFAULT_RULE_SOURCES = ('city_sensors',)
+
+# Metrics whose plain-number threshold is a minimum rather than a maximum
+LOWER_BOUND_METRICS = ('traffic_flow',)
+
+# anomaly_rules keys that are not per-event metric thresholds
+_NON_METRIC_RULES = ('social_media_spike', 'sources')
+
+def _bounds(metric: str, rule: Any) -> Tuple[float, float]:
+    """Returns the (min, max) allowed for a metric; either may be NaN for no bound"""
+    if isinstance(rule, dict):
+        return float(rule.get('min', np.nan)), float(rule.get('max', np.nan))
+    if metric in LOWER_BOUND_METRICS:
+        return float(rule), np.nan
+    return np.nan, float(rule)
+
+class RuleTable:
+    """anomaly_rules compiled into per-source arrays of lower and upper bounds.
+
+    Plain numbers under anomaly_rules apply to DEFAULT_RULE_SOURCES and are upper bounds,
+    except for LOWER_BOUND_METRICS; `{min: ..., max: ...}` sets either bound explicitly.
+    `anomaly_rules.sources.<source>` adds or overrides rules for one source.
+    """
+    
+    def __init__(self, rules: Dict[str, Any]):
+        per_source = {source: {} for source in DEFAULT_RULE_SOURCES}
+        for metric, rule in rules.items():
+            if metric not in _NON_METRIC_RULES:
+                for source in DEFAULT_RULE_SOURCES:
+                    per_source[source][metric] = rule
+        for source, source_rules in rules.get('sources', {}).items():
+            per_source.setdefault(source, {}).update(source_rules)
+        
+        self.metrics = sorted({metric for source_rules in per_source.values() for metric in source_rules})
+        self.sources = {source: i for i, source in enumerate(per_source)}
+        
+        # One row per source plus a last row without bounds for sources that have no rules
+        shape = (len(self.sources) + 1, len(self.metrics))
+        self.lower = np.full(shape, np.nan)
+        self.upper = np.full(shape, np.nan)
+        for source, source_rules in per_source.items():
+            for metric, rule in source_rules.items():
+                column = self.metrics.index(metric)
+                self.lower[self.sources[source], column], self.upper[self.sources[source], column] = _bounds(metric, rule)
+        
+        # Anomaly types by violation bitmask; few distinct masks occur in practice
+        self.type_names = {}
+    
+    def violation_types(self, violations: int) -> str:
+        """Returns the comma-separated anomaly types of a violation bitmask.
+        
+        Bit 2 * i is set when metric i is below its minimum, bit 2 * i + 1 when above its maximum.
+        """
+        types = self.type_names.get(violations)
+        if types is None:
+            types = ",".join(
+                f"{metric}_anomaly" for column, metric in enumerate(self.metrics)
+                if (violations >> (2 * column)) & 3
+            )
+            self.type_names[violations] = types
+        return types
+    
+    def describe(self, violations: int, *values: Optional[float]) -> str:
+        """Returns a description of every violation in the bitmask, given the row's metric values"""
+        descriptions = []
+        for column, metric in enumerate(self.metrics):
+            bits = (violations >> (2 * column)) & 3
+            if bits:
+                direction = "High" if bits & 2 else "Low"
+                descriptions.append(f"{direction} {metric} detected: {values[column]}")
+        return "; ".join(descriptions)
+    
+    def score_batch(self, sources: Sequence[str], *columns: Sequence[Optional[float]]) -> List[Tuple[Optional[str], Optional[str]]]:
+        """Returns (anomaly_type, anomaly_description) for each row, listing every violated rule.
+        
+        `columns` holds one sequence of values per metric, in the order of `self.metrics`.
+        """
+        count = len(sources)
+        results = [(None, None)] * count
+        if not self.metrics or not count:
+            return results
+        
+        no_rules = len(self.sources)
+        rows = np.fromiter((self.sources.get(source, no_rules) for source in sources), dtype=np.intp, count=count)
+        # None becomes NaN, and comparisons with NaN are false
+        values = np.array(columns, dtype=float).T
+        weights = 1 << (2 * np.arange(len(self.metrics), dtype=np.int64))
+        violations = (values < self.lower[rows]) @ weights + (values > self.upper[rows]) @ (weights << 1)
+        
+        for row in np.flatnonzero(violations):
+            mask = int(violations[row])
+            results[row] = (self.violation_types(mask), self.describe(mask, *[column[row] for column in columns]))
+        return results
+    
+    def expressions(self, table: pw.Table) -> Tuple[pw.ColumnExpression, pw.ColumnExpression, pw.ColumnExpression]:
+        """Returns engine-native (violated, anomaly_type, anomaly_description) expressions.
+        
+        The type and description expressions match score_batch() and are only meaningful where
+        `violated` is true; nothing in them calls back into Python.
+        """
+        violated, types, descriptions = None, None, None
+        for column, metric in enumerate(self.metrics):
+            value = table[metric]
+            for bounds, direction in ((self.lower, "Low"), (self.upper, "High")):
+                # One condition per metric and direction, covering every source that sets the bound
+                condition = None
+                for source, row in self.sources.items():
+                    bound = bounds[row, column]
+                    if math.isnan(bound):
+                        continue
+                    # Missing values are replaced by one that passes the bound
+                    if direction == "Low":
+                        compared = pw.coalesce(value, math.inf) < float(bound)
+                    else:
+                        compared = pw.coalesce(value, -math.inf) > float(bound)
+                    source_condition = (table.source == source) & compared
+                    condition = source_condition if condition is None else condition | source_condition
+                if condition is None:
+                    continue
+                
+                # Separators lead each part and are stripped from the joined string below
+                type_part = pw.if_else(condition, f",{metric}_anomaly", "")
+                description_part = pw.if_else(
+                    condition, f"; {direction} {metric} detected: " + pw.coalesce(value, 0.0).to_string(), ""
+                )
+                violated = condition if violated is None else violated | condition
+                types = type_part if types is None else types + type_part
+                descriptions = description_part if descriptions is None else descriptions + description_part
+        
+        if violated is None:
+            return pw.declare_type(bool, False), pw.declare_type(str, ""), pw.declare_type(str, "")
+        return violated, types.str.removeprefix(","), descriptions.str.removeprefix("; ")
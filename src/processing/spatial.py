@@ -0,0 +1,182 @@
+import collections
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+def _spread(value: int) -> int:
+    """Spreads the low 32 bits of value to the even bit positions"""
+    value &= 0xFFFFFFFF
+    value = (value | (value << 16)) & 0x0000FFFF0000FFFF
+    value = (value | (value << 8)) & 0x00FF00FF00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value << 2)) & 0x3333333333333333
+    value = (value | (value << 1)) & 0x5555555555555555
+    return value
+
+def _compact(value: int) -> int:
+    """Inverse of _spread"""
+    value &= 0x5555555555555555
+    value = (value | (value >> 1)) & 0x3333333333333333
+    value = (value | (value >> 2)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value >> 4)) & 0x00FF00FF00FF00FF
+    value = (value | (value >> 8)) & 0x0000FFFF0000FFFF
+    value = (value | (value >> 16)) & 0x00000000FFFFFFFF
+    return value
+
+# _spread of every 16-bit value, so a cell id takes two table lookups per axis
+_SPREAD_16 = [_spread(value) for value in range(1 << 16)]
+
+def _spread_fast(value: int) -> int:
+    return _SPREAD_16[value & 0xFFFF] | (_SPREAD_16[value >> 16] << 32)
+
+class SpatialGrid:
+    """Quadkey-style integer cell index.
+
+    At resolution r the world is split into 2^r x 2^r cells, and a cell id interleaves the
+    bits of its column and row (a Morton code), so nearby cells mostly have close ids.
+    Resolution 15 gives cells of about 0.011 degrees of longitude by 0.0055 of latitude.
+    """
+    
+    def __init__(self, resolution: int = 15):
+        if not 1 <= resolution <= 31:
+            raise ValueError(f"Grid resolution must be between 1 and 31, got {resolution}")
+        self.resolution = resolution
+        self.size = 1 << resolution
+        self.lat_step = 180.0 / self.size
+        self.lon_step = 360.0 / self.size
+        self.lat_scale = self.size / 180.0
+        self.lon_scale = self.size / 360.0
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'SpatialGrid':
+        return cls(config.get('spatial_grid', {}).get('resolution', 15))
+    
+    def cell(self, lat: float, lon: float) -> int:
+        column = int((lon + 180.0) * self.lon_scale)
+        row = int((lat + 90.0) * self.lat_scale)
+        if not (0 <= column < self.size and 0 <= row < self.size):
+            column = min(self.size - 1, max(0, column))
+            row = min(self.size - 1, max(0, row))
+        return _spread_fast(column) | (_spread_fast(row) << 1)
+    
+    def decode(self, cell: int) -> Tuple[int, int]:
+        """Returns the (column, row) of a cell"""
+        return _compact(cell), _compact(cell >> 1)
+    
+    def center(self, cell: int) -> Tuple[float, float]:
+        """Returns the (lat, lon) of the middle of a cell"""
+        column, row = self.decode(cell)
+        return (row + 0.5) * self.lat_step - 90.0, (column + 0.5) * self.lon_step - 180.0
+    
+    def neighbours(self, cell: int, radius: int = 1) -> List[int]:
+        """Returns the cell and the cells up to `radius` steps around it; longitude wraps, latitude does not"""
+        column, row = self.decode(cell)
+        cells = []
+        for d_row in range(-radius, radius + 1):
+            neighbour_row = row + d_row
+            if not 0 <= neighbour_row < self.size:
+                continue
+            spread_row = _spread_fast(neighbour_row) << 1
+            for d_column in range(-radius, radius + 1):
+                cells.append(_spread_fast((column + d_column) % self.size) | spread_row)
+        return cells
+
+# Approximate bytes per entry of the store's ordered dict, on top of the key and value
+_ENTRY_OVERHEAD = 100
+
+def _sizeof(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+class CellStateStore:
+    """Per-cell state with TTL and LRU eviction under a cell count and memory cap.
+
+    Entries unused for `ttl` seconds (of the caller's clock, usually event time) expire, and
+    the least recently used entries are evicted whenever `max_cells` or `max_bytes` would be
+    exceeded. Memory is estimated from the size of each key and value when stored.
+    """
+    
+    def __init__(self, ttl: Optional[float] = None, max_cells: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.ttl = ttl
+        self.max_cells = max_cells
+        self.max_bytes = max_bytes
+        
+        # cell -> (last used, state, size); least recently used first
+        self.entries = collections.OrderedDict()
+        self.bytes = 0
+        self.expired = 0
+        self.evicted = 0
+    
+    @classmethod
+    def from_config(cls, store_config: Dict[str, Any]) -> 'CellStateStore':
+        max_memory_mb = store_config.get('max_memory_mb')
+        return cls(
+            ttl=store_config.get('ttl'),
+            max_cells=store_config.get('max_cells'),
+            max_bytes=int(max_memory_mb * 1024 * 1024) if max_memory_mb else None
+        )
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __contains__(self, cell: int) -> bool:
+        return cell in self.entries
+    
+    def get(self, cell: int, now: float, default: Any = None) -> Any:
+        entry = self.entries.get(cell)
+        if entry is None:
+            return default
+        last_used, state, size = entry
+        if self.ttl is not None and now - last_used > self.ttl:
+            self._remove(cell)
+            self.expired += 1
+            return default
+        self.entries[cell] = (max(now, last_used), state, size)
+        self.entries.move_to_end(cell)
+        return state
+    
+    def put(self, cell: int, state: Any, now: float):
+        size = _sizeof(cell) + _sizeof(state) + _ENTRY_OVERHEAD
+        if cell in self.entries:
+            self._remove(cell)
+        self.entries[cell] = (now, state, size)
+        self.bytes += size
+        self._evict(now)
+    
+    def pop(self, cell: int, default: Any = None) -> Any:
+        if cell not in self.entries:
+            return default
+        return self._remove(cell)
+    
+    def _remove(self, cell: int) -> Any:
+        _, state, size = self.entries.pop(cell)
+        self.bytes -= size
+        return state
+    
+    def _evict(self, now: float):
+        # Expired entries sit at the front unless they were touched with an older clock
+        if self.ttl is not None:
+            while self.entries:
+                cell, (last_used, _, _) = next(iter(self.entries.items()))
+                if now - last_used <= self.ttl:
+                    break
+                self._remove(cell)
+                self.expired += 1
+        
+        while self.entries and (
+            (self.max_cells is not None and len(self.entries) > self.max_cells)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self.entries)))
+            self.evicted += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cells": len(self.entries),
+            "bytes": self.bytes,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
@@ -0,0 +1,504 @@
+import json
+import logging
+import os
+import threading
+import numpy as np
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DTYPES = ('float32', 'float16', 'int8')
+
+# Rows scored at a time, so quantised rows are widened to float32 one block at a time
+_BLOCK = 8192
+
+def normalize(vector: Any) -> np.ndarray:
+    """Returns the vector as float32 scaled to unit length, so a dot product is cosine similarity"""
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Returns (codes, scales) for rows of unit vectors.
+
+    int8 rows are scaled so their largest component is 127, and a row's scale turns its codes
+    back into the vector. float16 and float32 rows are stored as they are, without scales.
+    """
+    if dtype == 'int8':
+        peaks = np.abs(vectors).max(axis=1)
+        scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+        return np.rint(vectors / scales[:, np.newaxis]).astype(np.int8), scales
+    return vectors.astype(dtype), None
+
+def _write_meta(path: str, meta: Dict[str, Any]):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+def _load_array(path: str, name: str) -> np.ndarray:
+    # Copy-on-write: pages are read as they are used, and changes stay in memory
+    return np.load(os.path.join(path, name + '.npy'), mmap_mode='c')
+
+class FlatIndex:
+    """Exact cosine similarity search over one matrix of unit-length vectors.
+
+    Removing a document moves the last row into its slot, so the matrix stays dense and
+    memory follows the number of live documents. With `dtype` float16 or int8 rows take a
+    half or a quarter of the memory, and are widened to float32 a block at a time to be scored.
+    """
+    
+    def __init__(self, dim: Optional[int] = None, capacity: int = 1024, dtype: str = 'float32'):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown vector dtype {dtype!r}; expected one of {list(DTYPES)}")
+        self.dim = dim
+        self.capacity = capacity
+        self.dtype = dtype
+        self.vectors = None
+        self.scales = None
+        self.ids = []
+        self.rows = {}
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self.rows
+    
+    def _resize(self, size: int):
+        vectors = np.empty((size, self.dim), dtype=self.dtype)
+        scales = np.empty(size, dtype=np.float32) if self.dtype == 'int8' else None
+        if self.vectors is not None:
+            kept = min(len(self.ids), size)
+            vectors[:kept] = self.vectors[:kept]
+            if scales is not None:
+                scales[:kept] = self.scales[:kept]
+        self.vectors, self.scales = vectors, scales
+    
+    def _reserve(self, count: int):
+        if self.vectors is None:
+            self._resize(max(self.capacity, count))
+        elif count > len(self.vectors):
+            self._resize(max(count, 2 * len(self.vectors)))
+        elif count < len(self.vectors) // 4 and len(self.vectors) > self.capacity:
+            # Give memory back once most documents have been removed
+            self._resize(max(self.capacity, 2 * count))
+    
+    def _put(self, row: int, vector: np.ndarray):
+        codes, scales = quantize(vector[np.newaxis], self.dtype)
+        self.vectors[row] = codes[0]
+        if scales is not None:
+            self.scales[row] = scales[0]
+    
+    def add(self, doc_id: Hashable, vector: Any):
+        vector = normalize(vector)
+        if self.dim is None:
+            self.dim = len(vector)
+        elif len(vector) != self.dim:
+            raise ValueError(f"Expected a vector of {self.dim} dimensions, got {len(vector)}")
+        
+        if doc_id in self.rows:
+            self._put(self.rows[doc_id], vector)
+            return
+        self._reserve(len(self.ids) + 1)
+        self._put(len(self.ids), vector)
+        self.rows[doc_id] = len(self.ids)
+        self.ids.append(doc_id)
+    
+    def remove(self, doc_id: Hashable) -> bool:
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return False
+        last = len(self.ids) - 1
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            if self.scales is not None:
+                self.scales[row] = self.scales[last]
+            self.ids[row] = self.ids[last]
+            self.rows[self.ids[row]] = row
+        self.ids.pop()
+        self._reserve(len(self.ids))
+        return True
+    
+    def _dot(self, rows, vector: np.ndarray) -> np.ndarray:
+        vectors = self.vectors[rows]
+        if self.dtype != 'float32':
+            vectors = vectors.astype(np.float32)
+        similarities = vectors @ vector
+        if self.scales is not None:
+            similarities *= self.scales[rows]
+        return similarities
+    
+    def decoded(self) -> np.ndarray:
+        """Returns every vector as float32 rows, in row order"""
+        vectors = np.asarray(self.vectors[:len(self.ids)], dtype=np.float32)
+        if self.scales is not None:
+            vectors = vectors * self.scales[:len(self.ids), np.newaxis]
+        return vectors
+    
+    def search(self, vector: Any, k: int) -> List[Tuple[Hashable, float]]:
+        """Returns up to k (doc_id, cosine similarity) pairs, most similar first"""
+        if not self.ids or k <= 0:
+            return []
+        vector = normalize(vector)
+        similarities = np.concatenate([
+            self._dot(slice(start, min(start + _BLOCK, len(self.ids))), vector)
+            for start in range(0, len(self.ids), _BLOCK)
+        ])
+        k = min(k, len(self.ids))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(self.ids[row], float(similarities[row])) for row in top]
+    
+    def similarities(self, vector: Any, doc_ids: List[Hashable]) -> np.ndarray:
+        """Returns the cosine similarity of the vector to each of the given documents"""
+        if not doc_ids:
+            return np.empty(0, dtype=np.float32)
+        return self._dot(np.array([self.rows[doc_id] for doc_id in doc_ids]), normalize(vector))
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self.ids),
+            "dtype": self.dtype,
+            "bytes": (self.vectors.nbytes if self.vectors is not None else 0) + (self.scales.nbytes if self.scales is not None else 0)
+        }
+    
+    def save(self, path: str):
+        """Writes the index to `path`; document ids must be integers"""
+        _write_meta(path, {'type': 'flat', 'dim': self.dim, 'capacity': self.capacity, 'dtype': self.dtype})
+        np.save(os.path.join(path, 'ids.npy'), np.array(self.ids, dtype=np.int64))
+        if self.vectors is not None:
+            np.save(os.path.join(path, 'vectors.npy'), self.vectors[:len(self.ids)])
+        if self.scales is not None:
+            np.save(os.path.join(path, 'scales.npy'), self.scales[:len(self.ids)])
+    
+    @classmethod
+    def load(cls, path: str, meta: Dict[str, Any]) -> 'FlatIndex':
+        index = cls(dim=meta['dim'], capacity=meta['capacity'], dtype=meta['dtype'])
+        index.ids = _load_array(path, 'ids').tolist()
+        index.rows = {doc_id: row for row, doc_id in enumerate(index.ids)}
+        if meta['dim'] is not None:
+            index.vectors = _load_array(path, 'vectors')
+            if index.dtype == 'int8':
+                index.scales = _load_array(path, 'scales')
+        return index
+
+def _merge(results: List[Tuple[Hashable, float]], k: int) -> List[Tuple[Hashable, float]]:
+    results.sort(key=lambda pair: pair[1], reverse=True)
+    return results[:k]
+
+class IVFIndex:
+    """Inverted file index: vectors are grouped under the nearest of `nlist` centroids.
+
+    A search scans only the `nprobe` lists whose centroids are closest to the query, so raising
+    nprobe trades latency for recall. Until `train_size` vectors have been added the index is
+    exact; the centroids are then learnt from a copy of those vectors with spherical k-means and
+    stay fixed, while insertions and removals keep updating the lists. Each list is a FlatIndex
+    holding its vectors as `dtype`.
+    
+    With `background`, k-means runs on its own thread, so the caller (and whatever lock it
+    holds) is not stalled; the exact index keeps serving until the lists are swapped in, on the
+    first call after training finishes.
+    """
+    
+    def __init__(self, nlist: int = 1024, nprobe: int = 16, train_size: int = 50000, iterations: int = 10, seed: int = 0, dtype: str = 'float32', background: bool = True):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = max(train_size, nlist)
+        self.iterations = iterations
+        self.seed = seed
+        self.dtype = dtype
+        self.background = background
+        self.centroids = None
+        # Exact index for the vectors added before training
+        self.untrained = FlatIndex(dtype=dtype)
+        self.lists = []
+        self.assignments = {}
+        
+        # Thread learning the lists, its (centroids, lists, assignments) once done, and the
+        # documents added to the exact index after the copy it learns from was taken
+        self.training = None
+        self.trained = None
+        self.added_since = set()
+    
+    def __len__(self) -> int:
+        return len(self.untrained) if self.centroids is None else len(self.assignments)
+    
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self.untrained if self.centroids is None else doc_id in self.assignments
+    
+    def _learn(self, ids: List[Hashable], vectors: np.ndarray):
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(len(vectors), self.nlist, replace=False)]
+        for _ in range(self.iterations):
+            nearest = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, vectors)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Lists left empty keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        centroids = centroids.astype(np.float32)
+        
+        lists = [FlatIndex(dim=vectors.shape[1], capacity=16, dtype=self.dtype) for _ in range(self.nlist)]
+        assignments = {}
+        for doc_id, vector, assigned in zip(ids, vectors, np.argmax(vectors @ centroids.T, axis=1)):
+            lists[assigned].add(doc_id, vector)
+            assignments[doc_id] = int(assigned)
+        return centroids, lists, assignments
+    
+    def _learn_in_background(self, ids: List[Hashable], vectors: np.ndarray):
+        try:
+            self.trained = self._learn(ids, vectors)
+        except Exception as e:
+            logger.error("Training the ivf index failed: %s", e)
+            self.training = None
+    
+    def _train(self):
+        ids = list(self.untrained.ids)
+        vectors = np.array(self.untrained.decoded(), dtype=np.float32)
+        self.added_since = set()
+        if not self.background:
+            self.trained = self._learn(ids, vectors)
+            self._swap()
+            return
+        self.training = threading.Thread(target=self._learn_in_background, args=(ids, vectors), daemon=True)
+        self.training.start()
+    
+    def _swap(self):
+        """Replaces the exact index with the learnt lists, once they are ready"""
+        if self.trained is None:
+            return
+        centroids, lists, assignments = self.trained
+        untrained = self.untrained
+        # Documents removed or added again since the copy was taken
+        for doc_id in [doc_id for doc_id in assignments if doc_id not in untrained or doc_id in self.added_since]:
+            lists[assignments.pop(doc_id)].remove(doc_id)
+        self.centroids, self.lists, self.assignments = centroids, lists, assignments
+        self.untrained = self.trained = self.training = None
+        
+        added = [doc_id for doc_id in self.added_since if doc_id in untrained]
+        if added:
+            vectors = untrained.decoded()
+            for doc_id in added:
+                self.add(doc_id, vectors[untrained.rows[doc_id]])
+        self.added_since = set()
+    
+    def finish_training(self):
+        """Waits for training under way, if any, and swaps its lists in"""
+        training = self.training
+        if training is not None:
+            training.join()
+        self._swap()
+    
+    def add(self, doc_id: Hashable, vector: Any):
+        self._swap()
+        if self.centroids is None:
+            self.untrained.add(doc_id, vector)
+            if self.training is not None:
+                self.added_since.add(doc_id)
+            elif len(self.untrained) >= self.train_size:
+                self._train()
+            return
+        
+        vector = normalize(vector)
+        self.remove(doc_id)
+        assigned = int(np.argmax(self.centroids @ vector))
+        self.lists[assigned].add(doc_id, vector)
+        self.assignments[doc_id] = assigned
+    
+    def remove(self, doc_id: Hashable) -> bool:
+        self._swap()
+        if self.centroids is None:
+            return self.untrained.remove(doc_id)
+        assigned = self.assignments.pop(doc_id, None)
+        if assigned is None:
+            return False
+        return self.lists[assigned].remove(doc_id)
+    
+    def search(self, vector: Any, k: int) -> List[Tuple[Hashable, float]]:
+        self._swap()
+        if self.centroids is None:
+            return self.untrained.search(vector, k)
+        vector = normalize(vector)
+        nprobe = min(self.nprobe, self.nlist)
+        probed = np.argpartition(-(self.centroids @ vector), nprobe - 1)[:nprobe]
+        results = []
+        for assigned in probed:
+            results.extend(self.lists[assigned].search(vector, k))
+        return _merge(results, k)
+    
+    def similarities(self, vector: Any, doc_ids: List[Hashable]) -> np.ndarray:
+        self._swap()
+        if self.centroids is None:
+            return self.untrained.similarities(vector, doc_ids)
+        vector = normalize(vector)
+        # One product per list holding any of the documents
+        positions = {}
+        for position, doc_id in enumerate(doc_ids):
+            positions.setdefault(self.assignments[doc_id], []).append(position)
+        result = np.empty(len(doc_ids), dtype=np.float32)
+        for assigned, in_list in positions.items():
+            result[in_list] = self.lists[assigned].similarities(vector, [doc_ids[position] for position in in_list])
+        return result
+    
+    def stats(self) -> Dict[str, Any]:
+        if self.centroids is None:
+            return {**self.untrained.stats(), "trained": False, "training": self.training is not None}
+        return {
+            "documents": len(self.assignments),
+            "dtype": self.dtype,
+            "bytes": self.centroids.nbytes + sum(index.stats()["bytes"] for index in self.lists),
+            "trained": True,
+            "training": False
+        }
+    
+    def save(self, path: str):
+        meta = {
+            'type': 'ivf', 'nlist': self.nlist, 'nprobe': self.nprobe, 'train_size': self.train_size,
+            'iterations': self.iterations, 'seed': self.seed, 'dtype': self.dtype, 'trained': self.centroids is not None
+        }
+        _write_meta(path, meta)
+        if self.centroids is None:
+            self.untrained.save(os.path.join(path, 'untrained'))
+            return
+        # The lists one after another, with each list's length
+        np.save(os.path.join(path, 'centroids.npy'), self.centroids)
+        np.save(os.path.join(path, 'sizes.npy'), np.array([len(index) for index in self.lists], dtype=np.int64))
+        np.save(os.path.join(path, 'ids.npy'), np.array([doc_id for index in self.lists for doc_id in index.ids], dtype=np.int64))
+        filled = [index for index in self.lists if len(index)]
+        dim = self.centroids.shape[1]
+        np.save(os.path.join(path, 'vectors.npy'), np.concatenate([index.vectors[:len(index)] for index in filled]) if filled else np.empty((0, dim), dtype=self.dtype))
+        if self.dtype == 'int8':
+            np.save(os.path.join(path, 'scales.npy'), np.concatenate([index.scales[:len(index)] for index in filled]) if filled else np.empty(0, dtype=np.float32))
+    
+    @classmethod
+    def load(cls, path: str, meta: Dict[str, Any]) -> 'IVFIndex':
+        index = cls(meta['nlist'], meta['nprobe'], meta['train_size'], meta['iterations'], meta['seed'], meta['dtype'])
+        if not meta['trained']:
+            untrained = os.path.join(path, 'untrained')
+            with open(os.path.join(untrained, 'meta.json')) as f:
+                index.untrained = FlatIndex.load(untrained, json.load(f))
+            return index
+        
+        index.centroids = np.load(os.path.join(path, 'centroids.npy'))
+        ids = _load_array(path, 'ids').tolist()
+        vectors = _load_array(path, 'vectors')
+        scales = _load_array(path, 'scales') if index.dtype == 'int8' else None
+        start = 0
+        # Each list starts out as a view of the mapped arrays and is copied once it grows
+        for assigned, size in enumerate(np.load(os.path.join(path, 'sizes.npy')).tolist()):
+            flat = FlatIndex(dim=index.centroids.shape[1], capacity=16, dtype=index.dtype)
+            if size:
+                flat.ids = ids[start:start + size]
+                flat.rows = {doc_id: row for row, doc_id in enumerate(flat.ids)}
+                flat.vectors = vectors[start:start + size]
+                flat.scales = scales[start:start + size] if scales is not None else None
+                for doc_id in flat.ids:
+                    index.assignments[doc_id] = assigned
+            index.lists.append(flat)
+            start += size
+        index.untrained = None
+        return index
+
+class HnswIndex:
+    """Hierarchical navigable small world graph from hnswlib, over inner products of unit vectors.
+
+    `m` and `ef_construction` set graph quality at build time and `ef` the search breadth;
+    higher values raise recall and latency. Removed documents are marked deleted and their
+    slots reused by later insertions. Document ids must be integers and, once removed, are not
+    added again; DocumentStore never reuses them. hnswlib holds vectors as float32 only.
+    """
+    
+    def __init__(self, m: int = 16, ef_construction: int = 200, ef: int = 64, capacity: int = 100000, dtype: str = 'float32'):
+        if dtype != 'float32':
+            raise ValueError(f"hnsw indexes hold float32 vectors only, got dtype {dtype!r}")
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self.capacity = capacity
+        self.index = None
+        self.ids = set()
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self.ids
+    
+    def add(self, doc_id: int, vector: Any):
+        vector = normalize(vector)
+        if self.index is None:
+            import hnswlib
+            self.index = hnswlib.Index(space='ip', dim=len(vector))
+            self.index.init_index(max_elements=self.capacity, ef_construction=self.ef_construction, M=self.m, allow_replace_deleted=True)
+            self.index.set_ef(self.ef)
+        if doc_id in self.ids:
+            # Moves the existing point
+            self.index.add_items(vector[np.newaxis], np.array([doc_id]))
+            return
+        # Grow only when no deleted slot is left to reuse
+        if len(self.ids) >= self.index.get_max_elements():
+            self.index.resize_index(2 * self.index.get_max_elements())
+        self.index.add_items(vector[np.newaxis], np.array([doc_id]), replace_deleted=True)
+        self.ids.add(doc_id)
+    
+    def remove(self, doc_id: int) -> bool:
+        if doc_id not in self.ids:
+            return False
+        self.index.mark_deleted(doc_id)
+        self.ids.discard(doc_id)
+        return True
+    
+    def search(self, vector: Any, k: int) -> List[Tuple[int, float]]:
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return []
+        labels, distances = self.index.knn_query(normalize(vector)[np.newaxis], k=k)
+        # Inner product distance is 1 - similarity
+        return [(int(label), 1.0 - float(distance)) for label, distance in zip(labels[0], distances[0])]
+    
+    def similarities(self, vector: Any, doc_ids: List[int]) -> np.ndarray:
+        if not doc_ids:
+            return np.empty(0, dtype=np.float32)
+        return np.asarray(self.index.get_items(doc_ids), dtype=np.float32) @ normalize(vector)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self.ids),
+            "capacity": self.index.get_max_elements() if self.index is not None else 0
+        }
+    
+    def save(self, path: str):
+        _write_meta(path, {
+            'type': 'hnsw', 'm': self.m, 'ef_construction': self.ef_construction, 'ef': self.ef,
+            'capacity': self.capacity, 'dim': self.index.dim if self.index is not None else None
+        })
+        np.save(os.path.join(path, 'ids.npy'), np.array(sorted(self.ids), dtype=np.int64))
+        if self.index is not None:
+            self.index.save_index(os.path.join(path, 'hnsw.bin'))
+    
+    @classmethod
+    def load(cls, path: str, meta: Dict[str, Any]) -> 'HnswIndex':
+        index = cls(meta['m'], meta['ef_construction'], meta['ef'], meta['capacity'])
+        index.ids = set(np.load(os.path.join(path, 'ids.npy')).tolist())
+        if meta['dim'] is not None:
+            import hnswlib
+            index.index = hnswlib.Index(space='ip', dim=meta['dim'])
+            index.index.load_index(os.path.join(path, 'hnsw.bin'), allow_replace_deleted=True)
+            index.index.set_ef(index.ef)
+        return index
+
+INDEXES = {'flat': FlatIndex, 'ivf': IVFIndex, 'hnsw': HnswIndex}
+
+def create_index(settings: Dict[str, Any]):
+    """Builds the index named by settings['type'], passing the remaining settings as parameters"""
+    settings = dict(settings)
+    kind = settings.pop('type', 'flat')
+    if kind not in INDEXES:
+        raise ValueError(f"Unknown index type {kind!r}; expected one of {sorted(INDEXES)}")
+    return INDEXES[kind](**settings)
+
+def load_index(path: str):
+    """Reads an index written by its save(), with the settings it was saved with"""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    return INDEXES[meta['type']].load(path, meta)
@@ -0,0 +1,53 @@
+import builtins
+import collections
+import contextlib
+import sys
+import time
+
+class StartupReport:
+    """Times startup phases and the top-level packages each phase imports, like `python -X importtime`"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+        self.imports = collections.defaultdict(float)
+        self.original_import = None
+    
+    def install(self):
+        # Times the first import of each top-level package, including what it imports in turn
+        self.original_import = builtins.__import__
+        
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            package = name.partition('.')[0]
+            if level or package in sys.modules:
+                return self.original_import(name, globals, locals, fromlist, level)
+            
+            start = time.perf_counter()
+            try:
+                return self.original_import(name, globals, locals, fromlist, level)
+            finally:
+                self.imports[package] += time.perf_counter() - start
+        
+        builtins.__import__ = timed_import
+    
+    def uninstall(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+    
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+    
+    def report(self, top=10):
+        lines = [f"startup: {(time.perf_counter() - self.started) * 1000:.0f} ms"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<24} {seconds * 1000:>8.0f} ms")
+        lines.append("imports:")
+        for name, seconds in sorted(self.imports.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"  {name:<24} {seconds * 1000:>8.0f} ms")
+        return "\n".join(lines)
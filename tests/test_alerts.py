@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from src.processing.alerts import AlertDispatcher
+
+class StubReceiver(BaseHTTPRequestHandler):
+    batches = []
+    failures = 0
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if StubReceiver.failures > 0:
+            StubReceiver.failures -= 1
+            self.send_response(503)
+        else:
+            StubReceiver.batches.append(body["alerts"])
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+    
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def receiver():
+    StubReceiver.batches = []
+    StubReceiver.failures = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubReceiver)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/webhook"
+    server.shutdown()
+
+def _alert(event_time, lat=40.7128, anomaly_type="noise_level_anomaly"):
+    return {
+        "timestamp": str(event_time), "event_time": float(event_time), "source": "city_sensors",
+        "lat": lat, "lon": -74.0060, "anomaly_type": anomaly_type, "anomaly_description": "High noise_level"
+    }
+
+def _dispatcher(url, **alerts):
+    settings = {'flush_interval': 0.05, 'suppression_window': 60, 'backoff': 0.01}
+    settings.update(alerts)
+    return AlertDispatcher({'output': {'alert_webhook': url, 'alerts': settings}})
+
+def test_batches_and_coalesces_per_cell_and_type(receiver):
+    dispatcher = _dispatcher(receiver)
+    dispatcher.start()
+    
+    # Three repeats in one cell, one other type there, one other cell
+    for t in (0, 5, 10):
+        dispatcher.add(_alert(t))
+    dispatcher.add(_alert(12, anomaly_type="crowd_density_anomaly"))
+    dispatcher.add(_alert(15, lat=40.8))
+    dispatcher.close(timeout=5)
+    
+    alerts = [alert for batch in StubReceiver.batches for alert in batch]
+    assert len(alerts) == 3
+    counts = {(alert["lat"], alert["anomaly_type"]): alert["count"] for alert in alerts}
+    assert counts[(40.7128, "noise_level_anomaly")] == 3
+    assert dispatcher.stats.coalesced == 2
+    assert dispatcher.stats.sent == 3
+
+def test_repeats_after_flush_are_suppressed_until_the_window_ends(receiver):
+    dispatcher = _dispatcher(receiver)
+    dispatcher.start()
+    
+    dispatcher.add(_alert(0))
+    time.sleep(0.3)
+    dispatcher.add(_alert(30))
+    dispatcher.add(_alert(40))
+    # Past the window: sent again, carrying the repeats it stood in for
+    dispatcher.add(_alert(100))
+    dispatcher.close(timeout=5)
+    
+    alerts = [alert for batch in StubReceiver.batches for alert in batch]
+    assert [alert["count"] for alert in alerts] == [1, 3]
+
+def test_retracted_alerts_are_not_sent(receiver):
+    dispatcher = _dispatcher(receiver)
+    dispatcher.start()
+    
+    # An update (the old version retracted, the new one added) and then a retraction, before a flush
+    old = dict(_alert(0, anomaly_type="correlated_incident"), anomaly_description="1 sensor anomalies")
+    new = dict(old, anomaly_description="2 sensor anomalies")
+    dispatcher.on_change(None, old, 0, True)
+    dispatcher.on_change(None, old, 2, False)
+    dispatcher.on_change(None, new, 2, True)
+    dispatcher.on_change(None, _alert(5), 2, True)
+    dispatcher.on_change(None, new, 4, False)
+    dispatcher.close(timeout=5)
+    
+    alerts = [alert for batch in StubReceiver.batches for alert in batch]
+    assert [alert["anomaly_type"] for alert in alerts] == ["noise_level_anomaly"]
+    assert dispatcher.stats.retracted == 2
+
+def test_updates_after_flush_are_not_counted_as_repeats(receiver):
+    dispatcher = _dispatcher(receiver)
+    dispatcher.start()
+    
+    old = dict(_alert(0, anomaly_type="correlated_incident"), anomaly_description="1 sensor anomalies")
+    dispatcher.on_change(None, old, 0, True)
+    time.sleep(0.3)
+    # Updated after its alert went out, and then another incident in the same cell past the window
+    dispatcher.on_change(None, old, 2, False)
+    dispatcher.on_change(None, dict(old, anomaly_description="2 sensor anomalies"), 2, True)
+    dispatcher.on_change(None, dict(old, event_time=100.0), 4, True)
+    dispatcher.close(timeout=5)
+    
+    alerts = [alert for batch in StubReceiver.batches for alert in batch]
+    assert [alert["count"] for alert in alerts] == [1, 1]
+
+def test_retries_failed_batches(receiver):
+    StubReceiver.failures = 2
+    dispatcher = _dispatcher(receiver)
+    dispatcher.start()
+    dispatcher.add(_alert(0))
+    dispatcher.close(timeout=5)
+    
+    assert len(StubReceiver.batches) == 1
+    assert dispatcher.stats.retries == 2
+    assert dispatcher.stats.failed == 0
+
+def test_outage_keeps_bounded_batches_and_alerts(receiver):
+    StubReceiver.failures = 10 ** 6
+    dispatcher = _dispatcher(receiver, max_in_flight=2, max_pending=5, max_batch_size=2, max_retries=1000, max_backoff=0.02)
+    dispatcher.start()
+    for i in range(60):
+        dispatcher.add(_alert(i, lat=40.0 + i * 0.01))
+        time.sleep(0.005)
+    time.sleep(0.2)
+    
+    assert len(dispatcher.tasks) <= 2
+    assert len(dispatcher.pending) <= 5
+    assert dispatcher.stats.dropped > 0
+    
+    # Once the receiver recovers, what was kept is delivered
+    StubReceiver.failures = 0
+    dispatcher.close(timeout=5)
+    alerts = [alert for batch in StubReceiver.batches for alert in batch]
+    assert len(alerts) + dispatcher.stats.dropped == 60
+    assert dispatcher.stats.failed == 0
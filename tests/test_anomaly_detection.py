@@ -13,37 +13,181 @@ def test_anomaly_detector():
     }
     detector = AnomalyDetector(config)
     
-    # Test normal data
-    normal_data = {
-        "source": "city_sensors",
-        "data": {
-            "noise_level": 60,
-            "crowd_density": 0.5,
-            "traffic_flow": 0.6
-        },
-        "location": {
-            "lat": 40.7128,
-            "lon": -74.0060
-        }
+    # Test normal data: (noise_level, crowd_density, traffic_flow)
+    anomaly_type, _ = detector.check("city_sensors", 40.7128, -74.0060, 60, 0.5, 0.6)
+    assert anomaly_type is None
+    
+    # Test anomalous data
+    anomaly_type, description = detector.check("city_sensors", 40.7128, -74.0060, 90, 0.5, 0.6)
+    assert anomaly_type == "noise_level_anomaly"
+    assert "90" in description
+
+def _posts(times, lat=40.7128, lon=-74.0060):
+    from src.data_sources.base import StreamSchema
+    columns = StreamSchema.column_names()
+    rows = []
+    for event_time in times:
+        row = dict.fromkeys(columns)
+        row.update(timestamp=str(event_time), event_time=float(event_time), source="twitter", lat=lat, lon=lon, text="fire")
+        rows.append(tuple(row[name] for name in columns))
+    return rows
+
+def test_social_media_spike_windows():
+    from src.data_sources.base import StreamSchema
+    config = {'anomaly_rules': {'social_media_spike': 10}, 'spike_detection': {'window': 60}}
+    
+    # 15 posts in the window [960, 1020) of one cell, 15 spread over two windows elsewhere
+    rows = _posts(range(1000, 1015)) + _posts(range(1010, 1040, 2), lat=40.8)
+    
+    results = []
+    for ordered in (rows, list(reversed(rows))):
+        pw.internals.parse_graph.G.clear()
+        table = pw.debug.table_from_rows(schema=StreamSchema, rows=ordered)
+        spikes = AnomalyDetector(config).process(table).filter(pw.this.anomaly_type == "social_media_spike")
+        results.append(sorted(pw.debug.table_to_pandas(spikes)["anomaly_description"]))
+    
+    # Arrival order does not change the result
+    assert results[0] == results[1]
+    assert len(results[0]) == 1
+    assert "15 posts" in results[0][0]
+
+def test_social_media_spike_emitted_once_per_window():
+    from src.data_sources.base import StreamSchema
+    pw.internals.parse_graph.G.clear()
+    
+    # The window's posts arrive in two engine batches, both over the threshold, then a later post
+    rows = [row + (2 if i < 12 else 4, 1) for i, row in enumerate(_posts(range(1000, 1015)))]
+    rows += [row + (6, 1) for row in _posts([1100])]
+    table = pw.debug.table_from_rows(schema=StreamSchema, rows=rows, is_stream=True)
+    spikes = AnomalyDetector({'anomaly_rules': {'social_media_spike': 10}}).process(table).filter(pw.this.anomaly_type == "social_media_spike")
+    
+    changes = []
+    pw.io.subscribe(spikes, lambda key, row, time, is_addition: changes.append((is_addition, row['anomaly_description'])))
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+    
+    # Never updated or retracted, so addition-only subscribers see the final count once
+    assert len(changes) == 1
+    assert changes[0][0] and "15 posts" in changes[0][1]
+
+def test_social_media_spike_counts_deduplicated_posts():
+    from src.data_sources.base import StreamSchema
+    from src.processing.dedup import Deduplicator
+    pw.internals.parse_graph.G.clear()
+    
+    # 15 reposts of the same post
+    config = {'anomaly_rules': {'social_media_spike': 10}, 'deduplication': {'sources': ['twitter']}}
+    table = pw.debug.table_from_rows(schema=StreamSchema, rows=_posts(range(1000, 1015)))
+    deduplicated = Deduplicator(config).process(table)
+    result = pw.debug.table_to_pandas(AnomalyDetector(config).process(deduplicated, posts=table))
+    
+    # One post is kept, and the spike still counts all of them
+    assert (result["anomaly_type"] != "social_media_spike").sum() == 1
+    spikes = list(result.loc[result["anomaly_type"] == "social_media_spike", "anomaly_description"])
+    assert len(spikes) == 1 and "15 posts" in spikes[0]
+
+def test_social_media_spike_across_cell_boundary():
+    from src.data_sources.base import StreamSchema
+    from src.processing.spatial import SpatialGrid
+    
+    # Six posts on each side of a cell boundary
+    grid = SpatialGrid(15)
+    lat, lon = grid.center(grid.cell(40.7128, -74.0060))
+    rows = _posts(range(1000, 1006), lat=lat, lon=lon + grid.lon_step * 0.49)
+    rows += _posts(range(1000, 1006), lat=lat, lon=lon + grid.lon_step * 0.51)
+    
+    spikes = []
+    for neighbours in (False, True):
+        config = {'anomaly_rules': {'social_media_spike': 10}, 'spike_detection': {'neighbours': neighbours}}
+        pw.internals.parse_graph.G.clear()
+        table = pw.debug.table_from_rows(schema=StreamSchema, rows=rows)
+        result = AnomalyDetector(config).process(table).filter(pw.this.anomaly_type == "social_media_spike")
+        spikes.append(list(pw.debug.table_to_pandas(result)["anomaly_description"]))
+    
+    assert spikes[0] == []
+    # Reported once, at one of the two cells
+    assert len(spikes[1]) == 1
+    assert "12 posts" in spikes[1][0]
+
+def test_statistical_detectors_alongside_rules():
+    from src.data_sources.base import StreamSchema
+    config = {
+        'anomaly_rules': {'sources': {'transit_api': {'delay': 40}}},
+        'statistical_detectors': {'metrics': {'delay': {'detector': 'ewma', 'warmup': 10, 'threshold': 4}}}
     }
+    detector = AnomalyDetector(config)
     
-    result = detector.process(normal_data)
-    assert "anomaly" not in result
+    # Rows within one engine batch reach the detectors in no fixed order, so baselines of
+    # steady delays around 5 minutes are learnt up front, in two cells
+    locations = [(40.7128, -74.0060), (40.8, -73.95)]
+    for t in range(30):
+        for lat, lon in locations:
+            detector.statistical.check("transit_api", lat, lon, float(t), 5.0 + 0.5 * (t % 3 - 1))
     
-    # Test anomalous data
-    anomalous_data = {
-        "source": "city_sensors",
-        "data": {
-            "noise_level": 90,
-            "crowd_density": 0.5,
-            "traffic_flow": 0.6
-        },
-        "location": {
-            "lat": 40.7128,
-            "lon": -74.0060
-        }
+    # 45 is unusual and over the rule, 20 only unusual, 5 neither
+    columns = StreamSchema.column_names()
+    rows = []
+    for (lat, lon), delay in zip(locations + locations[:1], [45.0, 20.0, 5.0]):
+        row = dict.fromkeys(columns)
+        row.update(timestamp="30", event_time=30.0, source="transit_api", lat=lat, lon=lon, delay=delay)
+        rows.append(tuple(row[name] for name in columns))
+    
+    table = pw.debug.table_from_rows(schema=StreamSchema, rows=rows)
+    anomalies = detector.process(table).filter(pw.this.anomaly)
+    result = pw.debug.table_to_pandas(anomalies).sort_values("delay")
+    
+    assert list(result["delay"]) == [20.0, 45.0]
+    assert list(result["anomaly_type"]) == ["delay_ewma_anomaly", "delay_anomaly,delay_ewma_anomaly"]
+    assert result["anomaly_description"].iloc[1].startswith("High delay detected: 45.0; Unusual delay: 45.0")
+
+def test_partition_keeps_each_cell_on_one_worker(monkeypatch):
+    import collections
+    import threading
+    from src.data_sources.base import StreamSchema
+    monkeypatch.setenv("PATHWAY_THREADS", "4")
+    
+    detector = AnomalyDetector({})
+    columns = StreamSchema.column_names()
+    rows = []
+    for i in range(400):
+        row = dict.fromkeys(columns)
+        row.update(timestamp=str(i), event_time=float(i), source="city_sensors", lat=40.6 + 0.01 * (i % 20), lon=-74.0)
+        rows.append(tuple(row[name] for name in columns))
+    
+    workers = collections.defaultdict(set)
+    def owner(lat, lon):
+        workers[detector.grid.cell(lat, lon)].add(threading.get_ident())
+        return True
+    
+    table = detector.partition(pw.debug.table_from_rows(schema=StreamSchema, rows=rows))
+    seen = table.select(seen=pw.apply_with_type(owner, bool, table.lat, table.lon))
+    assert len(pw.debug.table_to_pandas(seen)) == 400
+    assert len(workers) == 20
+    assert all(len(threads) == 1 for threads in workers.values())
+
+def test_correlated_incidents():
+    from src.data_sources.base import StreamSchema
+    config = {
+        'anomaly_rules': {'noise_level': 80, 'social_media_spike': 10},
+        'correlation': {'enabled': True, 'window': 300, 'min_confidence': 0.7}
     }
+    columns = StreamSchema.column_names()
+    def event(event_time, source, lat=40.7128, **values):
+        row = dict.fromkeys(columns)
+        row.update(timestamp=str(event_time), event_time=float(event_time), source=source, lat=lat, lon=-74.0060, **values)
+        return tuple(row[name] for name in columns)
+    
+    rows = _posts(range(1000, 1015))
+    rows.append(event(1100, "city_sensors", noise_level=95.0))
+    # Corroborated by the spike and the sensor, by nothing (elsewhere), and by the sensor only (too late for the spike)
+    rows.append(event(1050, "police_scanner", incident_type="fire", priority=1))
+    rows.append(event(1050, "police_scanner", lat=40.9, incident_type="crime", priority=2))
+    rows.append(event(1380, "police_scanner", incident_type="accident", priority=3))
+    
+    table = pw.debug.table_from_rows(schema=StreamSchema, rows=rows)
+    result = AnomalyDetector(config).process(table).filter(pw.this.anomaly_type == "correlated_incident")
+    descriptions = sorted(pw.debug.table_to_pandas(result)["anomaly_description"])
     
-    result = detector.process(anomalous_data)
-    assert result["anomaly"] == True
-    assert result["anomaly_type"] == "noise_level_anomaly"
+    assert descriptions == [
+        "Correlated accident incident: 0 social media spike(s) and 1 sensor anomalies within 300s nearby, confidence 0.75",
+        "Correlated fire incident: 1 social media spike(s) and 1 sensor anomalies within 300s nearby, confidence 0.875"
+    ]
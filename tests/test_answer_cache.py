@@ -0,0 +1,59 @@
+import numpy as np
+from src.processing.answer_cache import AnswerCache
+from src.processing.rag_system import RAGSystem
+
+class LetterModel:
+    """Embeds text as its letter counts, so case and punctuation do not change the embedding"""
+    def encode(self, texts, batch_size=None):
+        return np.array([[text.lower().count(letter) + 0.01 for letter in "abcdefghijklmnopqrstuvwxyz"] for text in texts])
+
+class StubEmbedder:
+    def __init__(self):
+        self.model = LetterModel()
+
+class StubLLM:
+    def __init__(self):
+        self.prompts = []
+    
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        return f"answer {len(self.prompts)}"
+
+def test_reuses_answer_only_for_same_documents():
+    cache = AnswerCache(similarity=0.99, ttl=60)
+    cache.put([1.0, 0.0], None, [1, 2], "cached", 2.0)
+    
+    assert cache.get([1.0, 0.001], None, [1, 2]) == "cached"
+    # Different documents, scope or meaning
+    assert cache.get([1.0, 0.0], None, [1, 3]) is None
+    assert cache.get([1.0, 0.0], ((40.7, -74.0), 1000, None), [1, 2]) is None
+    assert cache.get([0.0, 1.0], None, [1, 2]) is None
+    
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale"], stats["misses"]) == (1, 1, 3)
+    assert stats["saved_seconds"] == 2.0
+
+def test_expires_after_ttl():
+    cache = AnswerCache(ttl=0)
+    cache.put([1.0], None, [1], "cached", 1.0)
+    assert cache.get([1.0], None, [1]) is None
+    assert cache.stats()["entries"] == 0
+
+def test_rag_query_with_stub_llm():
+    llm = StubLLM()
+    config = {'llm': {}, 'rag': {'embedding': {'max_latency': 0.01, 'cache': {'enabled': False}}}}
+    rag_system = RAGSystem(config, embedder=StubEmbedder(), llm=llm)
+    row = {"timestamp": "2023-01-01T12:00:00", "event_time": 0.0, "source": "city_sensors", "lat": 40.78, "lon": -73.96, "noise_level": 90}
+    rag_system.add_document(row)
+    
+    assert rag_system.query("What is the noise level?") == "answer 1"
+    assert rag_system.query("what is the noise level") == "answer 1"
+    assert len(llm.prompts) == 1 and "noise_level=90" in llm.prompts[0]
+    
+    # A new document is retrieved, so the answer is generated again
+    rag_system.add_document({**row, "event_time": 60.0, "noise_level": 95})
+    assert rag_system.query("What is the noise level?") == "answer 2"
+    
+    stats = rag_system.stats()["answers"]
+    assert (stats["hits"], stats["stale"], stats["misses"]) == (1, 1, 2)
+    rag_system.batcher.close()
@@ -0,0 +1,71 @@
+import queue
+import threading
+
+import pytest
+from src.data_sources.buffering import IngestionBuffer
+
+def _reading(sensor, value):
+    return {"lat": 40.7, "lon": -74.0 + sensor, "noise_level": value}
+
+def test_drop_oldest():
+    buffer = IngestionBuffer(max_size=3, policy="drop_oldest")
+    for i in range(5):
+        buffer.put(_reading(i, i))
+    
+    assert [buffer.get()["noise_level"] for _ in range(3)] == [2, 3, 4]
+    stats = buffer.stats()
+    assert stats["dropped"] == 2
+    assert stats["max_depth"] == 3
+
+def test_coalesce_keeps_latest_per_key():
+    buffer = IngestionBuffer(max_size=10, policy="coalesce", key_columns=["lat", "lon"])
+    buffer.put(_reading(0, 50))
+    buffer.put(_reading(1, 60))
+    buffer.put(_reading(0, 90))
+    
+    # The newer reading replaces the older one in its original position
+    assert [buffer.get()["noise_level"] for _ in range(2)] == [90, 60]
+    assert buffer.stats()["coalesced"] == 1
+    
+    with pytest.raises(queue.Empty):
+        buffer.get(timeout=0.01)
+
+def test_discarded_events_are_reported():
+    discarded = []
+    buffer = IngestionBuffer(max_size=2, policy="coalesce", key_columns=["lat", "lon"], on_discard=discarded.append)
+    buffer.put(_reading(0, 50))
+    buffer.put(_reading(0, 55))
+    buffer.put(_reading(1, 60))
+    buffer.put(_reading(2, 70))
+    
+    # One reading replaced, then the oldest dropped for space
+    assert [reading["noise_level"] for reading in discarded] == [50, 55]
+    assert [buffer.get()["noise_level"] for _ in range(2)] == [60, 70]
+
+def test_block_waits_for_space():
+    buffer = IngestionBuffer(max_size=1, policy="block")
+    buffer.put(_reading(0, 1))
+    
+    producer = threading.Thread(target=buffer.put, args=(_reading(0, 2),))
+    producer.start()
+    producer.join(timeout=0.1)
+    assert producer.is_alive()
+    
+    assert buffer.get()["noise_level"] == 1
+    producer.join(timeout=1)
+    assert not producer.is_alive()
+    assert buffer.get()["noise_level"] == 2
+    assert buffer.stats()["dropped"] == 0
+
+def test_close_drains_then_raises():
+    buffer = IngestionBuffer(max_size=5)
+    buffer.put(_reading(0, 1))
+    buffer.close()
+    
+    assert buffer.get()["noise_level"] == 1
+    with pytest.raises(EOFError):
+        buffer.get()
+
+def test_coalesce_requires_key_columns():
+    with pytest.raises(ValueError):
+        IngestionBuffer(policy="coalesce")
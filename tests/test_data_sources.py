@@ -14,11 +14,12 @@ def test_social_media_source():
     source = SocialMediaSource(config)
     assert source.name == "social_media"
     
-    schema = source._define_schema()
-    assert 'timestamp' in schema
-    assert 'source' in schema
-    assert 'data' in schema
-    assert 'location' in schema
+    columns = source._define_schema().column_names()
+    assert 'timestamp' in columns
+    assert 'event_time' in columns
+    assert 'source' in columns
+    assert 'lat' in columns
+    assert 'lon' in columns
 
 def test_public_safety_source():
     config = {
@@ -32,11 +33,12 @@ def test_public_safety_source():
     source = PublicSafetySource(config)
     assert source.name == "public_safety"
     
-    schema = source._define_schema()
-    assert 'timestamp' in schema
-    assert 'source' in schema
-    assert 'data' in schema
-    assert 'location' in schema
+    columns = source._define_schema().column_names()
+    assert 'timestamp' in columns
+    assert 'event_time' in columns
+    assert 'source' in columns
+    assert 'lat' in columns
+    assert 'lon' in columns
 
 def test_iot_sensor_source():
     config = {
@@ -51,8 +53,90 @@ def test_iot_sensor_source():
     source = IoTSensorSource(config)
     assert source.name == "iot_sensors"
     
-    schema = source._define_schema()
-    assert 'timestamp' in schema
-    assert 'source' in schema
-    assert 'data' in schema
-    assert 'location' in schema
+    columns = source._define_schema().column_names()
+    assert 'timestamp' in columns
+    assert 'event_time' in columns
+    assert 'source' in columns
+    assert 'lat' in columns
+    assert 'lon' in columns
+
+def test_batching_subject_commits_per_batch():
+    import pathway as pw
+    from src.data_sources.base import DataSource, _BatchingSubject
+    
+    class FiniteSource(DataSource):
+        name = "finite"
+        
+        def _define_schema(self):
+            return pw.schema_from_types(timestamp=str, source=str, value=int)
+        
+        def _stream(self):
+            for i in range(25):
+                yield {"timestamp": str(i), "source": self.name, "value": i}
+    
+    config = {'data_sources': {'finite': {'batching': {'max_batch_size': 10, 'linger_ms': 1000}}}}
+    subject = _BatchingSubject(FiniteSource(config))
+    
+    batches = [[]]
+    subject.next = lambda **row: batches[-1].append(row["value"])
+    subject.commit = lambda: batches.append([])
+    subject.run()
+    
+    assert [len(batch) for batch in batches[:-1]] == [10, 10, 5]
+    assert batches[0] == list(range(10))
+
+def test_load_generation_is_deterministic():
+    config = {
+        'mode': 'public_safety',
+        'data_sources': {
+            'iot_sensors': {
+                'enabled': True,
+                'simulation_rate': 0.5,
+                'load_generation': {
+                    'enabled': True,
+                    'seed': 7,
+                    'max_events': 200,
+                    'sensors': 10,
+                    'anomaly_bursts': {'every': 100, 'length': 20}
+                }
+            }
+        }
+    }
+    
+    def readings():
+        return [
+            ({k: v for k, v in e.items() if k not in ('timestamp', 'event_time')}, (e["lat"], e["lon"]))
+            for e in IoTSensorSource(config)._stream()
+        ]
+    
+    first, second = readings(), readings()
+    assert len(first) == 200
+    assert first == second
+    
+    # Locations come from the fixed sensor set
+    assert len({loc for _, loc in first}) <= 10
+    
+    # Every burst event is anomalous and comes from a single sensor
+    burst = first[100:120]
+    assert all(data["anomaly"] for data, _ in burst)
+    assert len({loc for _, loc in burst}) == 1
+
+def test_flatten_event():
+    from src.data_sources.base import StreamSchema, flatten_event
+    
+    row = flatten_event({
+        "timestamp": "2023-01-01T12:00:00",
+        "source": "transit_api",
+        "data": {
+            "route_id": "M1",
+            "delay": 25,
+            "vehicle_location": {"lat": 40.7, "lon": -74.0}
+        },
+        "location": {"lat": 40.7128, "lon": -74.0060}
+    })
+    
+    assert set(row) == set(StreamSchema.column_names())
+    assert row["event_time"] == 1672574400.0
+    assert row["delay"] == 25.0 and isinstance(row["delay"], float)
+    assert row["vehicle_lat"] == 40.7
+    assert row["noise_level"] is None
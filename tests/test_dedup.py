@@ -0,0 +1,48 @@
+import pytest
+from src.processing.dedup import DecayingBloomFilter, Deduplicator, normalize_text
+
+def test_normalize_text():
+    original = "Fire near downtown! #fire https://t.co/abc"
+    retweet = "RT @citizen123: fire near  downtown #fire"
+    assert normalize_text(original) == normalize_text(retweet)
+    assert normalize_text(original) != normalize_text("Accident near downtown #accident")
+
+def test_decaying_filter_expires_keys():
+    bloom = DecayingBloomFilter(ttl=60, capacity=1000, false_positive_rate=0.001, generations=4)
+    assert not bloom.check_and_add(b"key", 0)
+    assert bloom.check_and_add(b"key", 30)
+    
+    # Gone once every generation covering it has been recycled
+    assert not bloom.check_and_add(b"key", 100)
+
+def test_decaying_filter_false_positive_rate():
+    bloom = DecayingBloomFilter(ttl=60, capacity=20000, false_positive_rate=0.01, generations=2)
+    for i in range(5000):
+        bloom.check_and_add(f"seen-{i}".encode(), 0)
+    
+    false_positives = sum(f"new-{i}".encode() in bloom for i in range(5000))
+    assert false_positives / 5000 < 0.02
+
+def test_deduplicator_drops_repeats_per_cell():
+    deduplicator = Deduplicator({'deduplication': {'ttl': 600, 'expected_keys': 10000, 'cell_size': 0.01}})
+    
+    assert not deduplicator.is_duplicate("twitter", "Fire downtown", 40.7128, -74.0060, 0)
+    assert deduplicator.is_duplicate("twitter", "RT @user: fire downtown", 40.7129, -74.0061, 5)
+    
+    # Same text elsewhere, or from a source that is not deduplicated, passes
+    assert not deduplicator.is_duplicate("twitter", "Fire downtown", 40.7528, -74.0060, 10)
+    assert not deduplicator.is_duplicate("city_sensors", None, 40.7128, -74.0060, 10)
+    
+    assert deduplicator.stats()["duplicates"] == 1
+
+def test_deduplicator_shards_cells():
+    deduplicator = Deduplicator({'deduplication': {'expected_keys': 8000, 'cell_size': 0.01, 'shards': 4}})
+    assert len(deduplicator.filters) == 4
+    
+    # Posts from many cells spread over the shards, and repeats are still found in each
+    for i in range(40):
+        assert not deduplicator.is_duplicate("twitter", "Fire downtown", 40.005 + 0.01 * i, -74.005, 0)
+    for i in range(40):
+        assert deduplicator.is_duplicate("twitter", "fire downtown!", 40.005 + 0.01 * i, -74.005, 1)
+    assert all(checked > 0 for checked in deduplicator.checked)
+    assert deduplicator.stats()["duplicates"] == 40
@@ -0,0 +1,103 @@
+import random
+import threading
+import pytest
+from src.processing.detectors import EwmaDetector, QuantileDetector, SeasonalDetector, StatisticalDetectors
+
+def test_ewma_flags_outliers_after_warmup():
+    detector = EwmaDetector({'alpha': 0.05, 'threshold': 4, 'warmup': 30})
+    state = detector.new_state()
+    rng = random.Random(1)
+    
+    flagged = [detector.update(state, rng.gauss(60, 2), t) for t in range(500)]
+    assert sum(reason is not None for reason in flagged) <= 2
+    assert abs(state[0] - 60) < 1
+    
+    reason = detector.update(state, 90.0, 500)
+    assert reason is not None and "above" in reason
+
+def test_quantile_sketch_tracks_quantile():
+    detector = QuantileDetector({'quantile': 0.9, 'warmup': 100})
+    state = detector.new_state()
+    rng = random.Random(2)
+    for t in range(20000):
+        detector.update(state, rng.uniform(0, 100), t)
+    
+    assert detector.estimate(state) == pytest.approx(90, abs=2)
+    assert detector.update(state, 99.0, 20000) is not None
+    assert detector.update(state, 50.0, 20001) is None
+
+def test_seasonal_baseline_per_hour_of_week():
+    detector = SeasonalDetector({'threshold': 3, 'warmup': 3})
+    state = detector.new_state()
+    week, hour = 7 * 24 * 3600, 3600
+    rng = random.Random(3)
+    
+    # Busy at 8am, quiet at 3am, for six weeks
+    for w in range(6):
+        detector.update(state, rng.gauss(100, 5), w * week + 8 * hour)
+        detector.update(state, rng.gauss(10, 1), w * week + 3 * hour)
+    
+    # A busy 8am is normal, the same level at 3am is not
+    assert detector.update(state, 100.0, 6 * week + 8 * hour) is None
+    assert detector.update(state, 100.0, 6 * week + 3 * hour) is not None
+
+def test_state_per_cell_and_metric():
+    config = {
+        'statistical_detectors': {
+            'metrics': {
+                'delay': {'detector': 'ewma', 'warmup': 10, 'threshold': 4},
+                'air_quality_index': {'detector': 'quantile', 'quantile': 0.99}
+            },
+            'state': {'max_cells': 100}
+        }
+    }
+    detectors = StatisticalDetectors(config)
+    rng = random.Random(4)
+    
+    # A cell where delays of 30 are normal, and one where they are not
+    for t in range(100):
+        assert detectors.check("transit_api", 40.71, -74.00, t, rng.uniform(29, 31), None) == (None, None)
+        assert detectors.check("transit_api", 40.80, -73.95, t, rng.uniform(4, 6), None) == (None, None)
+    
+    assert detectors.check("transit_api", 40.71, -74.00, 100, 30.0, None) == (None, None)
+    anomaly_type, description = detectors.check("transit_api", 40.80, -73.95, 100, 30.0, None)
+    assert anomaly_type == "delay_ewma_anomaly"
+    assert description.startswith("Unusual delay: 30.0 is")
+    # Only metrics with values get state
+    assert detectors.stats()["cells"] == 2
+
+def test_state_per_source():
+    config = {'statistical_detectors': {'metrics': {'delay': {'detector': 'ewma', 'warmup': 10, 'threshold': 4}}}}
+    detectors = StatisticalDetectors(config)
+    rng = random.Random(5)
+    
+    # Two sources report a delay from the same cell, on different scales
+    for t in range(100):
+        assert detectors.check("transit_api", 40.71, -74.00, t, rng.uniform(4, 6)) == (None, None)
+        assert detectors.check("ferry_api", 40.71, -74.00, t, rng.uniform(29, 31)) == (None, None)
+    
+    assert detectors.check("ferry_api", 40.71, -74.00, 100, 30.0) == (None, None)
+    assert detectors.check("transit_api", 40.71, -74.00, 100, 30.0)[0] == "delay_ewma_anomaly"
+    assert detectors.stats()["cells"] == 2
+
+def test_cells_in_other_shards_do_not_wait():
+    config = {'statistical_detectors': {'metrics': {'delay': {'detector': 'ewma'}}, 'state': {'shards': 4, 'max_cells': 8}}}
+    detectors = StatisticalDetectors(config)
+    assert [store.max_cells for store in detectors.stores] == [2] * 4
+    
+    locations = [(40.70 + 0.01 * i, -74.00) for i in range(20)]
+    shards = [detectors.grid.cell(lat, lon) % 4 for lat, lon in locations]
+    busy, other = locations[0], locations[next(i for i, shard in enumerate(shards) if shard != shards[0])]
+    
+    # While one shard is held, a cell of another shard is still checked
+    with detectors.locks[shards[0]]:
+        checked = threading.Thread(target=detectors.check, args=("transit_api", *other, 0, 5.0))
+        checked.start()
+        checked.join(timeout=5)
+        assert not checked.is_alive()
+    assert detectors.check("transit_api", *busy, 0, 5.0) == (None, None)
+    assert detectors.stats()["cells"] == 2
+
+def test_unknown_detector():
+    with pytest.raises(ValueError):
+        StatisticalDetectors({'statistical_detectors': {'metrics': {'delay': {'detector': 'prophet'}}}})
@@ -0,0 +1,49 @@
+import pytest
+from src.processing.document_columns import DocumentColumns
+
+def document(i):
+    return {"timestamp": f"t{i}", "event_time": float(i), "source": "city_sensors" if i % 2 else "twitter", "lat": 40.7, "lon": -74.0, "noise_level": i, "hashtags": ["fire"]}
+
+def test_documents_round_trip():
+    columns = DocumentColumns(capacity=2)
+    for i in range(5):
+        columns.add(i, document(i), cell=i % 3)
+    assert columns[3] == document(3)
+    assert list(reversed(columns)) == [4, 3, 2, 1, 0]
+    assert columns.location(2) == {"event_time": 2.0, "lat": 40.7, "lon": -74.0}
+    with pytest.raises(ValueError):
+        columns.add(7, document(7), cell=0)
+
+def test_removed_rows_are_reclaimed_from_the_front():
+    columns = DocumentColumns(capacity=4)
+    for i in range(10):
+        columns.add(i, document(i), cell=0)
+    assert columns.remove(5) == 0
+    for i in range(5):
+        columns.remove(i)
+    
+    # Rows up to the first live one are gone; ids still find their documents
+    assert columns.stats()["rows"] == 4 and len(columns) == 4
+    assert 5 not in columns and list(columns) == [6, 7, 8, 9]
+    assert columns[8] == document(8)
+    columns.add(10, document(10), cell=0)
+    assert columns[10] == document(10)
+
+def test_save_and_load(tmp_path):
+    columns = DocumentColumns(capacity=4)
+    for i in range(8):
+        columns.add(i, document(i), cell=i)
+    columns.remove(0)
+    columns.remove(6)
+    columns.save(str(tmp_path))
+    
+    loaded = DocumentColumns.load(str(tmp_path), capacity=4)
+    assert list(loaded) == [1, 2, 3, 4, 5, 7] and loaded[7] == document(7)
+    doc_ids, values = loaded.live_rows()
+    assert doc_ids.tolist() == [1, 2, 3, 4, 5, 7] and values["cell"].tolist() == [1, 2, 3, 4, 5, 7]
+    
+    # New documents follow the loaded ones, and removing the loaded ones reclaims their rows
+    loaded.add(8, document(8), cell=8)
+    for doc_id in [1, 2, 3, 4, 5]:
+        loaded.remove(doc_id)
+    assert list(loaded) == [7, 8] and loaded[7] == document(7) and loaded[8] == document(8)
@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+import numpy as np
+import pytest
+import yaml
+from src.processing.document_store import DocumentStore, RetentionPolicy
+from src.processing.query_scope import QueryScope
+from src.processing.rag_system import RAGSystem
+from src.processing.vector_index import IVFIndex
+
+def event(source, event_time, **fields):
+    return {"source": source, "event_time": event_time, "lat": 40.7, "lon": -74.0, **fields}
+
+def test_retention_by_age_and_count_per_source():
+    policy = RetentionPolicy(max_age=100, sources={"social_media": {"max_documents": 2}})
+    assert policy.add(0, "city_sensors", 0) == []
+    assert policy.add(1, "social_media", 10) == []
+    assert policy.add(2, "social_media", 20) == []
+    # The third post evicts the first; the sensor reading is still young enough
+    assert policy.add(3, "social_media", 30) == [1]
+    # 150s later the sensor reading and older posts have expired
+    assert sorted(policy.add(4, "city_sensors", 150)) == [0, 2, 3]
+    assert policy.stats() == {"documents": 1, "expired": 3, "evicted": 1}
+
+def test_overall_cap_drops_oldest_of_any_source():
+    policy = RetentionPolicy(max_documents=2)
+    policy.add(0, "a", 5)
+    policy.add(1, "b", 1)
+    assert policy.add(2, "a", 6) == [1]
+
+def test_store_removes_dropped_documents_from_index():
+    store = DocumentStore(RetentionPolicy(max_documents=2))
+    ids = [store.add(event("city_sensors", t, noise_level=t)) for t in range(3)]
+    store.add_embeddings([np.eye(3)[i] for i in range(3)], ids)
+    
+    assert len(store) == 2 and ids[0] not in store
+    assert len(store.index) == 2
+    assert sorted(doc["noise_level"] for _, doc, _ in store.search(np.eye(3)[0], 5)) == [1, 2]
+    assert store.stats()["index"]["documents"] == 2
+
+def test_search_prefers_recent_documents():
+    store = DocumentStore(RetentionPolicy(), recency_weight=0.5, recency_half_life=60)
+    old = store.add(event("city_sensors", 0, noise_level=1))
+    new = store.add(event("city_sensors", 600, noise_level=2))
+    # The old document is slightly more similar, but ten half-lives older
+    store.add_embeddings([[1.0, 0.05], [1.0, 0.2]], [old, new])
+    
+    results = store.search([1.0, 0.0], 2)
+    assert [doc["noise_level"] for _, doc, _ in results] == [2, 1]
+
+@pytest.mark.parametrize("max_candidates", [1000, 1])
+def test_scoped_search_only_returns_documents_in_scope(max_candidates):
+    store = DocumentStore(RetentionPolicy(), max_candidates=max_candidates)
+    places = [(40.7829, -73.9654), (40.7061, -74.0087)]
+    ids = []
+    for t in range(40):
+        lat, lon = places[t % 2]
+        ids.append(store.add(event("city_sensors", t * 60, lat=lat, lon=lon, noise_level=t)))
+    store.add_embeddings([[1.0, t / 40] for t in range(40)], ids)
+    
+    # Near the first place, within the last 10 minutes of event time
+    results = store.search([1.0, 0.0], 10, QueryScope(near=places[0], radius=500, window=600))
+    assert sorted(doc["noise_level"] for _, doc, _ in results) == [30, 32, 34, 36, 38]
+    
+    # Time only
+    results = store.search([1.0, 0.0], 10, QueryScope(window=180))
+    assert sorted(doc["noise_level"] for _, doc, _ in results) == [36, 37, 38, 39]
+    stats = store.stats()
+    assert (stats["prefiltered_searches"], stats["postfiltered_searches"]) == ((2, 0) if max_candidates > 1 else (0, 2))
+
+def test_save_and_restore(tmp_path):
+    store = DocumentStore(RetentionPolicy(max_documents=3), index=IVFIndex(nlist=2, train_size=2, dtype="int8"))
+    places = [(40.7829, -73.9654), (40.7061, -74.0087)]
+    ids = [store.add(event("city_sensors", t * 60, lat=places[t % 2][0], lon=places[t % 2][1], noise_level=t)) for t in range(5)]
+    store.add_embeddings([[1.0, t / 5] for t in range(5)], ids)
+    store.index.finish_training()
+    store.save(str(tmp_path))
+    store.save(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["CURRENT", "snapshot-2"]
+    
+    restored = DocumentStore(RetentionPolicy(max_documents=3), grid=store.grid)
+    assert restored.restore(str(tmp_path))
+    assert len(restored) == 3 and restored[4] == store[4] and restored.stats()["documents"] == 3
+    scope = QueryScope(near=places[0], radius=500)
+    assert restored.search([1.0, 0.0], 5, scope) == store.search([1.0, 0.0], 5, scope)
+    
+    # Retention carries on where it left off
+    new = restored.add(event("city_sensors", 300, noise_level=5))
+    assert new == 5 and 2 not in restored and len(restored) == 3
+    assert not DocumentStore(RetentionPolicy()).restore(str(tmp_path / "missing"))
+
+class CountingModel:
+    """Embeds text as its letter counts, and counts the texts embedded"""
+    def __init__(self):
+        self.encoded = 0
+    
+    def encode(self, texts, batch_size=None):
+        self.encoded += len(texts)
+        return np.array([[text.lower().count(letter) + 0.01 for letter in "abcdefghijklmnopqrstuvwxyz"] for text in texts])
+
+class StubEmbedder:
+    def __init__(self):
+        self.model = CountingModel()
+
+@pytest.mark.parametrize("mode", ["public_safety", "urban_planning"])
+def test_example_retention_overrides_name_event_sources(mode):
+    from src.data_sources.base import DataSourceManager
+    with open(os.path.join(os.path.dirname(__file__), "..", "config", f"{mode}.yaml.example")) as f:
+        config = yaml.safe_load(f)
+    
+    # One generated event from each enabled source gives the source values events carry
+    for name, source_config in config['data_sources'].items():
+        source_config['polling'] = {'enabled': False}
+        source_config['load_generation'] = {'enabled': True, 'seed': 1, 'events_per_second': 0, 'max_events': 1}
+    sources = {event['source'] for source in DataSourceManager(config).sources for event in source._stream()}
+    
+    overrides = config['rag']['retention']['sources']
+    assert set(overrides) <= sources
+    if mode == "public_safety":
+        assert RetentionPolicy.from_config(config['rag']['retention'])._limit("twitter", "max_age") == 3600
+
+def test_rag_system_restarts_from_snapshot(tmp_path):
+    config = {'llm': {}, 'rag': {
+        'embedding': {'max_latency': 0.01, 'cache': {'enabled': False}},
+        'index': {'dtype': 'int8'},
+        'store': {'path': str(tmp_path), 'checkpoint_interval': 0}
+    }}
+    rag_system = RAGSystem(config, embedder=StubEmbedder(), llm=object())
+    for t in range(3):
+        rag_system.add_document(event("city_sensors", t, timestamp=str(t), noise_level=90 + t))
+    # Saved before it is embedded
+    rag_system.documents.add(event("police_scanner", 3, incident_type="fire"))
+    rag_system.checkpoint()
+    rag_system.batcher.close()
+    
+    embedder = StubEmbedder()
+    restarted = RAGSystem(config, embedder=embedder, llm=object())
+    restarted.flush()
+    # Only the document the snapshot held without an embedding is embedded again
+    assert embedder.model.encoded == 1
+    _, _, results = restarted.retrieve("police fire")
+    assert results[0][1]["incident_type"] == "fire" and len(results) == 4
+    restarted.batcher.close()
+
+def test_rag_system_removes_retracted_documents():
+    rag_system = RAGSystem({'llm': {}, 'rag': {'embedding': {'max_latency': 0.01, 'cache': {'enabled': False}}}}, embedder=StubEmbedder(), llm=object())
+    old = event("police_scanner", 0, anomaly=True, anomaly_type="correlated_incident", anomaly_description="1 sensor anomalies")
+    new = dict(old, anomaly_description="2 sensor anomalies")
+    
+    # An update whose new version arrives before the old one is retracted
+    rag_system.on_change("incident", old, 0, True)
+    rag_system.on_change("incident", new, 2, True)
+    rag_system.on_change("incident", old, 2, False)
+    rag_system.on_change("reading", event("city_sensors", 1, noise_level=90), 2, True)
+    rag_system.flush()
+    descriptions = sorted(rag_system.documents[doc_id].get("anomaly_description", "") for doc_id in rag_system.documents.documents)
+    assert descriptions == ["", "2 sensor anomalies"]
+    
+    # Then the row is withdrawn
+    rag_system.on_change("incident", new, 4, False)
+    assert len(rag_system.documents) == 1
+    assert rag_system.documents.stats()["documents"] == 1
+    assert rag_system.retractable == {}
+    rag_system.batcher.close()
+
+def test_retrieve_does_not_wait_for_embedding_backlog():
+    class BlockedModel(CountingModel):
+        """Embeds documents only once released, and questions right away"""
+        def encode(self, texts, batch_size=None):
+            if texts[0].startswith("city_sensors"):
+                released.wait()
+            return super().encode(texts, batch_size)
+    
+    released = threading.Event()
+    embedder = StubEmbedder()
+    embedder.model = BlockedModel()
+    config = {'llm': {}, 'rag': {'embedding': {'max_latency': 0.01, 'cache': {'enabled': False}}, 'queries': {'index_wait': 0.05}}}
+    rag_system = RAGSystem(config, embedder=embedder, llm=object())
+    rag_system.add_document(event("city_sensors", 0, timestamp="0", noise_level=90))
+    
+    start = time.perf_counter()
+    _, _, results = rag_system.retrieve("How loud is it?")
+    assert results == [] and time.perf_counter() - start < 1
+    
+    released.set()
+    rag_system.flush()
+    _, _, results = rag_system.retrieve("How loud is it?")
+    assert len(results) == 1
+    rag_system.batcher.close()
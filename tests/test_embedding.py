@@ -0,0 +1,78 @@
+import threading
+import time
+from src.processing.embedding import EmbeddingBatcher, EmbeddingCache
+
+class Recorder:
+    def __init__(self):
+        self.batches = []
+        self.indexed = []
+        self.lock = threading.Lock()
+    
+    def embed(self, texts):
+        with self.lock:
+            self.batches.append(len(texts))
+        return [[float(len(text))] for text in texts]
+    
+    def index(self, embeddings, items):
+        with self.lock:
+            self.indexed.extend(zip(embeddings, items))
+
+def test_embeds_full_batches():
+    recorder = Recorder()
+    batcher = EmbeddingBatcher(recorder.embed, recorder.index, batch_size=4, max_latency=10)
+    for i in range(10):
+        batcher.add("x" * i, i)
+    batcher.flush()
+    
+    assert sorted(recorder.batches) == [2, 4, 4]
+    # Each document keeps its own embedding
+    assert sorted((item, embedding[0]) for embedding, item in recorder.indexed) == [(i, float(i)) for i in range(10)]
+    batcher.close()
+
+def test_partial_batch_after_max_latency():
+    recorder = Recorder()
+    batcher = EmbeddingBatcher(recorder.embed, recorder.index, batch_size=100, max_latency=0.05)
+    batcher.add("a", 1)
+    batcher.add("b", 2)
+    
+    deadline = time.time() + 2
+    while not recorder.indexed and time.time() < deadline:
+        time.sleep(0.01)
+    assert recorder.batches == [2]
+    assert batcher.stats.documents == 2
+    batcher.close()
+
+def test_failed_batches_are_counted():
+    def fail(texts):
+        raise RuntimeError("model unavailable")
+    
+    batcher = EmbeddingBatcher(fail, lambda embeddings, items: None, batch_size=10, max_latency=10)
+    batcher.add("a", 1)
+    batcher.flush()
+    assert batcher.stats.failed == 1
+    assert batcher.stats.documents == 0
+    batcher.close()
+
+def test_cache_embeds_repeated_documents_once(tmp_path):
+    calls = []
+    def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+    
+    cache = EmbeddingCache("model", max_entries=2, path=str(tmp_path))
+    first = cache.embed(["a  b", "c", "a b"], embed)
+    # Whitespace is normalised and repeats within a batch are embedded once
+    assert calls == [["a  b", "c"]]
+    assert first[0].tolist() == first[2].tolist() == [4.0, 1.0]
+    
+    cache.embed(["c", "d"], embed)
+    assert calls[-1] == ["d"]
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 4)
+    
+    # A new process finds everything on disk, and another model does not share entries
+    restarted = EmbeddingCache("model", path=str(tmp_path))
+    assert [vector.tolist() for vector in restarted.embed(["c", "a b"], embed)] == [[1.0, 1.0], [4.0, 1.0]]
+    assert restarted.stats()["disk_hits"] == 2
+    assert len(calls) == 2
+    EmbeddingCache("other", path=str(tmp_path)).embed(["c"], embed)
+    assert len(calls) == 3
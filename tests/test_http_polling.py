@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from src.data_sources.http_polling import Endpoint, HttpPoller, events_from_payload
+
+FEED = [{"route_id": "M1", "delay": 25, "location": {"lat": 40.7128, "lon": -74.0060}}]
+
+class StubFeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        
+        body = json.dumps(FEED).encode()
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubFeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/transit"
+    server.shutdown()
+
+def test_poller_uses_conditional_requests(stub_server):
+    poller = HttpPoller(pool_size=4)
+    polls = poller.poll([Endpoint(stub_server, interval=0.05, jitter=0.1)])
+    
+    endpoint, payload = next(polls)
+    assert payload == FEED
+    
+    # Later polls send the ETag back and get 304 Not Modified
+    deadline = time.time() + 5
+    while poller.stats.not_modified < 2 and time.time() < deadline:
+        time.sleep(0.05)
+    polls.close()
+    poller.close()
+    
+    assert poller.stats.not_modified >= 2
+    assert poller.stats.errors == 0
+
+def test_endpoint_from_config_api_key():
+    config = {'api_key': 'secret', 'polling': {'interval': 5, 'api_key_param': 'key'}}
+    endpoint = Endpoint.from_config("http://localhost/traffic", config)
+    assert endpoint.params == {'key': 'secret'}
+    assert endpoint.interval == 5
+    
+    endpoint = Endpoint.from_config("http://localhost/transit", {'api_key': 'secret'})
+    assert endpoint.headers == {'Authorization': 'Bearer secret'}
+
+def test_events_from_payload():
+    events = list(events_from_payload(FEED, "transit_api"))
+    assert len(events) == 1
+    assert events[0]["source"] == "transit_api"
+    assert events[0]["data"] == {"route_id": "M1", "delay": 25}
+    assert events[0]["location"] == {"lat": 40.7128, "lon": -74.0060}
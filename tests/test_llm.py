@@ -0,0 +1,68 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+pytest.importorskip("requests")
+
+from src.processing.llm import ChatCompletion
+from src.processing.rag_system import RAGSystem
+
+class StubCompletions(BaseHTTPRequestHandler):
+    requests = []
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StubCompletions.requests.append((self.path, self.headers["Authorization"], body))
+        answer = json.dumps({"choices": [{"message": {"role": "assistant", "content": f"answer {len(StubCompletions.requests)}"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(answer)))
+        self.end_headers()
+        self.wfile.write(answer)
+    
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def base_url():
+    StubCompletions.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCompletions)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+class LetterModel:
+    def encode(self, texts, batch_size=None):
+        return np.array([[text.lower().count(letter) + 0.01 for letter in "abcdefghijklmnopqrstuvwxyz"] for text in texts])
+
+class StubEmbedder:
+    def __init__(self):
+        self.model = LetterModel()
+
+def test_generate_posts_one_chat_completion(base_url):
+    llm = ChatCompletion.from_config({'llm': {'model': "gpt-test", 'api_key': "key", 'base_url': base_url + "/", 'temperature': 0.1}})
+    assert llm.generate("What happened?") == "answer 1"
+    
+    path, authorization, body = StubCompletions.requests[0]
+    assert path == "/v1/chat/completions"
+    assert authorization == "Bearer key"
+    assert body == {"model": "gpt-test", "messages": [{"role": "user", "content": "What happened?"}], "temperature": 0.1}
+
+def test_rag_query_uses_chat_completion_by_default(base_url):
+    config = {
+        'llm': {'model': "gpt-test", 'api_key': "key", 'base_url': base_url},
+        'rag': {'embedding': {'max_latency': 0.01, 'cache': {'enabled': False}}}
+    }
+    rag_system = RAGSystem(config, embedder=StubEmbedder())
+    rag_system.add_document({"timestamp": "0", "event_time": 0.0, "source": "city_sensors", "lat": 40.78, "lon": -73.96, "noise_level": 90})
+    
+    assert rag_system.query("What is the noise level?") == "answer 1"
+    # Answered again from the cache, without a request
+    assert rag_system.query("What is the noise level?") == "answer 1"
+    assert len(StubCompletions.requests) == 1
+    assert "noise_level=90" in StubCompletions.requests[0][2]["messages"][0]["content"]
+    rag_system.batcher.close()
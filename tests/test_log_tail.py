@@ -0,0 +1,159 @@
+import json
+import os
+
+import pytest
+from src.data_sources.base import POSITION
+from src.data_sources.buffering import IngestionBuffer
+from src.data_sources.log_tail import LogTailSource
+
+def _append(path, start, count):
+    with open(path, 'a') as f:
+        for i in range(start, start + count):
+            f.write(json.dumps({
+                "timestamp": "2023-01-01T12:00:00",
+                "source": "city_sensors",
+                "data": {"noise_level": float(i)},
+                "location": {"lat": 40.7128, "lon": -74.0060}
+            }) + "\n")
+
+def _source(tmp_path, **settings):
+    config = {
+        'data_sources': {
+            'log_tail': {
+                'path': str(tmp_path / "events.log*"),
+                'checkpoint_path': str(tmp_path / "checkpoint.json"),
+                'follow': False,
+                **settings
+            }
+        }
+    }
+    return LogTailSource(config)
+
+def _drain(source):
+    # Stands in for the engine: every event is committed once read
+    levels = []
+    for event in source._stream():
+        levels.append(event["noise_level"])
+        source._committed([event.pop(POSITION)])
+    source._committed([])
+    return levels
+
+def test_resumes_from_checkpoint(tmp_path):
+    log = tmp_path / "events.log"
+    _append(log, 0, 5)
+    assert _drain(_source(tmp_path)) == [0, 1, 2, 3, 4]
+    
+    _append(log, 5, 3)
+    assert _drain(_source(tmp_path)) == [5, 6, 7]
+
+def test_uncommitted_events_are_read_again(tmp_path):
+    log = tmp_path / "events.log"
+    _append(log, 0, 4)
+    
+    source = _source(tmp_path)
+    stream = source._stream()
+    first = next(stream)
+    next(stream)
+    source._committed([first[POSITION]])
+    source._write_checkpoint()
+    
+    assert _drain(_source(tmp_path)) == [1, 2, 3]
+
+@pytest.mark.parametrize("policy", ["drop_oldest", "coalesce"])
+def test_checkpoint_follows_events_the_buffer_kept(tmp_path, policy):
+    log = tmp_path / "events.log"
+    _append(log, 0, 5)
+    
+    # Only the newest events survive the buffer, and the engine commits those
+    source = _source(tmp_path)
+    buffer = IngestionBuffer(max_size=2, policy=policy, key_columns=["source"], on_discard=lambda event: source._discarded(event[POSITION]))
+    for event in source._stream():
+        buffer.put(event)
+    buffer.close()
+    kept = []
+    while True:
+        try:
+            kept.append(buffer.get())
+        except EOFError:
+            break
+    source._committed([event.pop(POSITION) for event in kept])
+    source._committed([])
+    assert [event["noise_level"] for event in kept] == ([3, 4] if policy == "drop_oldest" else [4])
+    
+    _append(log, 5, 1)
+    assert _drain(_source(tmp_path)) == [5]
+
+def test_checkpoint_waits_for_events_still_queued(tmp_path):
+    log = tmp_path / "events.log"
+    with open(log, 'w') as f:
+        for i, lat in enumerate([40.1, 40.2, 40.1]):
+            f.write(json.dumps({
+                "timestamp": "2023-01-01T12:00:00",
+                "source": "city_sensors",
+                "data": {"noise_level": float(i)},
+                "location": {"lat": lat, "lon": -74.0060}
+            }) + "\n")
+    
+    # The third line replaces the first in its queue slot, ahead of the second
+    source = _source(tmp_path)
+    buffer = IngestionBuffer(policy="coalesce", key_columns=["lat"], on_discard=lambda event: source._discarded(event[POSITION]))
+    for event in source._stream():
+        buffer.put(event)
+    newest = buffer.get()
+    assert newest["noise_level"] == 2
+    source._committed([newest.pop(POSITION)])
+    source._write_checkpoint()
+    # The second line is still queued, so a restart reads it again
+    assert [event["noise_level"] for event in _source(tmp_path)._stream()] == [1, 2]
+    
+    second = buffer.get()
+    source._committed([second.pop(POSITION)])
+    source._committed([])
+    assert _drain(_source(tmp_path)) == []
+
+def test_survives_rotation(tmp_path):
+    log = tmp_path / "events.log"
+    _append(log, 0, 3)
+    assert _drain(_source(tmp_path)) == [0, 1, 2]
+    
+    # Lines appended before rotation are still read from the renamed file
+    _append(log, 3, 2)
+    os.rename(log, tmp_path / "events.log.1")
+    _append(log, 5, 2)
+    assert sorted(_drain(_source(tmp_path))) == [3, 4, 5, 6]
+
+def test_partial_line_waits(tmp_path):
+    log = tmp_path / "events.log"
+    _append(log, 0, 2)
+    with open(log, 'a') as f:
+        f.write('{"timestamp": "2023-01-01T12:00:00", "source": "city_sensors", "data"')
+    
+    source = _source(tmp_path)
+    assert _drain(source) == [0, 1]
+    
+    with open(log, 'a') as f:
+        f.write(': {"noise_level": 2.0}, "location": {"lat": 40.7, "lon": -74.0}}\n')
+    assert _drain(_source(tmp_path)) == [2]
+
+def test_truncated_file_is_read_from_start(tmp_path):
+    log = tmp_path / "events.log"
+    _append(log, 0, 5)
+    _drain(_source(tmp_path))
+    
+    log.write_text("")
+    _append(log, 10, 1)
+    assert _drain(_source(tmp_path)) == [10]
+
+def test_small_reads_and_stats(tmp_path):
+    log = tmp_path / "events.log"
+    _append(log, 0, 20)
+    with open(log, 'a') as f:
+        f.write("not json\n")
+    
+    source = _source(tmp_path, read_size=64)
+    assert _drain(source) == list(range(20))
+    
+    stats = source.stats()
+    assert stats["errors"] == 1
+    assert stats["catch_up_events"] == 20
+    assert stats["first_event_seconds"] is not None
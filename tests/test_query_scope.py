@@ -0,0 +1,26 @@
+import pytest
+from src.processing.query_scope import QueryScope, ScopeParser, distance
+
+PLACES = {"Central Park": [40.7829, -73.9654], "Central Park West": [40.7794, -73.9742]}
+
+def test_distance():
+    # One degree of latitude is about 111 km
+    assert distance(40.0, -74.0, 41.0, -74.0) == pytest.approx(111195, rel=0.001)
+
+@pytest.mark.parametrize("question, near, radius, window", [
+    ("What's happening near Central Park in the last 15 minutes?", (40.7829, -73.9654), 1000, 900),
+    ("Any crowds on central park west over the past hour?", (40.7794, -73.9742), 1000, 3600),
+    ("Incidents within 2 km of 40.75, -73.99 in the last 2 days", (40.75, -73.99), 2000, 172800),
+    ("How is traffic overall?", None, 1000, None)
+])
+def test_parse(question, near, radius, window):
+    scope = ScopeParser(PLACES).parse(question)
+    assert scope.near == near
+    assert scope.radius == radius
+    assert scope.window == window
+
+def test_contains():
+    scope = QueryScope(near=(40.7829, -73.9654), radius=500)
+    assert scope.contains({"event_time": 0, "lat": 40.7830, "lon": -73.9650}, None)
+    assert not scope.contains({"event_time": 0, "lat": 40.80, "lon": -73.9650}, None)
+    assert not scope.contains({"event_time": 0, "lat": 40.7830, "lon": -73.9650}, since=10)
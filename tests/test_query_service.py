@@ -0,0 +1,147 @@
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from src.processing.llm import ChatCompletion
+from src.processing.query_service import QueryService, StreamingChat
+from src.processing.rag_system import RAGSystem
+
+ANSWER = "Noise is high near the park".split(" ")
+
+class LetterModel:
+    def encode(self, texts, batch_size=None):
+        return np.array([[text.lower().count(letter) + 0.01 for letter in "abcdefghijklmnopqrstuvwxyz"] for text in texts])
+
+class StubEmbedder:
+    def __init__(self):
+        self.model = LetterModel()
+
+class StubLLMServer:
+    """OpenAI-style chat endpoint that waits `latency` seconds, then streams a token every `interval`,
+    or sends the whole answer when the request does not ask for a stream"""
+    
+    def __init__(self, latency=0.0, interval=0.02):
+        self.latency = latency
+        self.interval = interval
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.port = asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+    
+    async def _start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.complete)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return site._server.sockets[0].getsockname()[1]
+    
+    async def complete(self, request):
+        body = await request.json()
+        assert "Question:" in body["messages"][0]["content"]
+        self.requests += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if not body.get("stream"):
+                await asyncio.sleep(self.latency)
+                return web.json_response({"choices": [{"message": {"role": "assistant", "content": " ".join(ANSWER)}}]})
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            await asyncio.sleep(self.latency)
+            for i, word in enumerate(ANSWER):
+                chunk = {"choices": [{"delta": {"content": word if i == 0 else " " + word}}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                await asyncio.sleep(self.interval)
+            await response.write(b"data: [DONE]\n\n")
+            return response
+        finally:
+            self.active -= 1
+    
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+@pytest.fixture
+def service_for():
+    created = []
+    def make(latency=0.0, interval=0.02, streaming=True, **settings):
+        server = StubLLMServer(latency, interval)
+        base_url = f"http://127.0.0.1:{server.port}/v1"
+        rag_system = RAGSystem({'llm': {}, 'rag': {'embedding': {'max_latency': 0.01}}}, embedder=StubEmbedder(), llm=ChatCompletion("stub", "key", base_url=base_url))
+        rag_system.add_document({"event_time": 0.0, "source": "city_sensors", "lat": 40.78, "lon": -73.96, "noise_level": 90})
+        chat = StreamingChat("stub", "key", base_url=base_url) if streaming else None
+        service = QueryService(rag_system, chat, **settings)
+        service.start()
+        created.append((server, rag_system, service))
+        return server, service
+    yield make
+    for server, rag_system, service in created:
+        service.close()
+        rag_system.batcher.close()
+        server.close()
+
+def test_streams_tokens_as_they_arrive(service_for):
+    server, service = service_for(interval=0.05)
+    start = time.perf_counter()
+    arrivals = []
+    tokens = []
+    for token in service.stream_sync("How loud is it?"):
+        arrivals.append(time.perf_counter() - start)
+        tokens.append(token)
+    
+    assert "".join(tokens) == " ".join(ANSWER)
+    # The first token is shown long before the last one is generated
+    assert arrivals[-1] - arrivals[0] >= 0.05 * (len(ANSWER) - 2)
+    # Asked again, the answer comes from the answer cache
+    assert "".join(service.stream_sync("How loud is it?")) == " ".join(ANSWER)
+    assert server.requests == 1 and service.stats.cached == 1
+
+def test_coalesces_identical_queries(service_for):
+    server, service = service_for(latency=0.2)
+    
+    async def ask_together():
+        return await asyncio.gather(*[service.query("How loud is it near the park?") for _ in range(5)])
+    
+    answers = asyncio.run_coroutine_threadsafe(ask_together(), service.loop).result(10)
+    assert answers == [" ".join(ANSWER)] * 5
+    assert server.requests == 1
+    assert service.stats.coalesced == 4
+
+def test_bounds_concurrent_generations(service_for):
+    server, service = service_for(latency=0.1, max_concurrency=2)
+    
+    async def ask_distinct():
+        return await asyncio.gather(*[service.query(f"Question number {'x' * i}?") for i in range(6)])
+    
+    asyncio.run_coroutine_threadsafe(ask_distinct(), service.loop).result(10)
+    assert server.requests == 6
+    assert server.peak == 2
+
+def test_times_out(service_for):
+    server, service = service_for(latency=2.0, timeout=0.2)
+    with pytest.raises(asyncio.TimeoutError):
+        list(service.stream_sync("How loud is it?"))
+    assert service.stats.timeouts == 1
+
+def test_answers_whole_without_streaming(service_for):
+    server, service = service_for(streaming=False)
+    assert list(service.stream_sync("How loud is it?")) == [" ".join(ANSWER)]
+    assert server.requests == 1 and service.stats.generated == 1
+
+def test_first_token_samples_are_bounded(service_for):
+    server, service = service_for(max_samples=3)
+    for i in range(5):
+        list(service.stream_sync(f"Question number {'x' * i}?"))
+    assert len(service.stats.first_token) == 3
+    assert service.stats.as_dict()["first_token_p50"] > 0
@@ -12,19 +12,21 @@ def test_rag_system():
     rag_system = RAGSystem(config)
     
     # Test adding document
-    data = {
-        "noise_level": 90,
-        "crowd_density": 0.9
-    }
-    source = "city_sensors"
-    location = {
+    row = {
+        "timestamp": "2023-01-01T12:00:00",
+        "event_time": 1672574400.0,
+        "source": "city_sensors",
         "lat": 40.7128,
-        "lon": -74.0060
+        "lon": -74.0060,
+        "noise_level": 90,
+        "crowd_density": 0.9,
+        "delay": None
     }
     
-    result = rag_system.add_document(data, source, location)
+    result = rag_system.add_document(row)
     assert result == True
     assert len(rag_system.documents) == 1
+    assert "delay" not in rag_system.documents[0]
     
     # Test querying
     # Note: This would require mocking the LLM in a real test
@@ -0,0 +1,57 @@
+import pandas as pd
+import pathway as pw
+from src.data_sources.base import StreamSchema
+from src.processing.anomaly_detection import AnomalyDetector
+from src.processing.rollup import Rollup, notable_anomalies, summarize
+
+def event(**columns):
+    row = dict.fromkeys(StreamSchema.column_names())
+    row.update(timestamp=str(columns['event_time']), lat=40.78, lon=-73.96, **columns)
+    return tuple(row[name] for name in StreamSchema.column_names())
+
+def test_summarize():
+    text = summarize({'noise_level': [50.0, 60.0, 100.0], 'delay': []}, {'hashtags': [['fire', 'nyc'], ['fire']]})
+    assert text == "noise_level mean 70, min 50, max 100; hashtags fire (2), nyc (1)"
+
+def test_notable_anomalies_ranks_types_and_limits_descriptions():
+    flagged = [
+        (None, None),
+        ("noise_level_anomaly", "High noise_level detected: 95"),
+        ("noise_level_anomaly", "High noise_level detected: 90"),
+        ("noise_level_anomaly,crowd_density_anomaly", "High noise_level detected: 99; High crowd_density detected: 0.9")
+    ]
+    types, notable = notable_anomalies(flagged, max_notable=1)
+    assert types == "noise_level_anomaly (3), crowd_density_anomaly (1)"
+    assert notable == "High noise_level detected: 90; and 1 more"
+    assert notable_anomalies([(None, None)]) == (None, None)
+
+def test_rollup_documents():
+    rows = [
+        event(event_time=1000.0 + 5 * i, source="city_sensors", noise_level=100.0 if i == 30 else 50.0 + i % 10, crowd_density=0.3)
+        for i in range(100)
+    ]
+    rows.append(event(event_time=1100.0, source="police_scanner", incident_type="fire", priority=1, description="Fire"))
+    
+    config = {'anomaly_rules': {'noise_level': 80}, 'rag': {'rollup': {'window': 300}}}
+    table = pw.debug.table_from_rows(schema=StreamSchema, rows=rows)
+    documents = Rollup(config).documents(AnomalyDetector(config).process(table))
+    result = pw.debug.table_to_pandas(documents).sort_values("event_time")
+    
+    # The incident and the anomalous reading as they were, and one summary per window
+    assert list(result["source"]) == ["police_scanner", "city_sensors", "city_sensors", "city_sensors"]
+    incident, anomaly, first, second = result.to_dict("records")
+    assert incident["incident_type"] == "fire" and pd.isna(incident["summary"])
+    assert anomaly["noise_level"] == 100.0 and anomaly["anomaly_type"] == "noise_level_anomaly"
+    
+    assert first["events"] == 40 and second["events"] == 60
+    assert pd.isna(first["noise_level"])
+    assert first["period"] == "1970-01-01 00:15:00 to 00:20:00 UTC"
+    assert first["summary"].startswith("noise_level mean 55.75, min 50, max 100; crowd_density mean 0.3")
+    assert (first["anomalies"], first["anomaly_types"]) == (1, "noise_level_anomaly (1)")
+    assert first["notable"] == "High noise_level detected: 100.0"
+    assert second["anomalies"] == 0 and pd.isna(second["notable"])
+
+def test_rollup_disabled():
+    config = {'rag': {'rollup': {'enabled': False}}}
+    table = pw.debug.table_from_rows(schema=StreamSchema, rows=[event(event_time=0.0, source="city_sensors", noise_level=50.0)])
+    assert Rollup(config).documents(table) is table
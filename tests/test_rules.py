@@ -0,0 +1,65 @@
+import pytest
+import pathway as pw
+from typing import Optional
+from src.processing.rules import RuleTable
+
+RULES = {
+    'noise_level': 80,
+    'crowd_density': 0.8,
+    'social_media_spike': 10,
+    'traffic_flow': 0.2,
+    'sources': {
+        'traffic_cameras': {'average_speed': {'min': 5, 'max': 120}}
+    }
+}
+
+def test_compiles_per_source_bounds():
+    table = RuleTable(RULES)
+    assert table.metrics == ['average_speed', 'crowd_density', 'noise_level', 'traffic_flow']
+    assert set(table.sources) == {'city_sensors', 'traffic_cameras'}
+
+def test_reports_every_violation():
+    table = RuleTable(RULES)
+    results = table.score_batch(
+        ['city_sensors', 'city_sensors', 'city_sensors', 'twitter'],
+        [None, None, None, None],  # average_speed
+        [0.5, 0.9, None, 0.9],     # crowd_density
+        [60, 95, 95, 95],          # noise_level
+        [0.6, 0.1, 0.5, 0.1]       # traffic_flow
+    )
+    
+    assert results[0] == (None, None)
+    anomaly_type, description = results[1]
+    assert anomaly_type == "crowd_density_anomaly,noise_level_anomaly,traffic_flow_anomaly"
+    assert "Low traffic_flow detected: 0.1" in description
+    assert results[2][0] == "noise_level_anomaly"
+    # Sources without rules are never flagged
+    assert results[3] == (None, None)
+
+def test_explicit_bounds_per_source():
+    table = RuleTable(RULES)
+    results = table.score_batch(['traffic_cameras'] * 3, [2, 60, 130], [None] * 3, [None] * 3, [None] * 3)
+    assert [r[0] for r in results] == ["average_speed_anomaly", None, "average_speed_anomaly"]
+
+def test_engine_expressions_match_batch_scoring():
+    rule_table = RuleTable(RULES)
+    rows = [
+        ('city_sensors', None, 0.9, 95.0, 0.1),
+        ('city_sensors', None, 0.5, 60.0, 0.6),
+        ('traffic_cameras', 130.0, None, None, None),
+        ('twitter', None, 0.9, 95.0, 0.1)
+    ]
+    table = pw.debug.table_from_rows(
+        pw.schema_from_types(source=str, **{metric: Optional[float] for metric in rule_table.metrics}), rows
+    )
+    violated, types, descriptions = rule_table.expressions(table)
+    scored = table.select(
+        pw.this.source,
+        anomaly_type=pw.if_else(violated, types, None),
+        anomaly_description=pw.if_else(violated, descriptions, None)
+    )
+    
+    _, columns = pw.debug.table_to_dicts(scored)
+    engine = sorted(zip(columns['source'].values(), columns['anomaly_type'].values(), columns['anomaly_description'].values()), key=str)
+    batch = rule_table.score_batch([row[0] for row in rows], *[[row[i] for row in rows] for i in range(1, 5)])
+    assert engine == sorted(((row[0], *result) for row, result in zip(rows, batch)), key=str)
@@ -0,0 +1,65 @@
+import pytest
+from src.processing.spatial import CellStateStore, SpatialGrid
+
+def test_grid_cells():
+    grid = SpatialGrid(15)
+    cell = grid.cell(40.7128, -74.0060)
+    
+    assert grid.cell(40.7129, -74.0061) == cell
+    assert grid.cell(40.7528, -74.0060) != cell
+    
+    lat, lon = grid.center(cell)
+    assert abs(lat - 40.7128) <= grid.lat_step / 2
+    assert abs(lon + 74.0060) <= grid.lon_step / 2
+    assert grid.cell(lat, lon) == cell
+
+def test_grid_neighbours():
+    grid = SpatialGrid(10)
+    cell = grid.cell(40.7128, -74.0060)
+    lat, lon = grid.center(cell)
+    
+    neighbours = grid.neighbours(cell)
+    assert len(set(neighbours)) == 9
+    assert cell in neighbours
+    assert grid.cell(lat + grid.lat_step, lon - grid.lon_step) in neighbours
+    assert grid.cell(lat + 2 * grid.lat_step, lon) not in neighbours
+    
+    # Longitude wraps at the antimeridian, latitude stops at the poles
+    assert grid.cell(0, -179.99) in grid.neighbours(grid.cell(0, 179.99))
+    assert len(grid.neighbours(grid.cell(89.99, 0))) == 6
+
+def test_grid_resolution_bounds():
+    with pytest.raises(ValueError):
+        SpatialGrid(0)
+
+def test_store_ttl():
+    store = CellStateStore(ttl=60)
+    store.put(1, {"count": 1}, now=0)
+    
+    assert store.get(1, now=30) == {"count": 1}
+    # Reading refreshes the entry
+    assert store.get(1, now=80) == {"count": 1}
+    assert store.get(1, now=200) is None
+    assert store.stats()["expired"] == 1
+    
+    # Expired entries are dropped on the next write
+    store.put(2, 0, now=0)
+    store.put(3, 0, now=100)
+    assert 2 not in store
+
+def test_store_lru_and_memory_cap():
+    store = CellStateStore(max_cells=2)
+    store.put(1, "a", now=0)
+    store.put(2, "b", now=1)
+    store.get(1, now=2)
+    store.put(3, "c", now=3)
+    
+    # 2 was least recently used
+    assert 2 not in store and 1 in store and 3 in store
+    
+    capped = CellStateStore(max_bytes=10000)
+    for cell in range(1000):
+        capped.put(cell, {"count": cell}, now=cell)
+    assert capped.bytes <= 10000
+    assert 999 in capped and 0 not in capped
+    assert capped.stats()["evicted"] == 1000 - len(capped)
@@ -0,0 +1,21 @@
+import sys
+
+from src.startup import StartupReport
+
+def test_startup_report_times_phases_and_imports():
+    sys.modules.pop('colorsys', None)
+    
+    report = StartupReport()
+    report.install()
+    try:
+        with report.phase("imports"):
+            import colorsys
+            import os
+    finally:
+        report.uninstall()
+    
+    assert [name for name, _ in report.phases] == ["imports"]
+    # Only packages not loaded yet are timed
+    assert "colorsys" in report.imports
+    assert "os" not in report.imports
+    assert "imports" in report.report()
@@ -0,0 +1,123 @@
+import threading
+
+import numpy as np
+import pytest
+from src.processing.vector_index import FlatIndex, IVFIndex, create_index, load_index
+
+def clustered(count, dim=16, clusters=8, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    return (centers[rng.integers(clusters, size=count)] + 0.1 * rng.standard_normal((count, dim))).astype(np.float32)
+
+def test_flat_index_add_remove_search():
+    index = FlatIndex(capacity=2)
+    for i in range(5):
+        index.add(i, np.eye(5)[i] + 0.1)
+    assert index.search(np.eye(5)[3], 1)[0][0] == 3
+    
+    assert index.remove(3)
+    assert not index.remove(3)
+    assert 3 not in index and len(index) == 4
+    # The row moved into the freed slot is still found
+    assert index.search(np.eye(5)[4], 1)[0][0] == 4
+    assert len(index.search(np.ones(5), 10)) == 4
+
+def test_ivf_index_is_exact_until_trained():
+    index = IVFIndex(nlist=4, nprobe=1, train_size=100)
+    vectors = clustered(99)
+    for i, vector in enumerate(vectors):
+        index.add(i, vector)
+    assert not index.stats()["trained"]
+    assert index.search(vectors[7], 1)[0][0] == 7
+
+def test_ivf_index_recall_and_removal():
+    vectors, queries = np.split(clustered(2050), [2000])
+    index = IVFIndex(nlist=8, nprobe=2, train_size=1000)
+    flat = FlatIndex()
+    for i, vector in enumerate(vectors):
+        index.add(i, vector)
+        flat.add(i, vector)
+    index.finish_training()
+    assert index.stats()["trained"] and len(index) == 2000
+    
+    for i in range(0, 2000, 2):
+        assert index.remove(i)
+        flat.remove(i)
+    assert len(index) == 1000 and 0 not in index
+    
+    found = sum(
+        len({doc_id for doc_id, _ in index.search(query, 10)} & {doc_id for doc_id, _ in flat.search(query, 10)})
+        for query in queries
+    )
+    assert found / (10 * len(queries)) > 0.9
+
+def test_ivf_index_trains_in_background():
+    vectors = clustered(300)
+    index = IVFIndex(nlist=4, nprobe=4, train_size=100)
+    released = threading.Event()
+    learn = index._learn
+    def blocked_learn(ids, snapshot):
+        released.wait()
+        return learn(ids, snapshot)
+    index._learn = blocked_learn
+    
+    # The add that reaches train_size returns while k-means waits, and the exact index serves
+    for i, vector in enumerate(vectors[:200]):
+        index.add(i, vector)
+    assert index.stats()["training"] and not index.stats()["trained"]
+    assert index.search(vectors[150], 1)[0][0] == 150
+    # Changes while training are kept once the lists are swapped in
+    index.remove(3)
+    index.remove(120)
+    index.add(7, vectors[250])
+    
+    released.set()
+    index.finish_training()
+    assert index.stats()["trained"] and len(index) == 198
+    assert 3 not in index and 120 not in index
+    assert index.search(vectors[150], 1)[0][0] == 150
+    assert index.search(vectors[250], 1)[0][0] == 7
+    index.add(300, vectors[299])
+    assert len(index) == 199
+
+def test_create_index():
+    assert isinstance(create_index({}), FlatIndex)
+    assert create_index({'type': 'ivf', 'nprobe': 4}).nprobe == 4
+    with pytest.raises(ValueError):
+        create_index({'type': 'annoy'})
+
+@pytest.mark.parametrize("dtype, tolerance", [("float16", 1e-3), ("int8", 2e-2)])
+def test_quantized_flat_index(dtype, tolerance):
+    vectors = clustered(500, dim=64)
+    exact = FlatIndex()
+    index = FlatIndex(capacity=16, dtype=dtype)
+    for i, vector in enumerate(vectors):
+        exact.add(i, vector)
+        index.add(i, vector)
+    for i in range(0, 500, 5):
+        exact.remove(i)
+        index.remove(i)
+    
+    query = vectors[1]
+    assert index.search(query, 1)[0][0] == 1
+    doc_ids = [doc_id for doc_id, _ in exact.search(query, 50)]
+    assert np.allclose(index.similarities(query, doc_ids), exact.similarities(query, doc_ids), atol=tolerance)
+    assert index.stats()["bytes"] < exact.stats()["bytes"] / (1.9 if dtype == "float16" else 3.5)
+
+@pytest.mark.parametrize("index", [FlatIndex(dtype="int8"), IVFIndex(nlist=4, nprobe=4, train_size=100, dtype="int8"), IVFIndex(nlist=4, train_size=1000)])
+def test_index_save_and_load(tmp_path, index):
+    vectors = clustered(300)
+    for i, vector in enumerate(vectors):
+        index.add(i, vector)
+    index.remove(5)
+    if isinstance(index, IVFIndex):
+        index.finish_training()
+    index.save(str(tmp_path))
+    
+    loaded = load_index(str(tmp_path))
+    assert type(loaded) is type(index) and len(loaded) == 299 and 5 not in loaded
+    assert loaded.search(vectors[7], 3) == index.search(vectors[7], 3)
+    # Still changes after loading
+    loaded.add(300, vectors[5])
+    loaded.remove(7)
+    assert loaded.search(vectors[5], 1)[0][0] == 300 and 7 not in loaded